@@ -4,21 +4,55 @@ Sistema de asignación de nombres a personajes en Plot Schemas.
 Permite asignar nombres reales a los placeholders de personajes,
 manteniendo consistencia dentro de cada AOI pero permitiendo variación entre AOIs.
 Soporta dos modos: asignación aleatoria o basada en atributos de personalidad.
+
+Los métodos `bind_*` no copian el schema: devuelven un `BoundSchema` (la
+estructura compartida + un mapeo de personajes por span). Los `assign_*`
+mantienen la interfaz anterior y materializan el `PlotSchema` resultante.
 """
 
+import logging
 import random
-from typing import List, Dict, Optional, Union
-from copy import deepcopy
-from axis_of_interest.schemas import PlotSchema
-from axis_of_interest.registry import list_of_aoi
+from typing import List, Dict, Optional, Tuple, Union
+from axis_of_interest.schemas import AxisOfInterest, PlotSchema
+from axis_of_interest.plot_structure import BoundSchema, SchemaStructure
+from axis_of_interest.registry import get_aoi_index, get_aois
 from axis_of_interest.character_attributes import (
     Character, 
     CharacterAttributes, 
-    get_best_character_for_role,
-    calculate_attribute_distance,
-    ROLE_ATTRIBUTE_PROFILES
+    RoleMatcher,
+    role_profile,
 )
 
+logger = logging.getLogger(__name__)
+
+SchemaLike = Union[PlotSchema, SchemaStructure, BoundSchema]
+
+
+def _as_structure(schema: SchemaLike) -> SchemaStructure:
+    if isinstance(schema, SchemaStructure):
+        return schema
+    return SchemaStructure.from_plot_schema(schema)
+
+
+def _get_aoi(aoi_name: str) -> AxisOfInterest:
+    index = get_aoi_index().get(aoi_name)
+    if index is None:
+        raise ValueError(f"No se encontró el AOI: {aoi_name}")
+    return get_aois()[index]
+
+
+def _log_assignment(
+    aoi_name: str, span_name: str, assignment: Dict[str, Tuple[Character, float]]
+) -> None:
+    lines = [f"Asignando personajes para {aoi_name}/{span_name}:"]
+    for role, (character, distance) in assignment.items():
+        profile = role_profile(role)
+        attrs = character.attributes
+        lines.append(f"  {role:20s} → {character.name:15s} (distancia: {distance:.2f})")
+        lines.append(f"    Perfil ideal:  V:{profile.valentia} B:{profile.bondad} A:{profile.astucia} M:{profile.maldad} C:{profile.carisma}")
+        lines.append(f"    Perfil {character.name:6s}: V:{attrs.valentia} B:{attrs.bondad} A:{attrs.astucia} M:{attrs.maldad} C:{attrs.carisma}")
+    logger.debug("\n".join(lines))
+
 
 class CharacterNameAssigner:
     """
@@ -52,8 +86,14 @@ class CharacterNameAssigner:
         self.random = random.Random(seed)
 
     def assign_names(
-        self, schema: PlotSchema, character_names: List[str], allow_reuse: bool = True
+        self, schema: SchemaLike, character_names: List[str], allow_reuse: bool = True
     ) -> PlotSchema:
+        """Como `bind_names`, pero devuelve el PlotSchema materializado."""
+        return self.bind_names(schema, character_names, allow_reuse).to_plot_schema()
+
+    def bind_names(
+        self, schema: SchemaLike, character_names: List[str], allow_reuse: bool = True
+    ) -> BoundSchema:
         """
         Asigna nombres a los personajes del schema.
 
@@ -64,7 +104,7 @@ class CharacterNameAssigner:
                         Si False, cada nombre solo se usa una vez en todo el schema.
 
         Returns:
-            Nuevo PlotSchema con nombres asignados
+            BoundSchema con nombres asignados (el schema original no se modifica)
 
         Raises:
             ValueError: Si no hay suficientes nombres para los personajes
@@ -72,29 +112,18 @@ class CharacterNameAssigner:
         if not character_names:
             raise ValueError("Debe proporcionar al menos un nombre de personaje")
 
-        # Crear copia profunda del schema para no modificar el original
-        new_schema = deepcopy(schema)
+        structure = _as_structure(schema)
 
         # Rastrear nombres usados globalmente (solo si allow_reuse=False)
         global_used_names = set()
 
-        # Crear un diccionario de AOIs por nombre para acceso rápido
-        aoi_dict = {aoi.name: aoi for aoi in list_of_aoi}
-
-        # Agrupar spans por AOI
-        spans_by_aoi = {}
-        for span in new_schema.plots_span:
-            aoi_name = span.axis_of_interest
-            if aoi_name not in spans_by_aoi:
-                spans_by_aoi[aoi_name] = []
-            spans_by_aoi[aoi_name].append(span)
+        # Un mapeo rol -> nombre por AOI, compartido por todos sus spans
+        names_by_aoi: Dict[str, Dict[str, str]] = {}
 
-        # Procesar cada AOI (todos sus spans juntos)
-        for aoi_name, spans in spans_by_aoi.items():
+        # Procesar cada AOI en orden de aparición (todos sus spans juntos)
+        for aoi_name in structure.aoi_spans:
             # Obtener el objeto AOI para acceder a sus roles
-            aoi = aoi_dict.get(aoi_name)
-            if not aoi:
-                raise ValueError(f"No se encontró el AOI: {aoi_name}")
+            aoi = _get_aoi(aoi_name)
 
             # Usar los roles del AOI directamente
             roles = aoi.roles
@@ -130,25 +159,32 @@ class CharacterNameAssigner:
                 if not allow_reuse:
                     global_used_names.add(assigned_name)
 
-            # Aplicar el mapeo a todos los atoms de TODOS los spans de este AOI
-            for span in spans:
-                for atom in span.plots_atoms:
-                    new_characters = {}
-                    for role in atom.characters.keys():
-                        # Asignar el nombre directamente al rol
-                        new_characters[role] = role_to_name.get(role, role)
-                    atom.characters = new_characters
+            names_by_aoi[aoi_name] = role_to_name
 
-        return new_schema
+        # El mapeo se aplica a todos los atoms de TODOS los spans de cada AOI
+        return structure.bind_aois(names_by_aoi)
     
     def assign_names_by_attributes(
         self,
-        schema: PlotSchema,
+        schema: SchemaLike,
         characters: List[Character],
         allow_reuse: bool = True
     ) -> PlotSchema:
+        """Como `bind_names_by_attributes`, pero devuelve el PlotSchema materializado."""
+        return self.bind_names_by_attributes(schema, characters, allow_reuse).to_plot_schema()
+
+    def bind_names_by_attributes(
+        self,
+        schema: SchemaLike,
+        characters: List[Character],
+        allow_reuse: bool = True
+    ) -> BoundSchema:
         """
         Asigna personajes a roles basándose en sus atributos de personalidad.
+
+        En cada span busca la asignación que minimiza la distancia total entre
+        personajes y perfiles de rol (sin repetir personajes dentro del span).
+        El detalle de cada asignación se registra con nivel DEBUG.
         
         Args:
             schema: PlotSchema con placeholders
@@ -156,84 +192,58 @@ class CharacterNameAssigner:
             allow_reuse: Si True, permite que el mismo personaje aparezca en diferentes AOIs
         
         Returns:
-            Nuevo PlotSchema con nombres asignados basados en atributos
+            BoundSchema con nombres asignados basados en atributos
         """
         if not characters:
             raise ValueError("Debe proporcionar al menos un personaje")
         
-        # Crear copia profunda del schema
-        new_schema = deepcopy(schema)
+        structure = _as_structure(schema)
+        matcher = RoleMatcher(characters)
         
         # Rastrear nombres usados globalmente
         global_used_names = set()
         
-        # Crear diccionario de AOIs
-        aoi_dict = {aoi.name: aoi for aoi in list_of_aoi}
+        # Un mapeo rol -> nombre por span
+        bindings = []
         
         # Procesar cada span por separado para mantener consistencia intra-span
-        for span in new_schema.plots_span:
+        for span in structure.spans:
             aoi_name = span.axis_of_interest
-            aoi = aoi_dict.get(aoi_name)
-            if not aoi:
-                raise ValueError(f"No se encontró el AOI: {aoi_name}")
+            _get_aoi(aoi_name)
 
-            # Roles presentes en este span (según los atoms)
-            roles_in_span = []
-            for atom in span.plots_atoms:
-                for role in atom.characters.keys():
-                    if role not in roles_in_span:
-                        roles_in_span.append(role)
-
-            # Personajes disponibles para este span
-            available_chars = (
-                [c for c in characters if c.name not in global_used_names]
-                if not allow_reuse
-                else characters
+            # Asignación óptima de los roles del span (sin repetir dentro del span)
+            assignment = matcher.assign(
+                span.roles, exclude=global_used_names if not allow_reuse else None
             )
+            role_to_name = {role: character.name for role, (character, _) in assignment.items()}
 
-            if not available_chars:
-                available_chars = characters
-
-            # Asignar el mejor personaje para cada rol basado en atributos (sin repetir dentro del span)
-            role_to_name = {}
-            span_used_names = set()
-
-            print(f"\n  🎯 Asignando personajes para {aoi_name}/{span.name}:")
+            if logger.isEnabledFor(logging.DEBUG):
+                _log_assignment(aoi_name, span.name, assignment)
 
-            for role in roles_in_span:
-                best_char = get_best_character_for_role(role, available_chars, span_used_names)
-                role_to_name[role] = best_char.name
-                span_used_names.add(best_char.name)
+            if not allow_reuse:
+                global_used_names.update(role_to_name.values())
 
-                # Mostrar la asignación y la razón
-                role_profile = ROLE_ATTRIBUTE_PROFILES.get(
-                    role.lower(),
-                    CharacterAttributes(valentia=3, bondad=3, astucia=3, maldad=3, carisma=3)
-                )
-                distance = calculate_attribute_distance(best_char.attributes, role_profile)
-
-                print(f"    ✓ {role:20s} → {best_char.name:15s} (distancia: {distance:.2f})")
-                print(f"      Perfil ideal:  V:{role_profile.valentia} B:{role_profile.bondad} A:{role_profile.astucia} M:{role_profile.maldad} C:{role_profile.carisma}")
-                print(f"      Perfil {best_char.name:6s}: V:{best_char.attributes.valentia} B:{best_char.attributes.bondad} A:{best_char.attributes.astucia} M:{best_char.attributes.maldad} C:{best_char.attributes.carisma}")
-
-                if not allow_reuse:
-                    global_used_names.add(best_char.name)
-
-            # Aplicar el mapeo a todos los atoms del span
-            for atom in span.plots_atoms:
-                new_characters = {}
-                for role in atom.characters.keys():
-                    new_characters[role] = role_to_name.get(role, role)
-                atom.characters = new_characters
+            bindings.append(role_to_name)
         
-        return new_schema
+        return structure.bind(tuple(bindings))
 
     def assign_names_with_mapping(
         self,
-        schema: PlotSchema,
+        schema: SchemaLike,
         character_names: List[str],
         custom_mapping: Optional[Dict[str, Dict[str, str]]] = None,
     ) -> PlotSchema:
+        """Como `bind_names_with_mapping`, pero devuelve el PlotSchema materializado."""
+        return self.bind_names_with_mapping(
+            schema, character_names, custom_mapping
+        ).to_plot_schema()
+
+    def bind_names_with_mapping(
+        self,
+        schema: SchemaLike,
+        character_names: List[str],
+        custom_mapping: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> BoundSchema:
         """
         Asigna nombres con un mapeo personalizado por AOI.
 
@@ -250,12 +260,13 @@ class CharacterNameAssigner:
             }
 
         Returns:
-            Nuevo PlotSchema con nombres asignados
+            BoundSchema con nombres asignados
         """
-        new_schema = deepcopy(schema)
+        structure = _as_structure(schema)
         custom_mapping = custom_mapping or {}
+        bindings = []
 
-        for span in new_schema.plots_span:
+        for span in structure.spans:
             aoi_name = span.axis_of_interest
             aoi_mapping = custom_mapping.get(aoi_name, {})
 
@@ -283,16 +294,11 @@ class CharacterNameAssigner:
                             character_names
                         )
 
-            # Aplicar mapeo
-            for atom in span.plots_atoms:
-                new_characters = {}
-                for role, placeholder in atom.characters.items():
-                    new_characters[role] = placeholder_to_name[placeholder]
-                atom.characters = new_characters
+            bindings.append(placeholder_to_name)
 
-        return new_schema
+        return structure.bind(tuple(bindings), by_placeholder=True)
 
-    def get_character_summary(self, schema: PlotSchema) -> Dict[str, Dict[str, set]]:
+    def get_character_summary(self, schema: Union[PlotSchema, BoundSchema]) -> Dict[str, Dict[str, set]]:
         """
         Obtiene un resumen de qué personajes aparecen en cada AOI.
 
@@ -397,3 +403,25 @@ def assign_character_names_by_attributes(
     """
     assigner = CharacterNameAssigner(seed=seed)
     return assigner.assign_names_by_attributes(schema, characters, allow_reuse=allow_reuse)
+
+
+def bind_character_names(
+    schema: SchemaLike,
+    names: List[str],
+    allow_reuse: bool = True,
+    seed: Optional[int] = None,
+) -> BoundSchema:
+    """Como `assign_character_names`, sin copiar el schema (devuelve un BoundSchema)."""
+    assigner = CharacterNameAssigner(seed=seed)
+    return assigner.bind_names(schema, names, allow_reuse=allow_reuse)
+
+
+def bind_character_names_by_attributes(
+    schema: SchemaLike,
+    characters: List[Character],
+    allow_reuse: bool = True,
+    seed: Optional[int] = None,
+) -> BoundSchema:
+    """Como `assign_character_names_by_attributes`, devolviendo un BoundSchema."""
+    assigner = CharacterNameAssigner(seed=seed)
+    return assigner.bind_names_by_attributes(schema, characters, allow_reuse=allow_reuse)
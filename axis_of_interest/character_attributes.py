@@ -1,8 +1,15 @@
 """
 Sistema de atributos de personalidad para personajes.
+
+`RoleMatcher` asigna personajes a roles minimizando la distancia total entre
+atributos y perfiles (asignación óptima, algoritmo húngaro). Usa NumPy/SciPy si
+están instalados y, si no, una implementación en Python puro. Los empates (muy
+comunes: los atributos son enteros de 1 a 5) se resuelven siempre a favor del
+personaje de menor índice, así que ambos caminos dan la misma asignación.
 """
 
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 from pydantic import BaseModel, Field
 
 
@@ -69,6 +76,239 @@ ROLE_ATTRIBUTE_PROFILES: Dict[str, CharacterAttributes] = {
 }
 
 
+ATTRIBUTE_NAMES = ("valentia", "bondad", "astucia", "maldad", "carisma")
+NEUTRAL_PROFILE = CharacterAttributes(valentia=3, bondad=3, astucia=3, maldad=3, carisma=3)
+
+
+def role_profile(role: str) -> CharacterAttributes:
+    """Perfil ideal del rol (neutral si el rol no tiene perfil definido)."""
+    return ROLE_ATTRIBUTE_PROFILES.get(role.lower(), NEUTRAL_PROFILE)
+
+
+def attribute_vector(attrs: CharacterAttributes) -> Tuple[int, ...]:
+    return tuple(getattr(attrs, name) for name in ATTRIBUTE_NAMES)
+
+
+@lru_cache(maxsize=None)
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+@lru_cache(maxsize=None)
+def _scipy_linear_sum_assignment() -> Any:
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        return None
+    return linear_sum_assignment
+
+
+@lru_cache(maxsize=None)
+def profile_matrix() -> Tuple[Dict[str, int], Any]:
+    """(rol -> fila, matriz roles × atributos) de ROLE_ATTRIBUTE_PROFILES; la última fila es el perfil neutral."""
+    index = {role: i for i, role in enumerate(ROLE_ATTRIBUTE_PROFILES)}
+    rows = [attribute_vector(profile) for profile in ROLE_ATTRIBUTE_PROFILES.values()]
+    rows.append(attribute_vector(NEUTRAL_PROFILE))
+    np = _numpy()
+    return index, (np.asarray(rows, dtype=float) if np is not None else rows)
+
+
+@lru_cache(maxsize=None)
+def _profile_distances(vector: Tuple[int, ...]) -> Tuple[float, ...]:
+    """Distancia de un vector de atributos a cada fila de profile_matrix() (sin NumPy).
+
+    Los atributos van de 1 a 5, así que hay a lo sumo 5⁵ vectores distintos.
+    """
+    _, profiles = profile_matrix()
+    return tuple(sum((a - b) ** 2 for a, b in zip(vector, profile)) ** 0.5 for profile in profiles)
+
+
+def _hungarian(cost: Sequence[Sequence[float]]) -> List[Tuple[int, int]]:
+    """Asignación de costo mínimo (filas, columnas) de tamaño min(filas, columnas). O(n²·m)."""
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    if n == 0 or m == 0:
+        return []
+    if n > m:
+        transposed = [list(column) for column in zip(*cost)]
+        return sorted((row, col) for col, row in _hungarian(transposed))
+
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)  # columna -> fila (1-indexado, 0 = libre)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            row = cost[i0 - 1]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    return sorted((match[j] - 1, j - 1) for j in range(1, m + 1) if match[j])
+
+
+# Resolución con la que se comparan las distancias (ver `tie_broken_costs`)
+COST_SCALE = 10**6
+# SciPy trabaja en float64: solo se usa si todas las sumas son enteros exactos
+_EXACT_FLOAT_LIMIT = 2**52
+
+
+def tie_broken_costs(cost: Sequence[Sequence[float]]) -> List[List[int]]:
+    """
+    Costos enteros con un único óptimo.
+
+    Cada distancia se cuantiza a `COST_SCALE` y se le resta un desempate
+    posicional (filas - fila) · B^(columnas - 1 - columna), con B = filas + 1,
+    que en total es menor que una unidad del costo cuantizado. Entre las
+    asignaciones de mínima distancia gana la que le da a la primera columna la
+    fila de menor índice, después a la segunda, etc. (una columna sin asignar
+    pierde contra cualquier fila).
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    base = n + 1
+    weight = base**m
+    return [
+        [
+            round(value * COST_SCALE) * weight - (n - i) * base ** (m - 1 - j)
+            for j, value in enumerate(row)
+        ]
+        for i, row in enumerate(cost)
+    ]
+
+
+def optimal_assignment(cost: Any) -> List[Tuple[int, int]]:
+    """Pares (fila, columna) que minimizan el costo total, sin repetir filas ni columnas.
+
+    Con empates elige por menor índice de fila (ver `tie_broken_costs`), así que
+    el resultado no depende de si está instalado SciPy.
+    """
+    rows = cost.tolist() if hasattr(cost, "tolist") else cost
+    if not len(rows) or not len(rows[0]):
+        return []
+    exact = tie_broken_costs(rows)
+    if len(exact[0]) == 1:
+        # Un solo rol: el personaje más cercano
+        return [(min(range(len(exact)), key=lambda row: exact[row][0]), 0)]
+    solver = _scipy_linear_sum_assignment()
+    size = min(len(exact), len(exact[0]))
+    largest = max(abs(value) for row in exact for value in row)
+    if solver is not None and largest * size < _EXACT_FLOAT_LIMIT:
+        row_ind, col_ind = solver(_numpy().asarray(exact, dtype=float))
+        return sorted(zip(row_ind.tolist(), col_ind.tolist()))
+    return _hungarian(exact)
+
+
+class RoleMatcher:
+    """
+    Asigna personajes a roles según la distancia euclidiana de sus atributos.
+
+    La matriz de atributos de los personajes se arma una sola vez y las
+    distancias personaje × rol se calculan por bloque y quedan cacheadas (igual
+    que las asignaciones ya resueltas), así que se puede reutilizar el mismo
+    matcher para todos los spans de un schema.
+    """
+
+    def __init__(self, characters: Sequence[Character]):
+        self.characters = list(characters)
+        self._np = _numpy()
+        rows = [attribute_vector(c.attributes) for c in self.characters]
+        # personajes × atributos: ndarray con NumPy, lista de tuplas sin él
+        self._attributes: Any = self._np.asarray(rows, dtype=float) if self._np is not None else rows
+        self._columns: Dict[str, Any] = {}  # rol -> distancias de cada personaje
+        self._solved: Dict[Tuple[Tuple[str, ...], Tuple[int, ...]], Dict[str, Tuple[Character, float]]] = {}
+
+    def _compute_columns(self, roles: List[str]) -> None:
+        index, profiles = profile_matrix()
+        neutral = len(index)
+        rows = [index.get(role.lower(), neutral) for role in roles]
+        if self._np is not None:
+            selected = profiles[rows]  # roles × atributos
+            diff = self._attributes[:, None, :] - selected[None, :, :]
+            block = self._np.sqrt((diff * diff).sum(axis=2))  # personajes × roles
+            for j, role in enumerate(roles):
+                self._columns[role] = block[:, j]
+        else:
+            distance_rows = [_profile_distances(attrs) for attrs in self._attributes]
+            for role, row in zip(roles, rows):
+                self._columns[role] = [distances[row] for distances in distance_rows]
+
+    def distances(self, roles: Sequence[str], candidates: Sequence[int]) -> Any:
+        """Matriz candidatos × roles (índices de `self.characters`)."""
+        missing = [role for role in dict.fromkeys(roles) if role not in self._columns]
+        if missing:
+            self._compute_columns(missing)
+        if self._np is not None:
+            return self._np.column_stack([self._columns[role] for role in roles])[list(candidates)]
+        return [[self._columns[role][i] for role in roles] for i in candidates]
+
+    def assign(
+        self, roles: Iterable[str], exclude: Optional[Iterable[str]] = None
+    ) -> Dict[str, Tuple[Character, float]]:
+        """
+        Asignación óptima rol -> (personaje, distancia), sin repetir personajes.
+
+        Los personajes cuyo nombre está en `exclude` no se usan (salvo que no
+        quede ninguno). Si hay más roles que personajes, los roles que quedan
+        sin asignar se resuelven en una nueva ronda que vuelve a usar a todos.
+        """
+        excluded = set(exclude or ())
+        candidates = [i for i, c in enumerate(self.characters) if c.name not in excluded]
+        if not candidates:
+            candidates = list(range(len(self.characters)))
+
+        roles = list(dict.fromkeys(roles))
+        # Spans con los mismos roles y candidatos (frecuente con reuso) se resuelven una vez
+        key = (tuple(roles), tuple(candidates))
+        if key in self._solved:
+            return dict(self._solved[key])
+
+        result: Dict[str, Tuple[Character, float]] = {}
+        remaining = list(roles)
+        while remaining and candidates:
+            cost = self.distances(remaining, candidates)
+            for row, col in optimal_assignment(cost):
+                character_index = candidates[row]
+                result[remaining[col]] = (
+                    self.characters[character_index],
+                    float(self._columns[remaining[col]][character_index]),
+                )
+            remaining = [role for role in remaining if role not in result]
+        self._solved[key] = {role: result[role] for role in roles if role in result}
+        return dict(self._solved[key])
+
+
 def calculate_attribute_distance(char_attrs: CharacterAttributes, role_attrs: CharacterAttributes) -> float:
     """
     Calcula la distancia euclidiana entre los atributos de un personaje y un rol.
@@ -104,10 +344,7 @@ def get_best_character_for_role(
         used_characters = set()
     
     # Obtener perfil ideal para el rol (lowercase para matching)
-    role_profile = ROLE_ATTRIBUTE_PROFILES.get(
-        role.lower(),
-        CharacterAttributes(valentia=3, bondad=3, astucia=3, maldad=3, carisma=3)  # neutral por defecto
-    )
+    profile = role_profile(role)
     
     # Filtrar personajes no usados
     candidates = [c for c in available_characters if c.name not in used_characters]
@@ -119,7 +356,7 @@ def get_best_character_for_role(
     # Encontrar el mejor match
     best_char = min(
         candidates,
-        key=lambda c: calculate_attribute_distance(c.attributes, role_profile)
+        key=lambda c: calculate_attribute_distance(c.attributes, profile)
     )
     
     return best_char
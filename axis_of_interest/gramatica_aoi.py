@@ -1,7 +1,168 @@
 """
 Gramática para generar oraciones a partir de Axis of Interest y Plot Spans.
+
+Las tablas `VERBOS` y `OBJETOS` se compilan una sola vez en `PREDICADOS`: el
+predicado (verbo + objeto) ya armado para cada (aoi, span, atom) de los AOIs
+registrados. Las oraciones se arman con una única interpolación por atom.
 """
 
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+VERBO_POR_DEFECTO = "realiza una acción en"
+
+VERBOS = {
+    # JOURNEY
+    ("JOURNEY", "Out", "Departure"): "parte",
+    ("JOURNEY", "Back", "Return"): "regresa",
+
+    # CONFLICT
+    ("CONFLICT", "Struggle", "Struggle"): "lucha",
+    ("CONFLICT", "Victory", "Victory"): "vence",
+
+    # TASK
+    ("TASK", "TaskSet", "DifficultTask"): "recibe",
+    ("TASK", "TaskSolved", "Solution"): "completa",
+
+    # DONOR
+    ("DONOR", "Tested", "Tested"): "es probado",
+    ("DONOR", "Tested", "Character'sReaction"): "reacciona ante",
+    ("DONOR", "Tested", "ProvisionOfAMagicalAgent"): "recibe",
+    ("DONOR", "UseOfAMagicalAgent", "UseOfAMagicalAgent"): "usa",
+
+    # CALL TO ACTION REWARD
+    ("CALL TO ACTION REWARD", "Call", "CallToAction"): "recibe",
+    ("CALL TO ACTION REWARD", "Reward", "Reward"): "es recompensado",
+
+    # RIVALRY
+    ("RIVALRY", "RivalryDeclared", "Rivalry"): "declara una rivalidad",
+    ("RIVALRY", "Cooperation", "Cooperation"): "coopera",
+    ("RIVALRY", "Reconciliation", "Reconciliation"): "se reconcilia",
+
+    # PURSUIT
+    ("PURSUIT", "Chase", "Pursuit"): "es perseguido",
+    ("PURSUIT", "Escape", "RescueFromPursuit"): "escapa",
+
+    # KIDNAPPING
+    ("KIDNAPPING", "Abduction", "Abduction"): "es secuestrado",
+    ("KIDNAPPING", "Rescue", "Rescue"): "es rescado",
+
+    # KIDNAPPING PUNISHMENT
+    ("KIDNAPPING PUNISHMENT", "Kidnapping", "Abduction"): "es secuestrado",
+    ("KIDNAPPING PUNISHMENT", "Rescue", "Rescue"): "rescata",
+    ("KIDNAPPING PUNISHMENT", "Punishment", "Punishment"): "es castigado",
+
+    # INTERDICTION VIOLATED
+    ("INTERDICTION VIOLATED", "Interdiction", "Interdiction"): "es advertido",
+    ("INTERDICTION VIOLATED", "Absentation", "Interdiction"): "se ausenta",
+    ("INTERDICTION VIOLATED", "InterdictionViolated", "Interdiction"): "viola la prohibición",
+
+    # REPENTANCE
+    ("REPENTANCE", "Transformation", "Transformation"): "se transforma",
+    ("REPENTANCE", "Repentance", "Repentance"): "se arrepiente",
+    ("REPENTANCE", "RepentanceRewarded", "RepentanceRewarded"): "es perdonado",
+
+    # RELENTING GUARDIAN
+    ("RELENTING GUARDIAN", "DesireToJoin", "CoupleWantsToMarry"): "desea casarse",
+    ("RELENTING GUARDIAN", "Obstacle", "UnrelentingGuardian"): "son impedidos",
+    ("RELENTING GUARDIAN", "Solution", "RelentingGuardian"): "logran convencer",
+    ("RELENTING GUARDIAN", "Joining", "Wedding"): "se casa",
+
+    # UNRELENTING GUARDIAN
+    ("UNRELENTING GUARDIAN", "DesireToJoin", "CoupleWantsToMarry"): "desea casarse",
+    ("UNRELENTING GUARDIAN", "Obstacle", "UnrelentingGuardian"): "son impedidos",
+    ("UNRELENTING GUARDIAN", "Solution", "HighStatusRevealed"): "intentan convencer",
+    ("UNRELENTING GUARDIAN", "Joining", "Wedding"): "fracasan en casarse",
+
+    # SHIFTING LOVE
+    ("SHIFTING LOVE", "FirstMeeting", "BoyMeetsGirl"): "conoce",
+    ("SHIFTING LOVE", "LoveShift", "LoveShift"): "cambia de amor",
+    ("SHIFTING LOVE", "Reconciliation", "Reconciliation"): "se reconcilia",
+
+    # RAGS 2 RICHES
+    ("RAGS 2 RICHES", "Rags", "Poverty"): "vive en pobreza",
+    ("RAGS 2 RICHES", "Aspiration", "Aspiration"): "aspira a más",
+    ("RAGS 2 RICHES", "Transformation", "Transformation"): "se transforma",
+    ("RAGS 2 RICHES", "Riches", "Reward"): "alcanza la riqueza",
+}
+
+OBJETOS = {
+    # JOURNEY
+    ("JOURNEY", "Out", "Departure"): "hacia lo desconocido",
+    ("JOURNEY", "Back", "Return"): "a casa",
+
+    # CONFLICT
+    ("CONFLICT", "Struggle", "Struggle"): "contra su enemigo",
+    ("CONFLICT", "Victory", "Victory"): "en la batalla a",
+
+    # TASK
+    ("TASK", "TaskSet", "DifficultTask"): "una tarea difícil otorgada por",
+    ("TASK", "TaskSolved", "Solution"): "la tarea",
+
+    # DONOR
+    ("DONOR", "Tested", "Tested"): "por el donante",
+    ("DONOR", "Tested", "Character'sReaction"): "la prueba del donante",
+    ("DONOR", "Tested", "ProvisionOfAMagicalAgent"): "un objeto mágico de",
+    ("DONOR", "UseOfAMagicalAgent", "UseOfAMagicalAgent"): "el objeto mágico",
+
+    # CALL TO ACTION REWARD
+    ("CALL TO ACTION REWARD", "Call", "CallToAction"): "un llamado a la acción de",
+    ("CALL TO ACTION REWARD", "Reward", "Reward"): "",
+
+    # RIVALRY
+    ("RIVALRY", "RivalryDeclared", "Rivalry"): "con",
+    ("RIVALRY", "Cooperation", "Cooperation"): "con su rival",
+    ("RIVALRY", "Reconciliation", "Reconciliation"): "con su rival",
+
+    # PURSUIT
+    ("PURSUIT", "Chase", "Pursuit"): "por",
+    ("PURSUIT", "Escape", "RescueFromPursuit"): "de la persecución",
+
+    # KIDNAPPING
+    ("KIDNAPPING", "Abduction", "Abduction"): "por",
+    ("KIDNAPPING", "Rescue", "Rescue"): "por",
+
+    # KIDNAPPING PUNISHMENT
+    ("KIDNAPPING PUNISHMENT", "Kidnapping", "Abduction"): "por",
+    ("KIDNAPPING PUNISHMENT", "Rescue", "Rescue"): "a",
+    ("KIDNAPPING PUNISHMENT", "Punishment", "Punishment"): "por el secuestro",
+
+    # INTERDICTION VIOLATED
+    ("INTERDICTION VIOLATED", "Interdiction", "Interdiction"): "por",
+    ("INTERDICTION VIOLATED", "Absentation", "Interdiction"): "",
+    ("INTERDICTION VIOLATED", "InterdictionViolated", "Interdiction"): "establecida",
+
+    # REPENTANCE
+    ("REPENTANCE", "Transformation", "Transformation"): "",
+    ("REPENTANCE", "Repentance", "Repentance"): "",
+    ("REPENTANCE", "RepentanceRewarded", "RepentanceRewarded"): "",
+
+    # RELENTING GUARDIAN
+    ("RELENTING GUARDIAN", "DesireToJoin", "CoupleWantsToMarry"): "con",
+    ("RELENTING GUARDIAN", "Obstacle", "UnrelentingGuardian"): "por",
+    ("RELENTING GUARDIAN", "Solution", "RelentingGuardian"): "a",
+    ("RELENTING GUARDIAN", "Joining", "Wedding"): "con",
+
+    # UNRELENTING GUARDIAN
+    ("UNRELENTING GUARDIAN", "DesireToJoin", "CoupleWantsToMarry"): "con",
+    ("UNRELENTING GUARDIAN", "Obstacle", "UnrelentingGuardian"): "por",
+    ("UNRELENTING GUARDIAN", "Solution", "HighStatusRevealed"): "a",
+    ("UNRELENTING GUARDIAN", "Joining", "Wedding"): "con",
+
+    # SHIFTING LOVE
+    ("SHIFTING LOVE", "FirstMeeting", "BoyMeetsGirl"): "a",
+    ("SHIFTING LOVE", "LoveShift", "LoveShift"): "por",
+    ("SHIFTING LOVE", "Reconciliation", "Reconciliation"): "con",
+
+    # RAGS 2 RICHES
+    ("RAGS 2 RICHES", "Rags", "Poverty"): "",
+    ("RAGS 2 RICHES", "Aspiration", "Aspiration"): "",
+    ("RAGS 2 RICHES", "Transformation", "Transformation"): "",
+    ("RAGS 2 RICHES", "Riches", "Reward"): "",
+    ("RAGS TO RICHES", "Richness"): "",
+}
+
+
 def oracionUnicoSujeto(aoi: str, span: str, atom: str, hero: str) -> str:
     """Genera una oración con un único sujeto."""
     partes = [
@@ -34,173 +195,72 @@ def sujeto(hero: str) -> str:
 
 def predicado(aoi: str, span: str, atom: str, complemento: str = None) -> str:
     """Genera el predicado de la oración."""
-    partes = [verbo(aoi, span, atom)]
-    
-    obj = objeto(aoi, span, atom)
-    if obj:
-        partes.append(obj)
-    
-    if complemento:
-        partes.append(f"{complemento}")
-    
-    return " ".join(partes)
+    pred = predicado_base(aoi, span, atom)
+    return f"{pred} {complemento}" if complemento else pred
 
 def verbo(aoi: str, span: str, atom: str) -> str:
     """Retorna el verbo según el AOI, span y atom."""
-    verbos = {
-        # JOURNEY
-        ("JOURNEY", "Out", "Departure"): "parte",
-        ("JOURNEY", "Back", "Return"): "regresa",
-        
-        # CONFLICT
-        ("CONFLICT", "Struggle", "Struggle"): "lucha",
-        ("CONFLICT", "Victory", "Victory"): "vence",
-        
-        # TASK
-        ("TASK", "TaskSet", "DifficultTask"): "recibe",
-        ("TASK", "TaskSolved", "Solution"): "completa",
-        
-        # DONOR
-        ("DONOR", "Tested", "Tested"): "es probado",
-        ("DONOR", "Tested", "Character'sReaction"): "reacciona ante",
-        ("DONOR", "Tested", "ProvisionOfAMagicalAgent"): "recibe",
-        ("DONOR", "UseOfAMagicalAgent", "UseOfAMagicalAgent"): "usa",
-        
-        # CALL TO ACTION REWARD
-        ("CALL TO ACTION REWARD", "Call", "CallToAction"): "recibe",
-        ("CALL TO ACTION REWARD", "Reward", "Reward"): "es recompensado",
-        
-        # RIVALRY
-        ("RIVALRY", "RivalryDeclared", "Rivalry"): "declara una rivalidad",
-        ("RIVALRY", "Cooperation", "Cooperation"): "coopera",
-        ("RIVALRY", "Reconciliation", "Reconciliation"): "se reconcilia",
-        
-        # PURSUIT
-        ("PURSUIT", "Chase", "Pursuit"): "es perseguido",
-        ("PURSUIT", "Escape", "RescueFromPursuit"): "escapa",
-        
-        # KIDNAPPING
-        ("KIDNAPPING", "Abduction", "Abduction"): "es secuestrado",
-        ("KIDNAPPING", "Rescue", "Rescue"): "es rescado",
-        
-        # KIDNAPPING PUNISHMENT
-        ("KIDNAPPING PUNISHMENT", "Kidnapping", "Abduction"): "es secuestrado",
-        ("KIDNAPPING PUNISHMENT", "Rescue", "Rescue"): "rescata",
-        ("KIDNAPPING PUNISHMENT", "Punishment", "Punishment"): "es castigado",
-        
-        # INTERDICTION VIOLATED
-        ("INTERDICTION VIOLATED", "Interdiction", "Interdiction"): "es advertido",
-        ("INTERDICTION VIOLATED", "Absentation", "Interdiction"): "se ausenta",
-        ("INTERDICTION VIOLATED", "InterdictionViolated", "Interdiction"): "viola la prohibición",
-        
-        # REPENTANCE
-        ("REPENTANCE", "Transformation", "Transformation"): "se transforma",
-        ("REPENTANCE", "Repentance", "Repentance"): "se arrepiente",
-        ("REPENTANCE", "RepentanceRewarded", "RepentanceRewarded"): "es perdonado",
-        
-        # RELENTING GUARDIAN
-        ("RELENTING GUARDIAN", "DesireToJoin", "CoupleWantsToMarry"): "desea casarse",
-        ("RELENTING GUARDIAN", "Obstacle", "UnrelentingGuardian"): "son impedidos",
-        ("RELENTING GUARDIAN", "Solution", "RelentingGuardian"): "logran convencer",
-        ("RELENTING GUARDIAN", "Joining", "Wedding"): "se casa",
-        
-        # UNRELENTING GUARDIAN
-        ("UNRELENTING GUARDIAN", "DesireToJoin", "CoupleWantsToMarry"): "desea casarse",
-        ("UNRELENTING GUARDIAN", "Obstacle", "UnrelentingGuardian"): "son impedidos",
-        ("UNRELENTING GUARDIAN", "Solution", "HighStatusRevealed"): "intentan convencer",
-        ("UNRELENTING GUARDIAN", "Joining", "Wedding"): "fracasan en casarse",
-        
-        # SHIFTING LOVE
-        ("SHIFTING LOVE", "FirstMeeting", "BoyMeetsGirl"): "conoce",
-        ("SHIFTING LOVE", "LoveShift", "LoveShift"): "cambia de amor",
-        ("SHIFTING LOVE", "Reconciliation", "Reconciliation"): "se reconcilia",
-        
-        # RAGS 2 RICHES
-        ("RAGS 2 RICHES", "Rags", "Poverty"): "vive en pobreza",
-        ("RAGS 2 RICHES", "Aspiration", "Aspiration"): "aspira a más",
-        ("RAGS 2 RICHES", "Transformation", "Transformation"): "se transforma",
-        ("RAGS 2 RICHES", "Riches", "Reward"): "alcanza la riqueza",
-    }
-    return verbos.get((aoi, span, atom), verbos.get((aoi, span), "realiza una acción en"))
+    return VERBOS.get((aoi, span, atom), VERBOS.get((aoi, span), VERBO_POR_DEFECTO))
 
 def objeto(aoi: str, span: str, atom: str) -> str:
     """Retorna el objeto según el AOI, span y atom."""
-    objetos = {
-        # JOURNEY
-        ("JOURNEY", "Out", "Departure"): "hacia lo desconocido",
-        ("JOURNEY", "Back", "Return"): "a casa",
-        
-        # CONFLICT
-        ("CONFLICT", "Struggle", "Struggle"): "contra su enemigo",
-        ("CONFLICT", "Victory", "Victory"): "en la batalla a",
-        
-        # TASK
-        ("TASK", "TaskSet", "DifficultTask"): "una tarea difícil otorgada por",
-        ("TASK", "TaskSolved", "Solution"): "la tarea",
-        
-        # DONOR
-        ("DONOR", "Tested", "Tested"): "por el donante",
-        ("DONOR", "Tested", "Character'sReaction"): "la prueba del donante",
-        ("DONOR", "Tested", "ProvisionOfAMagicalAgent"): "un objeto mágico de",
-        ("DONOR", "UseOfAMagicalAgent", "UseOfAMagicalAgent"): "el objeto mágico",
-        
-        # CALL TO ACTION REWARD
-        ("CALL TO ACTION REWARD", "Call", "CallToAction"): "un llamado a la acción de",
-        ("CALL TO ACTION REWARD", "Reward", "Reward"): "",
-        
-        # RIVALRY
-        ("RIVALRY", "RivalryDeclared", "Rivalry"): "con",
-        ("RIVALRY", "Cooperation", "Cooperation"): "con su rival",
-        ("RIVALRY", "Reconciliation", "Reconciliation"): "con su rival",
-        
-        # PURSUIT
-        ("PURSUIT", "Chase", "Pursuit"): "por",
-        ("PURSUIT", "Escape", "RescueFromPursuit"): "de la persecución",
-        
-        # KIDNAPPING
-        ("KIDNAPPING", "Abduction", "Abduction"): "por",
-        ("KIDNAPPING", "Rescue", "Rescue"): "por",
-        
-        # KIDNAPPING PUNISHMENT
-        ("KIDNAPPING PUNISHMENT", "Kidnapping", "Abduction"): "por",
-        ("KIDNAPPING PUNISHMENT", "Rescue", "Rescue"): "a",
-        ("KIDNAPPING PUNISHMENT", "Punishment", "Punishment"): "por el secuestro",
-        
-        # INTERDICTION VIOLATED
-        ("INTERDICTION VIOLATED", "Interdiction", "Interdiction"): "por",
-        ("INTERDICTION VIOLATED", "Absentation", "Interdiction"): "",
-        ("INTERDICTION VIOLATED", "InterdictionViolated", "Interdiction"): "establecida",
-        
-        # REPENTANCE
-        ("REPENTANCE", "Transformation", "Transformation"): "",
-        ("REPENTANCE", "Repentance", "Repentance"): "",
-        ("REPENTANCE", "RepentanceRewarded", "RepentanceRewarded"): "",
-        
-        # RELENTING GUARDIAN
-        ("RELENTING GUARDIAN", "DesireToJoin", "CoupleWantsToMarry"): "con",
-        ("RELENTING GUARDIAN", "Obstacle", "UnrelentingGuardian"): "por",
-        ("RELENTING GUARDIAN", "Solution", "RelentingGuardian"): "a",
-        ("RELENTING GUARDIAN", "Joining", "Wedding"): "con",
-        
-        # UNRELENTING GUARDIAN
-        ("UNRELENTING GUARDIAN", "DesireToJoin", "CoupleWantsToMarry"): "con",
-        ("UNRELENTING GUARDIAN", "Obstacle", "UnrelentingGuardian"): "por",
-        ("UNRELENTING GUARDIAN", "Solution", "HighStatusRevealed"): "a",
-        ("UNRELENTING GUARDIAN", "Joining", "Wedding"): "con",
-        
-        # SHIFTING LOVE
-        ("SHIFTING LOVE", "FirstMeeting", "BoyMeetsGirl"): "a",
-        ("SHIFTING LOVE", "LoveShift", "LoveShift"): "por",
-        ("SHIFTING LOVE", "Reconciliation", "Reconciliation"): "con",
-        
-        # RAGS 2 RICHES
-        ("RAGS 2 RICHES", "Rags", "Poverty"): "",
-        ("RAGS 2 RICHES", "Aspiration", "Aspiration"): "",
-        ("RAGS 2 RICHES", "Transformation", "Transformation"): "",
-        ("RAGS 2 RICHES", "Riches", "Reward"): "",
-        ("RAGS TO RICHES", "Richness"): "",
-    }
-    return objetos.get((aoi, span, atom), objetos.get((aoi, span), ""))
+    return OBJETOS.get((aoi, span, atom), OBJETOS.get((aoi, span), ""))
+
+
+Clave = Tuple[str, str, str]
+
+# (aoi, span, atom) -> "verbo objeto"; se completa con compilar_gramatica()
+PREDICADOS: Dict[Clave, str] = {}
+_compilada = False
+_compilar_lock = threading.Lock()
+
+
+def _componer_predicado(aoi: str, span: str, atom: str) -> str:
+    obj = objeto(aoi, span, atom)
+    return f"{verbo(aoi, span, atom)} {obj}" if obj else verbo(aoi, span, atom)
+
+
+def compilar_gramatica(aois: Optional[Iterable] = None) -> Dict[Clave, str]:
+    """Precalcula el predicado de cada atom de los AOIs (por defecto, los del registro)."""
+    global _compilada
+    if aois is None:
+        from axis_of_interest.registry import get_aois
+
+        aois = get_aois()
+    with _compilar_lock:
+        for aoi in aois:
+            for span in aoi.plot_spans:
+                for atom in span.plots_atoms:
+                    clave = (aoi.name, span.name, atom.name)
+                    PREDICADOS[clave] = _componer_predicado(*clave)
+        _compilada = True
+    return PREDICADOS
+
+
+def predicado_base(aoi: str, span: str, atom: str) -> str:
+    """Predicado compilado (verbo + objeto) del atom, sin complemento."""
+    clave = (aoi, span, atom)
+    pred = PREDICADOS.get(clave)
+    if pred is None:
+        if not _compilada:
+            compilar_gramatica()
+            pred = PREDICADOS.get(clave)
+        if pred is None:
+            # Atom que no está en el registro: se compila al vuelo
+            pred = PREDICADOS.setdefault(clave, _componer_predicado(*clave))
+    return pred
+
+
+def oracion(aoi: str, span: str, atom: str, nombres: Sequence[str]) -> str:
+    """Oración del atom según cuántos personajes tenga (usa hasta tres)."""
+    pred = predicado_base(aoi, span, atom)
+    if len(nombres) == 1:
+        return f"{nombres[0]} {pred}."
+    if len(nombres) == 2:
+        return f"{nombres[0]} {pred} {nombres[1]}." if nombres[1] else f"{nombres[0]} {pred}."
+    if nombres[2]:
+        return f"{nombres[0]} y {nombres[1]} {pred} {nombres[2]}."
+    return f"{nombres[0]} y {nombres[1]} {pred}."
 
 def interactivon_oracion(aoi: str, span: str, atom: str, heroes: list[str]) -> str:
     """Genera una oración interactiva según el número de héroes."""
@@ -234,4 +294,6 @@ def main():
     print("  ", interactivon_oracion("TASK", "TaskSet", "DifficultTask", ["El héroe", "El compañero", "El mentor"]))
     print("  ", interactivon_oracion("JOURNEY", "Back", "Return", ["Sofía", "JP", "Luis"]))
 
-main()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Cache persistente de las decisiones de intercalado tomadas por un LLM.
+
+La estrategia "llm" de `PlotSchemaGenerator` le pide al modelo un orden para
+los spans de un conjunto de AOIs. Ese orden se guarda direccionado por
+(spans que ve el prompt, versión del prompt, proveedor, modelo), así que la
+misma combinación de AOIs no vuelve a consultar al LLM. Los spans entran con
+su nombre y descripción: si se edita un AOI, la clave cambia.
+
+Por clave se guardan los órdenes distintos que devolvió el modelo con la
+cantidad de veces que los devolvió. Con `top_k > 1` se siguen consultando
+respuestas hasta juntar `top_k` y después se sortea entre los `top_k` órdenes
+más frecuentes, para tener variedad sin volver a pagar la llamada.
+
+Las lecturas se sirven desde memoria; SQLite solo se toca al cargar una clave
+por primera vez y al guardar una respuesta nueva.
+"""
+
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+Order = Tuple[str, ...]
+
+
+def decision_key(
+    spans: Iterable[Mapping[str, str]], prompt_version: str, provider: str, model: str
+) -> str:
+    """Clave de una decisión. `spans` son las entradas del prompt (con "id")."""
+    payload = {
+        "spans": sorted((dict(span) for span in spans), key=lambda span: span["id"]),
+        "prompt": prompt_version,
+        "provider": provider,
+        "model": model,
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def prompt_version(template: str) -> str:
+    """Versión del template del prompt: cambia si cambia su texto."""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+
+def is_valid_order(order: Sequence[str], span_ids: Iterable[str]) -> bool:
+    """El orden cubre exactamente los spans esperados, cada uno una vez."""
+    expected = set(span_ids)
+    return len(order) == len(expected) and set(order) == expected
+
+
+class InterleaveDecisionCache:
+    """Órdenes de spans por clave, en SQLite (":memory:" si no se da un path)."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or ":memory:"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory: Dict[str, Dict[Order, int]] = {}
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS decisions (
+                key TEXT NOT NULL,
+                span_order TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (key, span_order)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _load(self, key: str) -> Dict[Order, int]:
+        orders = self._memory.get(key)
+        if orders is None:
+            rows = self._conn.execute(
+                "SELECT span_order, count FROM decisions WHERE key = ?", (key,)
+            ).fetchall()
+            orders = {tuple(json.loads(order)): count for order, count in rows}
+            self._memory[key] = orders
+        return orders
+
+    def choose(
+        self,
+        key: str,
+        span_ids: Sequence[str],
+        *,
+        top_k: int = 1,
+        rng: Optional[random.Random] = None,
+    ) -> Optional[Order]:
+        """
+        Un orden cacheado válido para `span_ids`, o None si hay que consultar al LLM.
+
+        Con `top_k > 1` devuelve None hasta haber registrado `top_k` respuestas;
+        después sortea (con `rng`) entre los `top_k` órdenes más frecuentes.
+        Los órdenes que no validan contra `span_ids` se descartan.
+        """
+        with self._lock:
+            orders = self._load(key)
+            invalid = [order for order in orders if not is_valid_order(order, span_ids)]
+            for order in invalid:
+                del orders[order]
+                self._conn.execute(
+                    "DELETE FROM decisions WHERE key = ? AND span_order = ?",
+                    (key, json.dumps(order)),
+                )
+            if invalid:
+                self._conn.commit()
+
+            if not orders or sum(orders.values()) < top_k:
+                self.misses += 1
+                return None
+            self.hits += 1
+            ranked = sorted(orders.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            if len(ranked) == 1:
+                return ranked[0][0]
+            return (rng or random).choice(ranked)[0]
+
+    def record(self, key: str, order: Sequence[str]) -> None:
+        """Registra una respuesta del LLM (suma uno si el orden ya estaba)."""
+        order = tuple(order)
+        encoded = json.dumps(order)
+        with self._lock:
+            orders = self._load(key)
+            orders[order] = orders.get(order, 0) + 1
+            self._conn.execute(
+                "INSERT INTO decisions (key, span_order, count, created_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (key, span_order) DO UPDATE SET count = count + 1",
+                (key, encoded, time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            keys, orders = self._conn.execute(
+                "SELECT COUNT(DISTINCT key), COUNT(*) FROM decisions"
+            ).fetchone()
+            total = self.hits + self.misses
+            return {
+                "path": self.path,
+                "keys": keys,
+                "orders": orders,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM decisions")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+__all__ = [
+    "InterleaveDecisionCache",
+    "decision_key",
+    "is_valid_order",
+    "prompt_version",
+]
@@ -0,0 +1,138 @@
+"""
+Espacio de intercalados (interleavings) de los plot spans de varios AOIs.
+
+Un intercalado válido respeta el orden interno de cada AOI, así que queda
+determinado por la secuencia de etiquetas "de qué AOI sale el próximo span":
+con longitudes (2, 1) los intercalados son (0, 0, 1), (0, 1, 0) y (1, 0, 0).
+Hay multinomial(n; n_1, ..., n_k) de ellos.
+
+Todo se hace sobre esas secuencias de etiquetas, en orden lexicográfico:
+contar, enumerar perezosamente, pasar de rango a intercalado (y al revés) y
+muestrear uniformemente sin rechazo (se sortean rangos distintos y se
+"desrankean"), de forma reproducible con una semilla.
+"""
+
+import random
+import sys
+from math import factorial
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+Interleaving = Tuple[int, ...]
+
+
+def count_interleavings(lengths: Sequence[int]) -> int:
+    """Cantidad de intercalados: el multinomial de las longitudes."""
+    total = factorial(sum(lengths))
+    for length in lengths:
+        total //= factorial(length)
+    return total
+
+
+def iter_interleavings(lengths: Sequence[int]) -> Iterator[Interleaving]:
+    """Genera todos los intercalados en orden lexicográfico, sin materializarlos."""
+    remaining = list(lengths)
+    size = sum(remaining)
+    labels = [i for i, length in enumerate(remaining) if length > 0]
+    prefix: List[int] = []
+
+    def walk() -> Iterator[Interleaving]:
+        if len(prefix) == size:
+            yield tuple(prefix)
+            return
+        for label in labels:
+            if remaining[label]:
+                remaining[label] -= 1
+                prefix.append(label)
+                yield from walk()
+                prefix.pop()
+                remaining[label] += 1
+
+    return walk()
+
+
+def unrank_interleaving(lengths: Sequence[int], rank: int) -> Interleaving:
+    """Intercalado número `rank` (0-indexado) en orden lexicográfico."""
+    remaining = list(lengths)
+    size = sum(remaining)
+    count = count_interleavings(remaining)
+    if not 0 <= rank < count:
+        raise ValueError(f"rank {rank} fuera de rango: hay {count} intercalados")
+
+    result = []
+    for left in range(size, 0, -1):
+        for label, length in enumerate(remaining):
+            if not length:
+                continue
+            # Intercalados que empiezan con `label`: count * n_label / n
+            block = count * length // left
+            if rank < block:
+                result.append(label)
+                remaining[label] -= 1
+                count = block
+                break
+            rank -= block
+    return tuple(result)
+
+
+def rank_interleaving(lengths: Sequence[int], interleaving: Sequence[int]) -> int:
+    """Posición (0-indexada) del intercalado en orden lexicográfico."""
+    remaining = list(lengths)
+    if len(interleaving) != sum(remaining):
+        raise ValueError("El intercalado no cubre todos los spans")
+    count = count_interleavings(remaining)
+    rank = 0
+    for left, chosen in zip(range(len(interleaving), 0, -1), interleaving):
+        if not 0 <= chosen < len(remaining) or not remaining[chosen]:
+            raise ValueError(f"Etiqueta inválida en el intercalado: {chosen}")
+        for label in range(chosen):
+            rank += count * remaining[label] // left
+        count = count * remaining[chosen] // left
+        remaining[chosen] -= 1
+    return rank
+
+
+def sample_ranks(
+    lengths: Sequence[int], k: int, seed: Optional[int] = None
+) -> List[int]:
+    """`k` rangos distintos sorteados uniformemente (todos si hay menos de `k`)."""
+    total = count_interleavings(lengths)
+    rng = random.Random(seed)
+    if total <= sys.maxsize:
+        # random.sample sobre un range no lo materializa
+        return rng.sample(range(total), min(k, total))
+    # Espacios más grandes que un índice de Python (p. ej. todos los AOIs):
+    # los rangos se sortean de a uno y solo se descartan repetidos
+    ranks: List[int] = []
+    seen = set()
+    while len(ranks) < k:
+        rank = rng.randrange(total)
+        if rank not in seen:
+            seen.add(rank)
+            ranks.append(rank)
+    return ranks
+
+
+def sample_interleavings(
+    lengths: Sequence[int], k: int, seed: Optional[int] = None
+) -> List[Interleaving]:
+    """`k` intercalados distintos, uniformes y reproducibles con `seed`."""
+    return [unrank_interleaving(lengths, rank) for rank in sample_ranks(lengths, k, seed)]
+
+
+def random_interleaving(lengths: Sequence[int], rng: Optional[random.Random] = None) -> Interleaving:
+    """Un intercalado uniforme: barajar el multiconjunto de etiquetas."""
+    labels = [label for label, length in enumerate(lengths) for _ in range(length)]
+    (rng or random).shuffle(labels)
+    return tuple(labels)
+
+
+__all__ = [
+    "Interleaving",
+    "count_interleavings",
+    "iter_interleavings",
+    "random_interleaving",
+    "rank_interleaving",
+    "sample_interleavings",
+    "sample_ranks",
+    "unrank_interleaving",
+]
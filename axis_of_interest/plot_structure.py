@@ -0,0 +1,339 @@
+"""
+Representación interna e inmutable de la estructura de un Plot Schema.
+
+Los AOIs del registro se convierten una sola vez a plantillas congeladas
+(`AoiTemplate`, `SpanTemplate`, `AtomTemplate`) que comparten todos los
+schemas. Un schema generado (`SchemaStructure`) es una tupla de referencias a
+esas plantillas, y asignar personajes produce un `BoundSchema`: la estructura
+más un mapeo rol → nombre por span, sin copiar el árbol.
+
+Los modelos Pydantic (`PlotSchema`) se materializan solo en el borde, con
+`BoundSchema.to_plot_schema()`; `model_dump()` arma directamente el mismo dict
+que `PlotSchema.model_dump()`. `BoundSchema.plots_span` expone vistas livianas
+con los mismos atributos que `PlotSpan`/`PlotAtom`, así el código que recorre
+un `PlotSchema` (p. ej. `generate_text`) funciona igual con un `BoundSchema`.
+"""
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+
+from axis_of_interest.schemas import AxisOfInterest, PlotSchema
+
+_EMPTY: Mapping[str, str] = MappingProxyType({})
+
+
+def _frozen_map(values: Optional[Mapping[str, str]]) -> Mapping[str, str]:
+    return MappingProxyType(dict(values)) if values else _EMPTY
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class AtomTemplate:
+    name: str
+    description: str
+    characters: Mapping[str, str]  # rol -> placeholder
+    objects: Mapping[str, str]
+
+    @classmethod
+    def from_plot_atom(cls, atom: Any) -> "AtomTemplate":
+        return cls(
+            name=atom.name,
+            description=atom.description,
+            characters=_frozen_map(atom.characters),
+            objects=_frozen_map(atom.objects),
+        )
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class SpanTemplate:
+    axis_of_interest: str
+    name: str
+    description: str
+    plots_atoms: Tuple[AtomTemplate, ...]
+    roles: Tuple[str, ...]  # roles de los atoms, en orden de aparición
+
+    @classmethod
+    def from_plot_span(cls, span: Any) -> "SpanTemplate":
+        atoms = tuple(AtomTemplate.from_plot_atom(atom) for atom in span.plots_atoms)
+        roles = tuple(dict.fromkeys(role for atom in atoms for role in atom.characters))
+        return cls(
+            axis_of_interest=span.axis_of_interest,
+            name=span.name,
+            description=span.description,
+            plots_atoms=atoms,
+            roles=roles,
+        )
+
+
+Positions = Tuple[Tuple[int, int], ...]  # (índice de span, índice de atom)
+
+
+def _role_positions(spans: Tuple[SpanTemplate, ...]) -> Mapping[str, Positions]:
+    positions: Dict[str, list] = {}
+    for span_index, span in enumerate(spans):
+        for atom_index, atom in enumerate(span.plots_atoms):
+            for role in atom.characters:
+                positions.setdefault(role, []).append((span_index, atom_index))
+    return MappingProxyType({role: tuple(found) for role, found in positions.items()})
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class AoiTemplate:
+    id: str
+    name: str
+    protagonist_role: str
+    roles: Tuple[str, ...]
+    plot_spans: Tuple[SpanTemplate, ...]
+    role_atoms: Mapping[str, Positions]  # rol -> atoms (de plot_spans) donde aparece
+
+    @classmethod
+    def from_aoi(cls, aoi: AxisOfInterest) -> "AoiTemplate":
+        spans = tuple(SpanTemplate.from_plot_span(span) for span in aoi.plot_spans)
+        return cls(
+            id=aoi.id,
+            name=aoi.name,
+            protagonist_role=aoi.protagonist_role,
+            roles=tuple(aoi.roles),
+            plot_spans=spans,
+            role_atoms=_role_positions(spans),
+        )
+
+
+# id(aoi) -> (aoi, plantilla). Se guarda el AOI para que su id no se reutilice.
+_TEMPLATES: Dict[int, Tuple[AxisOfInterest, AoiTemplate]] = {}
+
+
+def aoi_template(aoi: AxisOfInterest) -> AoiTemplate:
+    """Plantilla congelada del AOI, construida una única vez por instancia."""
+    cached = _TEMPLATES.get(id(aoi))
+    if cached is not None and cached[0] is aoi:
+        return cached[1]
+    template = AoiTemplate.from_aoi(aoi)
+    _TEMPLATES[id(aoi)] = (aoi, template)
+    return template
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class SchemaStructure:
+    """Schema sin personajes asignados: metadatos + spans compartidos.
+
+    Al construirse indexa, una sola vez, qué spans pertenece a cada AOI y en
+    qué atoms aparece cada rol, para que asignar o cambiar un personaje no
+    tenga que recorrer el schema completo.
+    """
+
+    id: str
+    name: str
+    description: str
+    spans: Tuple[SpanTemplate, ...]
+    aoi_spans: Mapping[str, Tuple[int, ...]] = field(init=False, repr=False)
+    role_atoms: Mapping[Tuple[str, str], Positions] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        aoi_spans: Dict[str, list] = {}
+        for index, span in enumerate(self.spans):
+            aoi_spans.setdefault(span.axis_of_interest, []).append(index)
+        by_role = _role_positions(self.spans)
+        role_atoms: Dict[Tuple[str, str], list] = {}
+        for role, positions in by_role.items():
+            for span_index, atom_index in positions:
+                key = (self.spans[span_index].axis_of_interest, role)
+                role_atoms.setdefault(key, []).append((span_index, atom_index))
+        object.__setattr__(
+            self, "aoi_spans", MappingProxyType({k: tuple(v) for k, v in aoi_spans.items()})
+        )
+        object.__setattr__(
+            self, "role_atoms", MappingProxyType({k: tuple(v) for k, v in role_atoms.items()})
+        )
+
+    @classmethod
+    def from_plot_schema(cls, schema: Union[PlotSchema, "BoundSchema"]) -> "SchemaStructure":
+        """Estructura a partir de un schema ya materializado (toma sus personajes como placeholders)."""
+        return cls(
+            id=schema.id,
+            name=schema.name,
+            description=schema.description,
+            spans=tuple(SpanTemplate.from_plot_span(span) for span in schema.plots_span),
+        )
+
+    def bind(
+        self,
+        bindings: Optional[Tuple[Mapping[str, str], ...]] = None,
+        *,
+        by_placeholder: bool = False,
+    ) -> "BoundSchema":
+        return BoundSchema(self, bindings, by_placeholder)
+
+    def bind_aois(
+        self, bindings_by_aoi: Mapping[str, Mapping[str, str]], *, by_placeholder: bool = False
+    ) -> "BoundSchema":
+        """Un mismo mapeo para todos los spans de cada AOI (los AOIs sin mapeo quedan con sus roles)."""
+        return BoundSchema(
+            self,
+            tuple(bindings_by_aoi.get(span.axis_of_interest, _EMPTY) for span in self.spans),
+            by_placeholder,
+        )
+
+    def model_dump(self) -> dict:
+        return self.bind().model_dump()
+
+    def to_plot_schema(self) -> PlotSchema:
+        return self.bind().to_plot_schema()
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class BoundAtom:
+    name: str
+    characters: Dict[str, str]
+    objects: Mapping[str, str]
+    description: str
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class BoundSpan:
+    axis_of_interest: str
+    name: str
+    description: str
+    plots_atoms: Tuple[BoundAtom, ...]
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class BoundSchema:
+    """Estructura + personajes asignados como overlay (un mapeo por span).
+
+    Sin `bindings` los atoms conservan sus placeholders. Con `by_placeholder`
+    el mapeo traduce placeholder → nombre; si no, rol → nombre (y un rol sin
+    nombre asignado queda con el nombre del rol).
+    """
+
+    structure: SchemaStructure
+    bindings: Optional[Tuple[Mapping[str, str], ...]] = None
+    by_placeholder: bool = False
+
+    @property
+    def id(self) -> str:
+        return self.structure.id
+
+    @property
+    def name(self) -> str:
+        return self.structure.name
+
+    @property
+    def description(self) -> str:
+        return self.structure.description
+
+    def characters_for(self, span_index: int, atom: AtomTemplate) -> Dict[str, str]:
+        if self.bindings is None:
+            return dict(atom.characters)
+        binding = self.bindings[span_index]
+        if self.by_placeholder:
+            return {role: binding[placeholder] for role, placeholder in atom.characters.items()}
+        return {role: binding.get(role, role) for role in atom.characters}
+
+    def atom(self, span_index: int, atom_index: int) -> BoundAtom:
+        """Materializa un único atom (sin armar el resto de plots_span)."""
+        span = self.structure.spans[span_index]
+        template = span.plots_atoms[atom_index]
+        return BoundAtom(
+            name=template.name,
+            characters=self.characters_for(span_index, template),
+            objects=template.objects,
+            description=template.description,
+        )
+
+    def atoms_with_role(self, aoi_name: str, role: str) -> Tuple[BoundAtom, ...]:
+        """Atoms del AOI en los que aparece el rol, vía el índice de la estructura."""
+        return tuple(
+            self.atom(span_index, atom_index)
+            for span_index, atom_index in self.structure.role_atoms.get((aoi_name, role), ())
+        )
+
+    def with_role(self, aoi_name: str, role: str, name: str) -> "BoundSchema":
+        """Nuevo BoundSchema con `role` → `name` en todos los spans del AOI.
+
+        Solo se reemplazan los mapeos de los spans de ese AOI; el resto se comparte.
+        """
+        if self.bindings is None or self.by_placeholder:
+            raise ValueError("with_role requiere un BoundSchema con personajes asignados por rol")
+        span_indexes = self.structure.aoi_spans.get(aoi_name)
+        if not span_indexes:
+            raise ValueError(f"El schema no contiene el AOI: {aoi_name}")
+        bindings = list(self.bindings)
+        replaced: Dict[int, Mapping[str, str]] = {}
+        for index in span_indexes:
+            # Los spans de un AOI suelen compartir el mismo mapeo: se copia una vez
+            key = id(bindings[index])
+            if key not in replaced:
+                replaced[key] = MappingProxyType({**bindings[index], role: name})
+            bindings[index] = replaced[key]
+        return BoundSchema(self.structure, tuple(bindings), False)
+
+    def names_for(self, span_index: int, atom: AtomTemplate) -> Tuple[str, ...]:
+        """Nombres de los personajes del atom, en el orden de sus roles."""
+        if self.bindings is None:
+            return tuple(atom.characters.values())
+        binding = self.bindings[span_index]
+        if self.by_placeholder:
+            return tuple(binding[placeholder] for placeholder in atom.characters.values())
+        return tuple(binding.get(role, role) for role in atom.characters)
+
+    @property
+    def plots_span(self) -> Tuple[BoundSpan, ...]:
+        return tuple(
+            BoundSpan(
+                axis_of_interest=span.axis_of_interest,
+                name=span.name,
+                description=span.description,
+                plots_atoms=tuple(
+                    BoundAtom(
+                        name=atom.name,
+                        characters=self.characters_for(index, atom),
+                        objects=atom.objects,
+                        description=atom.description,
+                    )
+                    for atom in span.plots_atoms
+                ),
+            )
+            for index, span in enumerate(self.structure.spans)
+        )
+
+    def model_dump(self) -> dict:
+        """Mismo dict (y orden de claves) que `PlotSchema.model_dump()`."""
+        return {
+            "id": self.structure.id,
+            "name": self.structure.name,
+            "description": self.structure.description,
+            "plots_span": [
+                {
+                    "axis_of_interest": span.axis_of_interest,
+                    "name": span.name,
+                    "description": span.description,
+                    "plots_atoms": [
+                        {
+                            "name": atom.name,
+                            "characters": self.characters_for(index, atom),
+                            "objects": dict(atom.objects),
+                            "description": atom.description,
+                        }
+                        for atom in span.plots_atoms
+                    ],
+                }
+                for index, span in enumerate(self.structure.spans)
+            ],
+        }
+
+    def to_plot_schema(self) -> PlotSchema:
+        """Materializa el `PlotSchema` de Pydantic (para el borde de la API)."""
+        return PlotSchema.model_validate(self.model_dump())
+
+
+__all__ = [
+    "AoiTemplate",
+    "AtomTemplate",
+    "BoundAtom",
+    "BoundSchema",
+    "BoundSpan",
+    "SchemaStructure",
+    "SpanTemplate",
+    "aoi_template",
+]
@@ -1,21 +1,58 @@
 """Registro que carga los AOIs disponibles.
 
-Caraga instancias de AxisOfInterest desde el paquete axis_of_interest.all_aoi y expone
-list_of_aoi e indice_aoi para los consumidores.
+Carga instancias de AxisOfInterest y expone list_of_aoi e indice_aoi para los
+consumidores. Los AOIs se leen del catálogo precompilado (`aoi_catalog.json`,
+ver `scripts/build_aoi_catalog.py`); solo si falta o su versión no coincide con
+el hash de las fuentes de axis_of_interest.all_aoi se descubren importando esos
+módulos. La carga es perezosa: ocurre al primer acceso a list_of_aoi,
+indice_aoi o get_aois().
 """
 
 from __future__ import annotations
 
-import importlib
-import pkgutil
-from typing import List
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 from axis_of_interest.schemas import AxisOfInterest
 import axis_of_interest.all_aoi as _all_aoi_pkg
 
+logger = logging.getLogger(__name__)
+
+CATALOG_FORMAT = 1
+DEFAULT_CATALOG_PATH = Path(
+    os.getenv("AOI_CATALOG_PATH", str(Path(__file__).resolve().parent / "aoi_catalog.json"))
+)
+
+_SCHEMAS_SOURCE = Path(__file__).parent / "schemas.py"
+
+_lock = threading.Lock()
+_aois: Optional[List[AxisOfInterest]] = None
+_index: Optional[Dict[str, int]] = None
+
+
+def sources_version() -> str:
+    """Hash del contenido de los módulos de all_aoi (y de schemas.py)."""
+    digest = hashlib.sha256(f"format={CATALOG_FORMAT}".encode())
+    paths = sorted(Path(p) for p in Path(_all_aoi_pkg.__path__[0]).glob("*.py"))
+    for path in [_SCHEMAS_SOURCE, *paths]:
+        digest.update(path.name.encode())
+        # Sin \r para que un checkout con CRLF no invalide el catálogo
+        digest.update(path.read_bytes().replace(b"\r\n", b"\n"))
+    return digest.hexdigest()[:16]
+
 
 def _discover_all_aoi() -> List[AxisOfInterest]:
+    # Solo se importan si hace falta descubrir (catálogo ausente o desactualizado)
+    import importlib
+    import pkgutil
+
     aoi_list: List[AxisOfInterest] = []
+    seen_ids: set[str] = set()
     try:
         for _finder, _name, _ispkg in pkgutil.iter_modules(_all_aoi_pkg.__path__):
             try:
@@ -23,20 +60,77 @@ def _discover_all_aoi() -> List[AxisOfInterest]:
             except Exception:
                 continue
 
-            for attr in dir(mod):
-                if attr.endswith("_aoi"):
-                    obj = getattr(mod, attr)
-                    try:
-                        if isinstance(obj, AxisOfInterest) and obj not in aoi_list:
-                            aoi_list.append(obj)
-                    except Exception:
-                        if obj not in aoi_list:
-                            aoi_list.append(obj)
+            for attr, obj in vars(mod).items():
+                if attr.endswith("_aoi") and isinstance(obj, AxisOfInterest):
+                    if obj.id not in seen_ids:
+                        seen_ids.add(obj.id)
+                        aoi_list.append(obj)
     except Exception:
         return []
 
     return aoi_list
 
 
-list_of_aoi = _discover_all_aoi()
-indice_aoi = {a.name: i for i, a in enumerate(list_of_aoi)}
+def build_catalog(path: Path = DEFAULT_CATALOG_PATH) -> dict:
+    """Descubre los AOIs y escribe el catálogo en `path`."""
+    catalog = {
+        "format": CATALOG_FORMAT,
+        "version": sources_version(),
+        "aois": [aoi.model_dump() for aoi in _discover_all_aoi()],
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(
+        json.dumps(catalog, ensure_ascii=False, separators=(",", ":")), encoding="utf-8"
+    )
+    tmp_path.replace(path)
+    return catalog
+
+
+def _load_catalog(path: Path) -> Optional[List[AxisOfInterest]]:
+    """AOIs del catálogo, o None si falta, está dañado o quedó desactualizado."""
+    try:
+        catalog = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as err:
+        logger.warning("Catálogo de AOIs ilegible (%s): %s", path, err)
+        return None
+
+    if catalog.get("format") != CATALOG_FORMAT or catalog.get("version") != sources_version():
+        logger.info(
+            "Catálogo de AOIs desactualizado; se descubren desde las fuentes "
+            "(regenerar con python -m scripts.build_aoi_catalog)"
+        )
+        return None
+    return [AxisOfInterest.model_validate(item) for item in catalog["aois"]]
+
+
+def _load() -> Tuple[List[AxisOfInterest], Dict[str, int]]:
+    global _aois, _index
+    if _aois is None or _index is None:
+        with _lock:
+            if _aois is None or _index is None:
+                aois = _load_catalog(DEFAULT_CATALOG_PATH)
+                if aois is None:
+                    aois = _discover_all_aoi()
+                _index = {a.name: i for i, a in enumerate(aois)}
+                _aois = aois
+    return _aois, _index
+
+
+def get_aois() -> List[AxisOfInterest]:
+    return _load()[0]
+
+
+def get_aoi_index() -> Dict[str, int]:
+    return _load()[1]
+
+
+def __getattr__(name: str):
+    if name == "list_of_aoi":
+        return get_aois()
+    if name == "indice_aoi":
+        return get_aoi_index()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,183 @@
+"""
+Generación masiva de Plot Schemas para barridos de experimentos.
+
+`SchemaGrid` describe la grilla: conjuntos de AOIs (explícitos o todas las
+combinaciones de un pool) × estrategias × variantes × elencos.
+`generate_schemas_bulk` la recorre perezosamente y produce un `BulkSchema` por
+celda; `write_schemas_jsonl` los escribe a medida que se generan, sin
+acumularlos en memoria.
+
+Cada (AOIs, estrategia, variante) se genera una sola vez y se reutiliza para
+todos los elencos; su id (`schema_<aois>_<estrategia>_<variante>`) no se repite
+en el barrido. La búsqueda de AOIs y las plantillas de spans son las del
+generador (por defecto, el compartido del proceso).
+"""
+
+import itertools
+import json
+import random
+from dataclasses import dataclass
+from typing import IO, Any, Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple, Union
+
+from axis_of_interest.character_assigner import CharacterNameAssigner
+from axis_of_interest.plot_structure import BoundSchema, SchemaStructure
+from axis_of_interest.schema_generator import (
+    DETERMINISTIC_STRATEGIES,
+    PlotSchemaGenerator,
+    get_schema_generator,
+)
+
+# Estrategias que producen varios schemas distintos por conjunto de AOIs
+SAMPLED_STRATEGIES = frozenset({"random", "uniform", "llm"})
+
+
+@dataclass
+class SchemaGrid:
+    """
+    Grilla de un barrido.
+
+    Args:
+        aoi_sets: Conjuntos de AOIs explícitos (ej: [["JOURNEY", "CONFLICT"]])
+        aoi_pool: AOIs a combinar entre sí, en tamaños `set_sizes`
+        set_sizes: Tamaños de las combinaciones de `aoi_pool` (ej: [2, 3])
+        strategies: Estrategias de intercalado a usar
+        variants: Schemas por conjunto para "enumerate" (los primeros en orden
+            lexicográfico), "uniform" (distintos), "random" y "llm". Las
+            estrategias deterministas producen siempre uno.
+        casts: Elencos (listas de nombres). Vacío: los schemas quedan con los roles.
+        allow_reuse: Igual que en `CharacterNameAssigner.bind_names`
+        seed: Semilla de todo el barrido (sorteos de intercalado y de elenco)
+    """
+
+    aoi_sets: Sequence[Sequence[str]] = ()
+    aoi_pool: Sequence[str] = ()
+    set_sizes: Sequence[int] = ()
+    strategies: Sequence[str] = ("sequential",)
+    variants: int = 1
+    casts: Sequence[Sequence[str]] = ()
+    allow_reuse: bool = True
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "SchemaGrid":
+        unknown = set(spec) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"Campos desconocidos en la grilla: {sorted(unknown)}")
+        return cls(**spec)
+
+    def aoi_combinations(self) -> Iterator[Tuple[str, ...]]:
+        """Conjuntos de AOIs de la grilla, sin repetir."""
+        seen = set()
+        combos = itertools.chain(
+            (tuple(names) for names in self.aoi_sets),
+            *(itertools.combinations(self.aoi_pool, size) for size in self.set_sizes),
+        )
+        for combo in combos:
+            if combo not in seen:
+                seen.add(combo)
+                yield combo
+
+
+class BulkSchema(NamedTuple):
+    position: int  # orden en el barrido
+    aoi_names: Tuple[str, ...]
+    strategy: str
+    variant: int
+    cast: Optional[int]  # índice en SchemaGrid.casts
+    schema: BoundSchema
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "position": self.position,
+            "aoi_names": list(self.aoi_names),
+            "strategy": self.strategy,
+            "variant": self.variant,
+            "cast": self.cast,
+            "schema": self.schema.model_dump(),
+        }
+
+
+def _structures(
+    generator: PlotSchemaGenerator,
+    aoi_names: Tuple[str, ...],
+    strategy: str,
+    variants: int,
+    rng: random.Random,
+) -> Iterator[SchemaStructure]:
+    schema_name = f"{' + '.join(aoi_names)} ({strategy})"
+    base_id = f"schema_{'_'.join(name.lower() for name in aoi_names)}_{strategy}"
+    if strategy in DETERMINISTIC_STRATEGIES and strategy != "enumerate":
+        yield generator.generate_structure(
+            schema_name, list(aoi_names), strategy, schema_id=f"{base_id}_0", cache=False
+        )
+    elif strategy in ("enumerate", "uniform"):
+        # La variante es el rango del intercalado: distinto en cada schema
+        yield from generator.generate_structures(
+            schema_name, list(aoi_names), strategy, limit=variants,
+            seed=rng.randrange(2**32), schema_id=base_id,
+        )
+    elif strategy in SAMPLED_STRATEGIES:
+        for variant in range(variants):
+            yield generator.generate_structure(
+                schema_name, list(aoi_names), strategy, schema_id=f"{base_id}_{variant}",
+                variant=rng.randrange(2**32), cache=False,
+            )
+    else:
+        # Mismo error que el generador para una estrategia desconocida
+        yield generator.generate_structure(schema_name, list(aoi_names), strategy)
+
+
+def generate_schemas_bulk(
+    grid: SchemaGrid,
+    generator: Optional[PlotSchemaGenerator] = None,
+) -> Iterator[BulkSchema]:
+    """
+    Recorre la grilla y produce los schemas de a uno (con personajes asignados
+    si la grilla tiene elencos). Es reproducible si `grid.seed` está definido.
+
+    Ejemplo:
+        grid = SchemaGrid(aoi_pool=["JOURNEY", "CONFLICT", "TASK"], set_sizes=[2],
+                          strategies=["sequential", "uniform"], variants=5,
+                          casts=[["Ana", "Luis", "Sofía"]], seed=0)
+        write_schemas_jsonl(generate_schemas_bulk(grid), "data/schemas.jsonl")
+    """
+    generator = generator or get_schema_generator()
+    rng = random.Random(grid.seed)
+    assigner = CharacterNameAssigner(seed=grid.seed)
+    casts = [list(cast) for cast in grid.casts]
+    position = 0
+    for aoi_names in grid.aoi_combinations():
+        for strategy in grid.strategies:
+            for variant, structure in enumerate(
+                _structures(generator, aoi_names, strategy, grid.variants, rng)
+            ):
+                if not casts:
+                    yield BulkSchema(position, aoi_names, strategy, variant, None, structure.bind())
+                    position += 1
+                    continue
+                for cast_index, cast in enumerate(casts):
+                    bound = assigner.bind_names(structure, cast, allow_reuse=grid.allow_reuse)
+                    yield BulkSchema(position, aoi_names, strategy, variant, cast_index, bound)
+                    position += 1
+
+
+def write_schemas_jsonl(items: Iterable[BulkSchema], out: Union[str, IO[str]]) -> int:
+    """Escribe un registro JSON por schema. Devuelve cuántos escribió."""
+    if isinstance(out, str):
+        with open(out, "w", encoding="utf-8") as f:
+            return write_schemas_jsonl(items, f)
+    count = 0
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    for item in items:
+        out.write(dumps(item.to_record()))
+        out.write("\n")
+        count += 1
+    return count
+
+
+__all__ = [
+    "BulkSchema",
+    "SchemaGrid",
+    "generate_schemas_bulk",
+    "write_schemas_jsonl",
+]
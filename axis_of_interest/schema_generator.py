@@ -4,14 +4,47 @@ Permite combinar e intercalar plot spans de diferentes AOIs para crear narrativa
 """
 
 import json
+import os
 import random
-from typing import List, Optional
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from axis_of_interest.schemas import AxisOfInterest, PlotSchema, PlotSpan
+from axis_of_interest.plot_structure import (
+    AoiTemplate,
+    SchemaStructure,
+    SpanTemplate,
+    aoi_template,
+)
 from axis_of_interest.registry import list_of_aoi
+from axis_of_interest.interleave_cache import (
+    InterleaveDecisionCache,
+    decision_key,
+    prompt_version,
+)
+from axis_of_interest.interleavings import (
+    count_interleavings,
+    iter_interleavings,
+    random_interleaving,
+    rank_interleaving,
+    sample_ranks,
+    unrank_interleaving,
+)
 from axis_of_interest.prompts import template_prompt_interleave_llm
 from axis_of_interest.utils import build_client_by_provider
+from infrastructure.llm_client.metrics import llm_caller
+from infrastructure.llm_client.structured import extract_json
 from config import Settings
 
+# Estrategias cuyo resultado depende solo de los AOIs elegidos (y de `variant`): se memoizan
+DETERMINISTIC_STRATEGIES = frozenset({"sequential", "round_robin", "parallel", "enumerate"})
+STRATEGIES = ("sequential", "round_robin", "parallel", "random", "enumerate", "uniform", "llm")
+SCHEMA_CACHE_SIZE = int(os.getenv("PLOT_SCHEMA_CACHE_SIZE", "256"))
+# Decisiones de la estrategia "llm": SQLite persistente si se define el path (si no, en memoria)
+INTERLEAVE_CACHE_PATH = os.getenv("INTERLEAVE_CACHE_PATH")
+INTERLEAVE_LLM_TOP_K = int(os.getenv("INTERLEAVE_LLM_TOP_K", "1"))
+INTERLEAVE_PROMPT_VERSION = prompt_version(template_prompt_interleave_llm)
+
 
 class PlotSchemaGenerator:
     """
@@ -28,15 +61,52 @@ class PlotSchemaGenerator:
         )
     """
 
-    def __init__(self, available_aois: Optional[List[AxisOfInterest]] = None):
+    def __init__(
+        self,
+        available_aois: Optional[List[AxisOfInterest]] = None,
+        cache_size: int = SCHEMA_CACHE_SIZE,
+        decision_cache: Optional[InterleaveDecisionCache] = None,
+        llm_top_k: int = INTERLEAVE_LLM_TOP_K,
+    ):
         """
         Inicializa el generador con una lista de AOIs disponibles.
 
         Args:
             available_aois: Lista de AOIs disponibles. Si no se proporciona, usa todos los AOIs definidos.
+            cache_size: Cantidad de estructuras memoizadas para las estrategias
+                deterministas (sequential, round_robin, parallel, enumerate). 0 desactiva el cache.
+            decision_cache: Cache de órdenes decididos por el LLM (estrategia "llm").
+                Por defecto uno en INTERLEAVE_CACHE_PATH, o en memoria si no está definido.
+            llm_top_k: Cantidad de órdenes cacheados entre los que se sortea (1 = siempre el más frecuente)
         """
         self.available_aois = available_aois or list_of_aoi
         self.aoi_index = {aoi.name: aoi for aoi in self.available_aois}
+        self.llm_top_k = llm_top_k
+        self._decision_cache = decision_cache
+        self._settings: Optional[Settings] = None
+        self._llm_clients: Dict[str, object] = {}
+        self._llm_lock = threading.Lock()
+        # Las estructuras son inmutables y los personajes se asignan como
+        # overlay, así que el mismo resultado se puede compartir entre pedidos.
+        self._cached_structure = lru_cache(maxsize=cache_size)(self._build_structure)
+
+    @property
+    def decision_cache(self) -> InterleaveDecisionCache:
+        with self._llm_lock:
+            if self._decision_cache is None:
+                self._decision_cache = InterleaveDecisionCache(INTERLEAVE_CACHE_PATH)
+            return self._decision_cache
+
+    def _llm_client(self, provider: str):
+        """Cliente del proveedor, construido una vez por generador."""
+        with self._llm_lock:
+            client = self._llm_clients.get(provider)
+            if client is None:
+                if self._settings is None:
+                    self._settings = Settings()
+                client = build_client_by_provider(provider, self._settings)
+                self._llm_clients[provider] = client
+            return client
 
     def get_aoi_by_name(self, name: str) -> Optional[AxisOfInterest]:
         """Obtiene un AOI por su nombre."""
@@ -50,9 +120,39 @@ class PlotSchemaGenerator:
         llm_provider: Optional[str] = None,
         schema_description: Optional[str] = None,
         schema_id: Optional[str] = None,
+        variant: Optional[int] = None,
     ) -> PlotSchema:
         """
-        Genera un PlotSchema intercalando los plot spans de los AOIs especificados.
+        Genera un PlotSchema (modelo Pydantic) intercalando los plot spans de los AOIs.
+
+        Mismos argumentos que `generate_structure`; materializa su resultado.
+        """
+        return self.generate_structure(
+            schema_name=schema_name,
+            aoi_names=aoi_names,
+            interleaving_strategy=interleaving_strategy,
+            llm_provider=llm_provider,
+            schema_description=schema_description,
+            schema_id=schema_id,
+            variant=variant,
+        ).to_plot_schema()
+
+    def generate_structure(
+        self,
+        schema_name: str,
+        aoi_names: List[str],
+        interleaving_strategy: str = "sequential",
+        llm_provider: Optional[str] = None,
+        schema_description: Optional[str] = None,
+        schema_id: Optional[str] = None,
+        variant: Optional[int] = None,
+        cache: bool = True,
+    ) -> SchemaStructure:
+        """
+        Genera la estructura inmutable del schema intercalando los plot spans de los AOIs.
+
+        Los spans son las plantillas compartidas de cada AOI (no se copian); los
+        personajes se asignan después como overlay con `CharacterNameAssigner.bind_*`.
 
         Args:
             schema_name: Nombre del schema a generar
@@ -62,26 +162,63 @@ class PlotSchemaGenerator:
                 - "round_robin": Intercala spans tomando uno de cada AOI en orden circular
                 - "parallel": Agrupa spans por índice (primer span de cada AOI, luego segundo, etc.)
                 - "random": Elige aleatoriamente entre los AOIs, respetando el orden interno de cada uno
+                - "enumerate": El intercalado número `variant` (orden lexicográfico; 0 = sequential)
+                - "uniform": Un intercalado válido sorteado uniformemente (semilla: `variant`)
                 - "llm": Consulta a un LLM para decidir el orden completo de los spans
+                  (las decisiones se cachean por conjunto de spans, prompt, proveedor y modelo)
             llm_provider: Proveedor de LLM (si la estrategia es "llm"). Si es None, usa Settings().default_provider
             schema_description: Descripción opcional del schema
             schema_id: ID opcional del schema (se genera automáticamente si no se proporciona)
+            variant: Para "enumerate", el índice del intercalado (módulo la cantidad total);
+                para "random", "uniform" y "llm", la semilla del sorteo. Las demás estrategias lo ignoran.
+            cache: False evita el cache de estructuras (p. ej. en barridos masivos que no se repiten)
 
         Returns:
-            PlotSchema con los plot spans intercalados
+            SchemaStructure con los plot spans intercalados
 
         Raises:
             ValueError: Si algún AOI no existe
         """
-        # Validar que todos los AOIs existen
-        selected_aois = []
-        for aoi_name in aoi_names:
-            aoi = self.get_aoi_by_name(aoi_name)
-            if not aoi:
-                raise ValueError(
-                    f"AOI '{aoi_name}' no encontrado. AOIs disponibles: {list(self.aoi_index.keys())}"
-                )
-            selected_aois.append(aoi)
+        if cache and interleaving_strategy in DETERMINISTIC_STRATEGIES:
+            # El proveedor no influye en estas estrategias: no fragmenta el cache
+            return self._cached_structure(
+                schema_name,
+                tuple(aoi_names),
+                interleaving_strategy,
+                None,
+                schema_description,
+                schema_id,
+                (variant or 0) if interleaving_strategy == "enumerate" else None,
+            )
+        return self._build_structure(
+            schema_name,
+            tuple(aoi_names),
+            interleaving_strategy,
+            llm_provider,
+            schema_description,
+            schema_id,
+            variant,
+        )
+
+    def cache_info(self):
+        """Estadísticas del cache de estructuras (hits, misses, tamaño)."""
+        return self._cached_structure.cache_info()
+
+    def clear_cache(self) -> None:
+        self._cached_structure.cache_clear()
+
+    def _build_structure(
+        self,
+        schema_name: str,
+        aoi_names: Tuple[str, ...],
+        interleaving_strategy: str,
+        llm_provider: Optional[str],
+        schema_description: Optional[str],
+        schema_id: Optional[str],
+        variant: Optional[int] = None,
+    ) -> SchemaStructure:
+        selected_aois = self._select_aois(aoi_names)
+        rank = None
 
         # Intercalar plot spans según la estrategia
         if interleaving_strategy == "sequential":
@@ -91,20 +228,37 @@ class PlotSchemaGenerator:
         elif interleaving_strategy == "parallel":
             interleaved_spans = self._interleave_parallel(selected_aois)
         elif interleaving_strategy == "random":
-            interleaved_spans = self._interleave_random(selected_aois)
+            interleaved_spans = self._interleave_random(
+                selected_aois, random.Random(variant) if variant is not None else None
+            )
+        elif interleaving_strategy == "enumerate":
+            lengths = [len(aoi.plot_spans) for aoi in selected_aois]
+            rank = (variant or 0) % count_interleavings(lengths)
+            interleaved_spans = self._interleave_labels(
+                selected_aois, unrank_interleaving(lengths, rank)
+            )
+        elif interleaving_strategy == "uniform":
+            lengths = [len(aoi.plot_spans) for aoi in selected_aois]
+            rng = random.Random(variant) if variant is not None else None
+            labels = random_interleaving(lengths, rng)
+            rank = rank_interleaving(lengths, labels)
+            interleaved_spans = self._interleave_labels(selected_aois, labels)
         elif interleaving_strategy == "llm":
             interleaved_spans = self._interleave_llm(
-                selected_aois, provider=llm_provider
+                selected_aois, provider=llm_provider, variant=variant
             )
         else:
             raise ValueError(
                 f"Estrategia '{interleaving_strategy}' no reconocida. "
-                f"Usa: 'sequential', 'round_robin', 'parallel', 'random', o 'llm'"
+                f"Usa: {', '.join(repr(name) for name in STRATEGIES)}"
             )
 
         # Generar ID si no se proporciona
         if not schema_id:
             schema_id = f"schema_{'_'.join(aoi_name.lower() for aoi_name in aoi_names)}"
+            if rank is not None:
+                # Identifica el intercalado: distintas variantes no comparten id
+                schema_id = f"{schema_id}_{rank}"
 
         # Generar descripción si no se proporciona
         if not schema_description:
@@ -114,25 +268,105 @@ class PlotSchemaGenerator:
                 f"usando estrategia '{interleaving_strategy}'"
             )
 
-        return PlotSchema(
+        return SchemaStructure(
             id=schema_id,
             name=schema_name,
             description=schema_description,
-            plots_span=interleaved_spans,
+            spans=tuple(interleaved_spans),
         )
 
-    def _interleave_sequential(self, aois: List[AxisOfInterest]) -> List[PlotSpan]:
+    def _select_aois(self, aoi_names: Tuple[str, ...]) -> List[AoiTemplate]:
+        # Validar que todos los AOIs existen
+        selected_aois = []
+        for aoi_name in aoi_names:
+            aoi = self.get_aoi_by_name(aoi_name)
+            if not aoi:
+                raise ValueError(
+                    f"AOI '{aoi_name}' no encontrado. AOIs disponibles: {list(self.aoi_index.keys())}"
+                )
+            selected_aois.append(aoi_template(aoi))
+        return selected_aois
+
+    def count_interleavings(self, aoi_names: List[str]) -> int:
+        """Cantidad de intercalados válidos (respetando el orden interno de cada AOI)."""
+        return count_interleavings([len(aoi.plot_spans) for aoi in self._select_aois(tuple(aoi_names))])
+
+    def generate_structures(
+        self,
+        schema_name: str,
+        aoi_names: List[str],
+        interleaving_strategy: str = "enumerate",
+        limit: Optional[int] = None,
+        seed: Optional[int] = None,
+        schema_description: Optional[str] = None,
+        schema_id: Optional[str] = None,
+    ) -> Iterator[SchemaStructure]:
+        """
+        Recorre perezosamente schemas distintos para el mismo conjunto de AOIs.
+
+        Args:
+            interleaving_strategy: "enumerate" (todos, en orden lexicográfico) o
+                "uniform" (muestra uniforme sin repetidos, reproducible con `seed`)
+            limit: Máximo de schemas. Obligatorio para "uniform"; con "enumerate",
+                None recorre todo el espacio.
+            schema_id: Prefijo de los ids (por defecto `schema_<aois>`)
+
+        Cada schema lleva en su id el índice de su intercalado
+        (`<schema_id>_<rank>`), así que los ids no se repiten.
+        """
+        selected_aois = self._select_aois(tuple(aoi_names))
+        lengths = [len(aoi.plot_spans) for aoi in selected_aois]
+        base_id = schema_id or f"schema_{'_'.join(aoi_name.lower() for aoi_name in aoi_names)}"
+        description = schema_description or (
+            f"Plot schema combinando {len(selected_aois)} axis of interest: "
+            f"{', '.join(aoi.name for aoi in selected_aois)} "
+            f"usando estrategia '{interleaving_strategy}'"
+        )
+
+        ranked: Iterable[Tuple[int, Tuple[int, ...]]]
+        if interleaving_strategy == "enumerate":
+            ranked = enumerate(iter_interleavings(lengths))
+            if limit is not None:
+                ranked = zip(range(limit), iter_interleavings(lengths))
+        elif interleaving_strategy == "uniform":
+            if limit is None:
+                raise ValueError("La estrategia 'uniform' requiere `limit`")
+            ranked = (
+                (rank, unrank_interleaving(lengths, rank))
+                for rank in sample_ranks(lengths, limit, seed)
+            )
+        else:
+            raise ValueError(
+                f"generate_structures admite 'enumerate' o 'uniform', no '{interleaving_strategy}'"
+            )
+
+        for rank, labels in ranked:
+            yield SchemaStructure(
+                id=f"{base_id}_{rank}",
+                name=schema_name,
+                description=description,
+                spans=tuple(self._interleave_labels(selected_aois, labels)),
+            )
+
+    def _interleave_labels(
+        self, aois: List[AoiTemplate], labels: Tuple[int, ...]
+    ) -> List[SpanTemplate]:
+        """Arma los spans a partir de una secuencia "de qué AOI sale el próximo span"."""
+        iterators = [iter(aoi.plot_spans) for aoi in aois]
+        return [next(iterators[label]) for label in labels]
+
+    def _interleave_sequential(self, aois: List[AoiTemplate]) -> List[SpanTemplate]:
         """
         Estrategia secuencial: concatena todos los spans de cada AOI en orden.
 
         Ejemplo: [AOI1.span1, AOI1.span2, AOI2.span1, AOI2.span2, AOI3.span1]
         """
-        result = []
+        result: List[SpanTemplate] = []
         for aoi in aois:
             result.extend(aoi.plot_spans)
         return result
 
-    def _interleave_round_robin(self, aois: List[AxisOfInterest]) -> List[PlotSpan]:
+    def _interleave_round_robin(self, aois: List[AoiTemplate]) -> List[SpanTemplate]:
         """
         Estrategia round-robin: intercala spans tomando uno de cada AOI circularmente.
 
@@ -154,7 +388,7 @@ class PlotSchemaGenerator:
 
         return result
 
-    def _interleave_parallel(self, aois: List[AxisOfInterest]) -> List[PlotSpan]:
+    def _interleave_parallel(self, aois: List[AoiTemplate]) -> List[SpanTemplate]:
         """
         Estrategia paralela: agrupa spans por índice.
 
@@ -170,7 +404,9 @@ class PlotSchemaGenerator:
 
         return result
 
-    def _interleave_random(self, aois: List[AxisOfInterest]) -> List[PlotSpan]:
+    def _interleave_random(
+        self, aois: List[AoiTemplate], rng: Optional[random.Random] = None
+    ) -> List[SpanTemplate]:
         """
         Estrategia aleatoria: elige aleatoriamente entre los AOIs disponibles,
         pero respetando el orden interno de cada AOI.
@@ -195,7 +431,7 @@ class PlotSchemaGenerator:
                 break
 
             # Elegir aleatoriamente uno de los AOIs disponibles
-            chosen_aoi_idx = random.choice(available_aois)
+            chosen_aoi_idx = (rng or random).choice(available_aois)
 
             # Agregar el siguiente span de ese AOI
             pos = aoi_positions[chosen_aoi_idx]
@@ -207,41 +443,62 @@ class PlotSchemaGenerator:
         return result
 
     def _interleave_llm(
-        self, aois: List[AxisOfInterest], provider: Optional[str] = None
-    ) -> List[PlotSpan]:
+        self,
+        aois: List[AoiTemplate],
+        provider: Optional[str] = None,
+        variant: Optional[int] = None,
+    ) -> List[SpanTemplate]:
         """
         Estrategia LLM: consulta a un LLM para decidir el orden completo de los spans.
         El resultado siempre cubre todos los spans (si faltan, se completan al final).
+
+        Si el cache de decisiones ya tiene un orden válido para estos spans (con
+        los mismos nombres y descripciones, prompt, proveedor y modelo) se usa
+        ese orden sin llamar al LLM.
+        Solo se cachean respuestas completas y sin ids inválidos.
         """
         if not aois:
             return []
 
-        span_entries = []
-        id_to_span = {}
-        for aoi in aois:
-            for idx, span in enumerate(aoi.plot_spans):
-                span_id = f"{aoi.name}::{idx}"
-                span_entries.append(
-                    {
-                        "id": span_id,
-                        "axis_of_interest": aoi.name,
-                        "name": span.name,
-                        "description": span.description or "",
-                    }
-                )
-                id_to_span[span_id] = span
+        id_to_span = {
+            f"{aoi.name}::{idx}": span
+            for aoi in aois
+            for idx, span in enumerate(aoi.plot_spans)
+        }
+        valid_ids = list(id_to_span)
+
+        span_entries = [
+            {
+                "id": span_id,
+                "axis_of_interest": span_id.rsplit("::", 1)[0],
+                "name": span.name,
+                "description": span.description or "",
+            }
+            for span_id, span in id_to_span.items()
+        ]
+
+        chosen_provider = provider or "google"
+        client = self._llm_client(chosen_provider)
+        key = decision_key(
+            span_entries, INTERLEAVE_PROMPT_VERSION, chosen_provider, getattr(client, "model", "")
+        )
+        cached = self.decision_cache.choose(
+            key,
+            valid_ids,
+            top_k=self.llm_top_k,
+            rng=random.Random(variant) if variant is not None else None,
+        )
+        if cached is not None:
+            return [id_to_span[span_id] for span_id in cached]
 
         spans_json = json.dumps(span_entries, ensure_ascii=False, indent=2)
         prompt = template_prompt_interleave_llm.replace("<<SPANS_JSON>>", spans_json)
 
-        settings = Settings()
-        chosen_provider = provider or "google"
-        client = build_client_by_provider(chosen_provider, settings)
-        response = client.generate(prompt, temperature=0.2)
+        with llm_caller("schema_interleave"):
+            response = client.generate(prompt, temperature=0.2)
 
         ids = self._extract_json_array(response)
 
-        valid_ids = [entry["id"] for entry in span_entries]
         valid_id_set = set(valid_ids)
         ordered_ids = []
         seen = set()
@@ -268,20 +525,17 @@ class PlotSchemaGenerator:
                 + ", ".join(missing_ids)
             )
             ordered_ids.extend(missing_ids)
+        elif not invalid_ids:
+            self.decision_cache.record(key, ordered_ids)
 
         return [id_to_span[span_id] for span_id in ordered_ids]
 
     def _extract_json_array(self, text: str) -> List[str]:
         """Extrae y parsea un JSON array desde un texto del LLM."""
-        start = text.find("[")
-        end = text.rfind("]")
-        if start == -1 or end == -1 or end < start:
-            raise ValueError("Respuesta del LLM no contiene un JSON array válido")
-        raw = text[start : end + 1]
-        data = json.loads(raw)
-        if not isinstance(data, list):
-            raise ValueError("Respuesta del LLM no es un JSON array")
-        return data
+        try:
+            return extract_json(text, expect=list)
+        except ValueError as err:
+            raise ValueError("Respuesta del LLM no contiene un JSON array válido") from err
 
     def generate_custom_schema(
         self,
@@ -343,6 +597,20 @@ class PlotSchemaGenerator:
         }
 
 
+_shared_generator: Optional[PlotSchemaGenerator] = None
+_shared_generator_lock = threading.Lock()
+
+
+def get_schema_generator() -> PlotSchemaGenerator:
+    """Generador compartido por el proceso (índice de AOIs y cache de estructuras)."""
+    global _shared_generator
+    if _shared_generator is None:
+        with _shared_generator_lock:
+            if _shared_generator is None:
+                _shared_generator = PlotSchemaGenerator()
+    return _shared_generator
+
+
 # Función de conveniencia para uso rápido
 def create_plot_schema(
     schema_name: str,
@@ -369,8 +637,25 @@ def create_plot_schema(
             strategy="parallel"
         )
     """
-    generator = PlotSchemaGenerator()
-    return generator.generate_schema(
+    return get_schema_generator().generate_schema(
+        schema_name=schema_name,
+        aoi_names=aoi_names,
+        interleaving_strategy=strategy,
+        schema_description=description,
+    )
+
+
+def create_plot_structure(
+    schema_name: str,
+    aoi_names: List[str],
+    strategy: str = "sequential",
+    description: Optional[str] = None,
+) -> SchemaStructure:
+    """
+    Igual que `create_plot_schema` pero devuelve la estructura inmutable
+    (sin materializar el PlotSchema de Pydantic).
+    """
+    return get_schema_generator().generate_structure(
         schema_name=schema_name,
         aoi_names=aoi_names,
         interleaving_strategy=strategy,
@@ -0,0 +1,139 @@
+"""
+Test de la asignación óptima de personajes a roles: óptimo exacto, desempate
+por índice de personaje y mismo resultado con SciPy y con `_hungarian`.
+"""
+
+import itertools
+import random
+
+import pytest
+
+from axis_of_interest import character_attributes
+from axis_of_interest.character_attributes import (
+    COST_SCALE,
+    Character,
+    CharacterAttributes,
+    RoleMatcher,
+    _hungarian,
+    calculate_attribute_distance,
+    optimal_assignment,
+    role_profile,
+    tie_broken_costs,
+)
+
+ROLES = ["hero", "villain", "victim", "helper", "donor", "caller"]
+
+
+def random_cast(rng: random.Random, size: int) -> list[Character]:
+    # Valores en un rango chico para que haya muchos empates
+    return [
+        Character(
+            name=f"P{i}",
+            attributes=CharacterAttributes(
+                **{a: rng.randint(2, 4) for a in ("valentia", "bondad", "astucia", "maldad", "carisma")}
+            ),
+        )
+        for i in range(size)
+    ]
+
+
+def brute_force(cost: list[list[float]]) -> list[tuple[int, int]]:
+    """Mínima distancia cuantizada; con empates, la primera columna toma la fila más baja, etc."""
+    n, m = len(cost), len(cost[0])
+    best = None
+    for rows in itertools.permutations(range(n), min(n, m)):
+        for cols in itertools.combinations(range(m), min(n, m)):
+            pairs = sorted(zip(rows, cols), key=lambda pair: pair[1])
+            by_column = {col: row for row, col in pairs}
+            key = (
+                sum(round(cost[row][col] * COST_SCALE) for row, col in pairs),
+                tuple(by_column.get(col, n) for col in range(m)),
+            )
+            if best is None or key < best[0]:
+                best = (key, sorted(pairs))
+    assert best is not None
+    return best[1]
+
+
+def cost_matrices(count: int):
+    rng = random.Random(0)
+    for _ in range(count):
+        matcher = RoleMatcher(random_cast(rng, rng.randint(1, 5)))
+        roles = rng.sample(ROLES, rng.randint(1, 4))
+        cost = matcher.distances(roles, range(len(matcher.characters)))
+        yield cost.tolist() if hasattr(cost, "tolist") else cost
+
+
+def test_optimo_con_desempate_por_indice():
+    for cost in cost_matrices(300):
+        assert optimal_assignment(cost) == brute_force(cost)
+
+
+def test_personajes_identicos_gana_el_primero():
+    twin = CharacterAttributes(valentia=3, bondad=3, astucia=3, maldad=3, carisma=3)
+    matcher = RoleMatcher([Character(name=name, attributes=twin) for name in "ABC"])
+    assignment = matcher.assign(["hero", "villain"])
+    assert [assignment[role][0].name for role in ("hero", "villain")] == ["A", "B"]
+
+
+def test_scipy_y_hungarian_coinciden():
+    pytest.importorskip("scipy")
+    for cost in cost_matrices(300):
+        assert optimal_assignment(cost) == _hungarian(tie_broken_costs(cost))
+
+
+
+@pytest.fixture
+def use_backend(monkeypatch):
+    """Fuerza el camino con NumPy/SciPy o el de Python puro."""
+
+    def use(backend: str) -> None:
+        monkeypatch.undo()
+        if backend == "python":
+            monkeypatch.setattr(character_attributes, "_numpy", lambda: None)
+            monkeypatch.setattr(character_attributes, "_scipy_linear_sum_assignment", lambda: None)
+        else:
+            pytest.importorskip("numpy")
+            pytest.importorskip("scipy")
+        # La matriz de perfiles se cachea con el tipo del backend que la armó
+        character_attributes.profile_matrix.cache_clear()
+
+    yield use
+    monkeypatch.undo()
+    character_attributes.profile_matrix.cache_clear()
+
+
+def assignments(count: int) -> list:
+    rng = random.Random(1)
+    result = []
+    for _ in range(count):
+        matcher = RoleMatcher(random_cast(rng, rng.randint(1, 5)))
+        roles = rng.sample(ROLES, rng.randint(1, 5))
+        result.append(
+            [(role, character.name, round(distance, 9))
+             for role, (character, distance) in matcher.assign(roles).items()]
+        )
+    return result
+
+
+def test_numpy_y_python_puro_coinciden(use_backend):
+    use_backend("numpy")
+    with_numpy = assignments(200)
+    use_backend("python")
+    assert assignments(200) == with_numpy
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_distancias_por_backend(use_backend, backend):
+    use_backend(backend)
+    roles = ["hero", "villain", "sin_perfil"]
+    cast = random_cast(random.Random(2), 4)
+    cost = RoleMatcher(cast).distances(roles, [3, 0])
+    rows = cost.tolist() if hasattr(cost, "tolist") else cost
+
+    expected = [
+        calculate_attribute_distance(cast[i].attributes, role_profile(role))
+        for i in (3, 0)
+        for role in roles
+    ]
+    assert [value for row in rows for value in row] == pytest.approx(expected)
@@ -0,0 +1,70 @@
+"""
+Test de `InterleaveDecisionCache`: descarte de órdenes inválidos, umbral de
+`top_k`, persistencia entre instancias y clave dependiente del texto de los spans.
+"""
+
+import random
+
+from axis_of_interest.interleave_cache import InterleaveDecisionCache, decision_key
+
+SPAN_IDS = ["JOURNEY::0", "JOURNEY::1", "CONFLICT::0"]
+
+
+def entries(description="El héroe parte"):
+    return [
+        {"id": "JOURNEY::0", "axis_of_interest": "JOURNEY", "name": "Partida", "description": description},
+        {"id": "JOURNEY::1", "axis_of_interest": "JOURNEY", "name": "Regreso", "description": ""},
+        {"id": "CONFLICT::0", "axis_of_interest": "CONFLICT", "name": "Lucha", "description": ""},
+    ]
+
+
+def key(description="El héroe parte"):
+    return decision_key(entries(description), "v1", "google", "gemini")
+
+
+def test_descarta_ordenes_invalidos():
+    cache = InterleaveDecisionCache()
+    cache.record(key(), ["JOURNEY::0", "CONFLICT::0"])  # le falta un span
+    cache.record(key(), ["JOURNEY::0", "JOURNEY::0", "CONFLICT::0"])  # repetido
+    assert cache.choose(key(), SPAN_IDS) is None
+    assert cache.stats()["orders"] == 0
+
+    cache.record(key(), SPAN_IDS)
+    assert cache.choose(key(), SPAN_IDS) == tuple(SPAN_IDS)
+
+
+def test_umbral_top_k():
+    cache = InterleaveDecisionCache()
+    other = ["CONFLICT::0", "JOURNEY::0", "JOURNEY::1"]
+    third = ["JOURNEY::0", "CONFLICT::0", "JOURNEY::1"]
+    cache.record(key(), SPAN_IDS)
+    cache.record(key(), other)
+    assert cache.choose(key(), SPAN_IDS, top_k=3) is None
+
+    cache.record(key(), SPAN_IDS)
+    cache.record(key(), third)
+    # Con 4 respuestas se sortea entre los 2 órdenes más frecuentes
+    chosen = {cache.choose(key(), SPAN_IDS, top_k=2, rng=random.Random(seed)) for seed in range(50)}
+    assert chosen <= {tuple(SPAN_IDS), tuple(other)}
+    assert tuple(SPAN_IDS) in chosen
+    assert cache.choose(key(), SPAN_IDS, top_k=1) == tuple(SPAN_IDS)
+    assert cache.misses == 1
+
+
+def test_persiste_entre_instancias(tmp_path):
+    path = str(tmp_path / "cache" / "interleave.sqlite")
+    cache = InterleaveDecisionCache(path)
+    cache.record(key(), SPAN_IDS)
+    cache.record(key(), SPAN_IDS)
+    cache.close()
+
+    reopened = InterleaveDecisionCache(path)
+    assert reopened.choose(key(), SPAN_IDS, top_k=2) == tuple(SPAN_IDS)
+    assert reopened.stats()["orders"] == 1
+
+
+def test_clave_cambia_con_el_texto_de_los_spans():
+    assert key() == decision_key(list(reversed(entries())), "v1", "google", "gemini")
+    assert key() != key("La heroína parte")
+    assert key() != decision_key(entries(), "v2", "google", "gemini")
+    assert key() != decision_key(entries(), "v1", "google", "otro-modelo")
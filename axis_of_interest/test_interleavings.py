@@ -0,0 +1,58 @@
+"""
+Test del espacio de intercalados: conteo, orden lexicográfico de la
+enumeración, rank/unrank inversos y muestreo de rangos distintos.
+"""
+
+import pytest
+
+from axis_of_interest.interleavings import (
+    count_interleavings,
+    iter_interleavings,
+    rank_interleaving,
+    sample_interleavings,
+    sample_ranks,
+    unrank_interleaving,
+)
+
+LENGTHS = [(1,), (2, 1), (1, 1, 1), (2, 2), (3, 0, 2), (2, 1, 2), (1, 2, 1, 1)]
+
+
+@pytest.mark.parametrize("lengths", LENGTHS)
+def test_conteo_y_orden_lexicografico(lengths):
+    interleavings = list(iter_interleavings(lengths))
+    assert len(interleavings) == count_interleavings(lengths)
+    assert interleavings == sorted(interleavings)
+    assert len(set(interleavings)) == len(interleavings)
+
+
+@pytest.mark.parametrize("lengths", LENGTHS)
+def test_rank_y_unrank_son_inversos(lengths):
+    for rank, interleaving in enumerate(iter_interleavings(lengths)):
+        assert unrank_interleaving(lengths, rank) == interleaving
+        assert rank_interleaving(lengths, unrank_interleaving(lengths, rank)) == rank
+
+
+def test_unrank_fuera_de_rango():
+    with pytest.raises(ValueError):
+        unrank_interleaving((2, 1), count_interleavings((2, 1)))
+
+
+@pytest.mark.parametrize("lengths", [(2, 1, 2), (1, 2, 1, 1), (3, 2, 2)])
+def test_sample_ranks_distintos_y_acotados(lengths):
+    total = count_interleavings(lengths)
+    for k in (1, 5, total, total + 10):
+        ranks = sample_ranks(lengths, k, seed=7)
+        assert len(ranks) == min(k, total)
+        assert len(set(ranks)) == len(ranks)
+        assert all(0 <= rank < total for rank in ranks)
+    assert sample_ranks(lengths, 5, seed=7) == sample_ranks(lengths, 5, seed=7)
+
+
+def test_sample_ranks_espacio_enorme():
+    lengths = (10,) * 8
+    assert count_interleavings(lengths) > 2**63
+    ranks = sample_ranks(lengths, 50, seed=1)
+    assert len(set(ranks)) == 50
+    assert sample_interleavings(lengths, 3, seed=1) == [
+        unrank_interleaving(lengths, rank) for rank in ranks[:3]
+    ]
@@ -0,0 +1,124 @@
+"""
+Test de paridad de `BoundSchema` con la asignación anterior, que copiaba el
+PlotSchema con `deepcopy` y reescribía los personajes de cada atom: mismo
+`model_dump()` y mismo `to_plot_schema()` con la misma semilla.
+"""
+
+import random
+from copy import deepcopy
+
+import pytest
+
+from axis_of_interest.character_assigner import CharacterNameAssigner
+from axis_of_interest.plot_structure import SchemaStructure
+from axis_of_interest.registry import get_aois
+from axis_of_interest.schema_generator import get_schema_generator
+
+NAMES = ["Ana", "Luis", "Sofía", "Pedro", "Marta", "Juan", "Clara"]
+CASES = 200
+
+
+def deepcopy_assign_names(schema, character_names, allow_reuse, rng):
+    """Asignación aleatoria por AOI tal como se hacía sobre una copia del schema."""
+    new_schema = deepcopy(schema)
+    global_used_names = set()
+    aoi_dict = {aoi.name: aoi for aoi in get_aois()}
+    spans_by_aoi: dict = {}
+    for span in new_schema.plots_span:
+        spans_by_aoi.setdefault(span.axis_of_interest, []).append(span)
+    for aoi_name, spans in spans_by_aoi.items():
+        roles = aoi_dict[aoi_name].roles
+        available_names = (
+            [n for n in character_names if n not in global_used_names]
+            if not allow_reuse
+            else character_names.copy()
+        )
+        if len(available_names) < len(roles) and not allow_reuse:
+            raise ValueError("No hay suficientes nombres únicos")
+        shuffled_names = available_names.copy()
+        rng.shuffle(shuffled_names)
+        role_to_name = {}
+        for idx, role in enumerate(roles):
+            role_to_name[role] = shuffled_names[idx % len(shuffled_names)]
+            if not allow_reuse:
+                global_used_names.add(role_to_name[role])
+        for span in spans:
+            for atom in span.plots_atoms:
+                atom.characters = {role: role_to_name.get(role, role) for role in atom.characters}
+    return new_schema
+
+
+def deepcopy_assign_with_mapping(schema, character_names, custom_mapping, rng):
+    """Asignación por placeholder con mapeo personalizado, sobre una copia del schema."""
+    new_schema = deepcopy(schema)
+    for span in new_schema.plots_span:
+        aoi_mapping = custom_mapping.get(span.axis_of_interest, {})
+        placeholders = set()
+        for atom in span.plots_atoms:
+            placeholders.update(atom.characters.values())
+        placeholder_to_name = {}
+        available_names = list(character_names)
+        rng.shuffle(available_names)
+        for placeholder in sorted(placeholders):
+            if placeholder in aoi_mapping:
+                placeholder_to_name[placeholder] = aoi_mapping[placeholder]
+            elif available_names:
+                placeholder_to_name[placeholder] = available_names.pop(0)
+            else:
+                placeholder_to_name[placeholder] = rng.choice(character_names)
+        for atom in span.plots_atoms:
+            atom.characters = {
+                role: placeholder_to_name[placeholder] for role, placeholder in atom.characters.items()
+            }
+    return new_schema
+
+
+def seeded_cases():
+    generator = get_schema_generator()
+    aoi_names = list(generator.aoi_index)
+    rng = random.Random(0)
+    for seed in range(CASES):
+        selected = rng.sample(aoi_names, rng.randint(1, 3))
+        strategy = rng.choice(["sequential", "round_robin", "parallel", "random"])
+        schema = generator.generate_schema(
+            "Paridad", selected, strategy, variant=seed if strategy == "random" else None
+        )
+        names = rng.sample(NAMES, rng.randint(1, len(NAMES)))
+        yield seed, schema, names, rng
+
+
+@pytest.mark.parametrize("allow_reuse", [True, False])
+def test_bind_names_igual_que_deepcopy(allow_reuse):
+    for seed, schema, names, _ in seeded_cases():
+        try:
+            expected = deepcopy_assign_names(schema, names, allow_reuse, random.Random(seed))
+        except ValueError:
+            with pytest.raises(ValueError):
+                CharacterNameAssigner(seed=seed).bind_names(schema, names, allow_reuse)
+            continue
+        bound = CharacterNameAssigner(seed=seed).bind_names(schema, names, allow_reuse)
+        assert bound.model_dump() == expected.model_dump()
+        assert bound.to_plot_schema() == expected
+
+
+def test_bind_names_with_mapping_igual_que_deepcopy():
+    for seed, schema, names, rng in seeded_cases():
+        # Mapeo personalizado para algunos placeholders de algunos AOIs
+        custom_mapping: dict = {}
+        for span in schema.plots_span:
+            for atom in span.plots_atoms:
+                for placeholder in atom.characters.values():
+                    if rng.random() < 0.3:
+                        custom_mapping.setdefault(span.axis_of_interest, {})[placeholder] = rng.choice(NAMES)
+
+        expected = deepcopy_assign_with_mapping(schema, names, custom_mapping, random.Random(seed))
+        bound = CharacterNameAssigner(seed=seed).bind_names_with_mapping(schema, names, custom_mapping)
+        assert bound.model_dump() == expected.model_dump()
+        assert bound.to_plot_schema() == expected
+
+
+def test_estructura_sin_personajes_igual_que_plot_schema():
+    for _, schema, _, _ in seeded_cases():
+        structure = SchemaStructure.from_plot_schema(schema)
+        assert structure.model_dump() == schema.model_dump()
+        assert structure.to_plot_schema() == schema
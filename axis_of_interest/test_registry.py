@@ -0,0 +1,51 @@
+"""
+Test del catálogo de AOIs: con la versión correcta se lee sin importar las
+fuentes; desactualizado o dañado se vuelve a descubrir desde all_aoi.
+"""
+
+import json
+
+import pytest
+
+from axis_of_interest import registry
+
+
+@pytest.fixture
+def catalog_path(tmp_path, monkeypatch):
+    """Catálogo temporal y registro sin cargar; monkeypatch restaura el estado global."""
+    path = tmp_path / "aoi_catalog.json"
+    monkeypatch.setattr(registry, "DEFAULT_CATALOG_PATH", path)
+    monkeypatch.setattr(registry, "_aois", None)
+    monkeypatch.setattr(registry, "_index", None)
+    return path
+
+
+def dump_aois(aois):
+    return [aoi.model_dump() for aoi in aois]
+
+
+def test_catalogo_vigente_no_descubre(catalog_path, monkeypatch):
+    catalog = registry.build_catalog(catalog_path)
+
+    def fail():
+        raise AssertionError("no debería descubrir con un catálogo vigente")
+
+    monkeypatch.setattr(registry, "_discover_all_aoi", fail)
+    assert dump_aois(registry.get_aois()) == catalog["aois"]
+    assert registry.get_aoi_index() == {aoi["name"]: i for i, aoi in enumerate(catalog["aois"])}
+
+
+def test_catalogo_desactualizado_descubre(catalog_path):
+    catalog = registry.build_catalog(catalog_path)
+    stale = dict(catalog, version="0" * 16, aois=catalog["aois"][:1])
+    catalog_path.write_text(json.dumps(stale), encoding="utf-8")
+
+    discovered = registry._discover_all_aoi()
+    assert len(discovered) > 1
+    assert dump_aois(registry.get_aois()) == dump_aois(discovered)
+    assert registry.get_aoi_index() == {aoi.name: i for i, aoi in enumerate(discovered)}
+
+
+def test_catalogo_danado_descubre(catalog_path):
+    catalog_path.write_text("{no es json", encoding="utf-8")
+    assert dump_aois(registry.get_aois()) == dump_aois(registry._discover_all_aoi())
@@ -0,0 +1,58 @@
+"""
+Test de `generate_schemas_bulk` sobre una grilla chica: ids sin repetir,
+`position` contigua, reproducibilidad con `seed` y `write_schemas_jsonl`.
+"""
+
+import io
+import json
+
+from axis_of_interest.schema_bulk import SchemaGrid, generate_schemas_bulk, write_schemas_jsonl
+from axis_of_interest.schema_generator import get_schema_generator
+
+CASTS = [["Ana", "Luis", "Sofía", "Pedro"], ["Marta", "Juan", "Clara"]]
+
+
+def small_grid(seed=0, casts=()):
+    aoi_pool = list(get_schema_generator().aoi_index)[:3]
+    return SchemaGrid(
+        aoi_pool=aoi_pool,
+        set_sizes=[2, 3],
+        strategies=["sequential", "round_robin", "enumerate", "uniform", "random"],
+        variants=3,
+        casts=casts,
+        seed=seed,
+    )
+
+
+def test_ids_unicos():
+    items = list(generate_schemas_bulk(small_grid()))
+    ids = [item.schema.model_dump()["id"] for item in items]
+    assert len(ids) == len(set(ids))
+
+
+def test_ids_unicos_por_elenco():
+    # Con elencos el id se comparte entre los elencos de una misma estructura
+    items = list(generate_schemas_bulk(small_grid(casts=CASTS)))
+    keys = [(item.schema.model_dump()["id"], item.cast) for item in items]
+    assert len(keys) == len(set(keys))
+    assert {item.cast for item in items} == {0, 1}
+
+
+def test_position_contigua():
+    items = list(generate_schemas_bulk(small_grid(casts=CASTS)))
+    assert [item.position for item in items] == list(range(len(items)))
+
+
+def test_reproducible_con_seed():
+    first = [item.to_record() for item in generate_schemas_bulk(small_grid(seed=7, casts=CASTS))]
+    second = [item.to_record() for item in generate_schemas_bulk(small_grid(seed=7, casts=CASTS))]
+    assert first == second
+
+
+def test_write_schemas_jsonl():
+    buffer = io.StringIO()
+    count = write_schemas_jsonl(generate_schemas_bulk(small_grid(casts=CASTS)), buffer)
+    lines = buffer.getvalue().splitlines()
+    assert count == len(lines)
+    records = [json.loads(line) for line in lines]
+    assert records == [item.to_record() for item in generate_schemas_bulk(small_grid(casts=CASTS))]
@@ -1,19 +1,19 @@
-
-
-from axis_of_interest.gramatica_aoi import oracionDosSujetos, oracionUnicoSujeto,oracionMultipleSujetos
+from axis_of_interest.gramatica_aoi import oracion
+from axis_of_interest.plot_structure import BoundSchema
 from axis_of_interest.schemas import PlotSchema
 
 
-def generate_text(schema: PlotSchema) -> str:
-    text = ""
-    for i in schema.plots_span:
-        for j in i.plots_atoms:
-            
-            if len(j.characters) == 1:
-                text += oracionUnicoSujeto(i.axis_of_interest, i.name, j.name, list(j.characters.values())[0]) + "\n"
-            else:
-                if len(j.characters) == 2:
-                    text += oracionDosSujetos(i.axis_of_interest, i.name, j.name, list(j.characters.values())[0], list(j.characters.values())[1]) + "\n"
-                else:
-                    text += oracionMultipleSujetos(i.axis_of_interest, i.name, j.name, list(j.characters.values())[0], list(j.characters.values())[1], list(j.characters.values())[2]) + "\n"
-    return text
\ No newline at end of file
+def generate_text(schema: PlotSchema | BoundSchema) -> str:
+    """Una oración por plot atom (gramática compilada), cada una terminada en salto de línea."""
+    if isinstance(schema, BoundSchema):
+        # Recorre la estructura directamente, sin armar las vistas de plots_span
+        return "".join(
+            oracion(span.axis_of_interest, span.name, atom.name, schema.names_for(index, atom)) + "\n"
+            for index, span in enumerate(schema.structure.spans)
+            for atom in span.plots_atoms
+        )
+    return "".join(
+        oracion(span.axis_of_interest, span.name, atom.name, tuple(atom.characters.values())) + "\n"
+        for span in schema.plots_span
+        for atom in span.plots_atoms
+    )
@@ -1,7 +1,8 @@
-import json
-import re
 from typing import Any, Optional
 
+from infrastructure.llm_client.metrics import llm_caller
+from infrastructure.llm_client.structured import extract_json
+
 DIMENSIONS = ("novelty", "sensicality", "pragmaticality")
 
 JUDGE_DIMENSIONS_PROMPT = """\
@@ -28,35 +29,16 @@ Cuento a evaluar:
 \"\"\"
 """
 
-
-def _extract_json(text: str) -> dict[str, Any]:
-    """Extract a JSON object from an LLM response that may include extra text."""
-    fence_match = re.search(r"```(?:json)?\s*([\s\S]+?)```", text, re.DOTALL)
-    if fence_match:
-        text = fence_match.group(1).strip()
-
-    try:
-        parsed = json.loads(text)
-        if isinstance(parsed, dict):
-            return parsed
-    except json.JSONDecodeError:
-        pass
-
-    idx = text.find("{")
-    if idx != -1:
-        depth = 0
-        for i, ch in enumerate(text[idx:], start=idx):
-            if ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    parsed = json.loads(text[idx : i + 1])
-                    if isinstance(parsed, dict):
-                        return parsed
-                    break
-
-    raise ValueError(f"Could not extract valid JSON from LLM response:\n{text[:500]}")
+# Salida estructurada nativa del proveedor; `extract_json` queda como fallback
+JUDGE_DIMENSIONS_SCHEMA: dict[str, Any] = {
+    "title": "judge_dimensions",
+    "type": "object",
+    "properties": {
+        **{dim: {"type": "number"} for dim in DIMENSIONS},
+        "justification": {"type": "string"},
+    },
+    "required": [*DIMENSIONS, "justification"],
+}
 
 
 def _to_score(value: Any) -> Optional[float]:
@@ -91,8 +73,14 @@ def evaluate_generated_story_dimensions(
 ) -> dict[str, Any]:
     """Evaluate a single generated story in the 3 paper dimensions."""
     prompt = JUDGE_DIMENSIONS_PROMPT.format(story_text=story_text)
-    raw_response = client.generate(prompt, system_prompt=None, temperature=temperature)
-    parsed = _extract_json(raw_response)
+    with llm_caller("judge_dimensions"):
+        raw_response = client.generate(
+            prompt,
+            system_prompt=None,
+            temperature=temperature,
+            response_schema=JUDGE_DIMENSIONS_SCHEMA,
+        )
+    parsed = extract_json(raw_response, expect=dict)
     dimensions = _normalize_dimensions(parsed)
 
     result: dict[str, Any] = {
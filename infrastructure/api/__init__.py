@@ -1,3 +1,15 @@
-from .api import api  # re-export FastAPI instance for uvicorn
+import importlib
+
+
+def __getattr__(name: str):
+    # re-export FastAPI instance for uvicorn (infrastructure.api:api). Se importa
+    # recién al pedirla, así los scripts que solo usan global_schemas no arman la app.
+    if name == "api":
+        app = importlib.import_module(".api", __name__).api
+        # Importar el submódulo `api` lo deja como atributo del paquete; se pisa con la app
+        globals()["api"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ["api"]
@@ -1,22 +1,41 @@
+import json
 import logging
 import traceback
+from contextlib import asynccontextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterator, Optional
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.routing import Match
 
 from experiments.data import get_experiments
 from infrastructure.llm_client import get_models
 from infrastructure.llm_client.exceptions import LLMQuotaExceededError
 from infrastructure.llm_client import get_client
-from story_creator.modes import get_modes, generate_the_story, generate_story_candidates
+from infrastructure.telemetry import (
+    count_coalesced,
+    phase,
+    render_metrics,
+    setup_tracing,
+    track_request,
+)
+from story_creator.modes import (
+    CANDIDATES_MAX_WORKERS,
+    get_modes,
+    generate_the_story,
+    generate_story_candidates,
+    stream_the_story,
+)
 from evaluation import evaluate_generated_story_dimensions, rank_candidates
 from axis_of_interest.registry import list_of_aoi
 from .global_schemas import StoryRequest
 from .constants import STRATEGIES, GENERATION_METHODS
+from .coalesce import SingleFlight, story_request_key
+from .jobs import Job, JobQueue
 
 load_dotenv()
 
@@ -25,7 +44,16 @@ logger = logging.getLogger(__name__)
 BASE_PATH = Path(__file__).parent
 WEB_DIR = BASE_PATH.parent.parent / "web"
 
-api = FastAPI(title="Taller de cuentos")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    job_queue.shutdown()
+
+
+api = FastAPI(title="Taller de cuentos", lifespan=lifespan)
+setup_tracing()
 
 AVAILABLE_MODELS = get_models()
 DEFAULT_MODEL = AVAILABLE_MODELS[0]
@@ -55,6 +83,63 @@ def resolve_mode(mode_name: Optional[str]) -> dict:
     )
 
 
+def to_http_exception(err: Exception) -> HTTPException:
+    """Traduce los errores de generación a la respuesta HTTP correspondiente."""
+    if isinstance(err, HTTPException):
+        return err
+    if isinstance(err, (ValueError, RuntimeError)):
+        return HTTPException(status_code=400, detail=str(err))
+    if isinstance(err, LLMQuotaExceededError):
+        return HTTPException(status_code=429, detail=str(err))
+    err_msg = str(err)
+    if "401" in err_msg or "invalid_api_key" in err_msg or "Incorrect API key" in err_msg:
+        logger.warning("API key inválida o rechazada: %s", err_msg[:200])
+        return HTTPException(
+            status_code=401,
+            detail="Clave de API de OpenAI inválida o revocada. Revisá OPENAI_API_KEY en .env y generá una nueva en https://platform.openai.com/account/api-keys",
+        )
+    logger.exception(
+        "Error generando cuento: %s\n%s", err, traceback.format_exc()
+    )
+    return HTTPException(
+        status_code=500, detail=f"No se pudo generar el cuento: {err}"
+    )
+
+
+def route_template(request: Request) -> str:
+    """Plantilla de la ruta (`/api/story`), para no etiquetar métricas por URL."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+
+@api.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # En /api/story/stream la latencia llega hasta el inicio de la respuesta;
+    # el tiempo del LLM queda en llm_time_to_first_token_seconds.
+    with track_request(request.method, route_template(request)) as outcome:
+        response = await call_next(request)
+        outcome["status"] = response.status_code
+    return response
+
+
+def evaluate_candidate(candidate: dict, judge_client, mode_id: str) -> dict:
+    with phase("judge", mode=mode_id, candidate_id=candidate["candidate_id"]):
+        evaluation = evaluate_generated_story_dimensions(
+            candidate["story"],
+            judge_client,
+            metadata={"mode": mode_id, "candidate_id": candidate["candidate_id"]},
+        )
+    return {
+        "candidate_id": candidate["candidate_id"],
+        "story": candidate["story"],
+        "plot_schema": candidate.get("plot_schema"),
+        "evaluation": evaluation,
+    }
+
+
 @api.get("/", include_in_schema=False)
 def serve_index() -> FileResponse:
     index_path = WEB_DIR / "index.html"
@@ -63,117 +148,258 @@ def serve_index() -> FileResponse:
     return FileResponse(index_path)
 
 
-@api.post("/api/story")
-def generate_story(request: StoryRequest) -> dict:
-    mode = resolve_mode(request.mode)
-    model = resolve_model(request.model)
-    request_payload = request.model_copy(update={"mode": mode["id"], "model": model})
-    try:
-        num_candidates = request_payload.num_candidates or 1
-        selection_policies = request_payload.selection_policies or []
-
-        if num_candidates > 1 and not selection_policies:
-            selection_policies = ["mean"]
-
-        if num_candidates == 1 and not selection_policies:
-            story = generate_the_story(request_payload, mode_id=mode["id"])
-            response = {"story": story, "mode": mode["id"], "model": model}
-            if isinstance(story, tuple):
-                story_text, plot_schema = story
-                response["story"] = story_text
-                response["plot_schema"] = plot_schema
-            return response
-
-        candidates = generate_story_candidates(
-            request_payload,
-            mode_id=mode["id"],
-            num_candidates=num_candidates,
-        )
-        judge_client = get_client(model)
-
-        evaluated_candidates = []
-        for candidate in candidates:
-            evaluation = evaluate_generated_story_dimensions(
-                candidate["story"],
-                judge_client,
-                metadata={"mode": mode["id"], "candidate_id": candidate["candidate_id"]},
+def generate_and_rank(
+    request_payload: StoryRequest,
+    *,
+    job: Optional[Job] = None,
+) -> dict:
+    """Genera los candidatos, los juzga y arma la respuesta con el ranking.
+
+    Con `job`, reporta el progreso (candidatos generados y juzgados) y corta
+    si el job se cancela.
+    """
+    mode_id = resolve_mode(request_payload.mode)["id"]
+    model = resolve_model(request_payload.model)
+    num_candidates = request_payload.num_candidates or 1
+    selection_policies = request_payload.selection_policies or ["mean"]
+    cancel_event = job.cancel_event if job is not None else None
+
+    judge_client = get_client(model)
+
+    def judge(candidate: dict) -> dict:
+        if job is not None:
+            job.raise_if_cancelled()
+        evaluated = evaluate_candidate(candidate, judge_client, mode_id)
+        if job is not None:
+            job.advance("judged")
+        return evaluated
+
+    # Cada candidato se evalúa apenas termina de generarse, en paralelo con
+    # la generación de los restantes.
+    judge_workers = max(1, min(num_candidates, CANDIDATES_MAX_WORKERS))
+    with ThreadPoolExecutor(max_workers=judge_workers) as judge_pool:
+        judge_futures: dict[int, Future] = {}
+
+        def judge_when_ready(candidate: dict) -> None:
+            if job is not None:
+                job.advance("generated")
+            judge_futures[candidate["candidate_id"]] = judge_pool.submit(
+                judge, candidate
             )
-            evaluated_candidates.append(
-                {
-                    "candidate_id": candidate["candidate_id"],
-                    "story": candidate["story"],
-                    "plot_schema": candidate.get("plot_schema"),
-                    "evaluation": evaluation,
-                }
+
+        try:
+            candidates = generate_story_candidates(
+                request_payload,
+                mode_id=mode_id,
+                num_candidates=num_candidates,
+                on_candidate=judge_when_ready,
+                cancel_event=cancel_event,
             )
+            evaluated_candidates = [
+                judge_futures[candidate["candidate_id"]].result()
+                for candidate in candidates
+            ]
+        except BaseException:
+            for future in judge_futures.values():
+                future.cancel()
+            raise
 
+    with phase("ranking", mode=mode_id):
         ranking = rank_candidates(
             evaluated_candidates,
             policies=selection_policies,
             weighted_policy_weights=request_payload.weighted_policy_weights,
         )
-        primary_policy = ranking["policies"][0]
-        primary_winner = ranking["winners"][primary_policy]
+    primary_policy = ranking["policies"][0]
+    primary_winner = ranking["winners"][primary_policy]
 
-        selected_stories_by_policy = {
-            policy: winner["story"] for policy, winner in ranking["winners"].items()
+    selected_stories_by_policy = {
+        policy: winner["story"] for policy, winner in ranking["winners"].items()
+    }
+    winner_metadata_by_policy = {
+        policy: {
+            "candidate_id": winner["candidate_id"],
+            "policy_score": winner["policy_score"],
+            "dimensions": winner["evaluation"]["dimensions"],
         }
-        winner_metadata_by_policy = {
-            policy: {
-                "candidate_id": winner["candidate_id"],
-                "policy_score": winner["policy_score"],
-                "dimensions": winner["evaluation"]["dimensions"],
+        for policy, winner in ranking["winners"].items()
+    }
+
+    response = {
+        "story": primary_winner["story"],
+        "mode": mode_id,
+        "model": model,
+        "num_candidates": num_candidates,
+        "selection_policies": ranking["policies"],
+        "weighted_policy_weights_normalized": ranking.get(
+            "weighted_policy_weights_normalized"
+        ),
+        "selected_stories_by_policy": selected_stories_by_policy,
+        "winner_metadata_by_policy": winner_metadata_by_policy,
+        "rankings": ranking["rankings"],
+        "candidates": [
+            {
+                "candidate_id": candidate["candidate_id"],
+                "story": candidate["story"],
+                "plot_schema": candidate.get("plot_schema"),
+                "dimensions": candidate["evaluation"]["dimensions"],
+                "average_score": candidate["evaluation"]["average_score"],
+                "justification": candidate["evaluation"].get("justification", ""),
             }
-            for policy, winner in ranking["winners"].items()
-        }
+            for candidate in evaluated_candidates
+        ],
+    }
+    if primary_winner.get("plot_schema") is not None:
+        response["plot_schema"] = primary_winner["plot_schema"]
+    return response
+
+
+def job_error(err: Exception) -> dict:
+    http_err = to_http_exception(err)
+    return {"status_code": http_err.status_code, "detail": http_err.detail}
+
 
-        response = {
-            "story": primary_winner["story"],
-            "mode": mode["id"],
-            "model": model,
-            "num_candidates": num_candidates,
-            "selection_policies": ranking["policies"],
-            "weighted_policy_weights_normalized": ranking.get(
-                "weighted_policy_weights_normalized"
-            ),
-            "selected_stories_by_policy": selected_stories_by_policy,
-            "winner_metadata_by_policy": winner_metadata_by_policy,
-            "rankings": ranking["rankings"],
-            "candidates": [
-                {
-                    "candidate_id": candidate["candidate_id"],
-                    "story": candidate["story"],
-                    "plot_schema": candidate.get("plot_schema"),
-                    "dimensions": candidate["evaluation"]["dimensions"],
-                    "average_score": candidate["evaluation"]["average_score"],
-                    "justification": candidate["evaluation"].get("justification", ""),
-                }
-                for candidate in evaluated_candidates
-            ],
+job_queue = JobQueue(error_formatter=job_error)
+story_flights = SingleFlight()
+
+
+def run_story_request(request_payload: StoryRequest) -> dict:
+    if not request_payload.selection_policies:
+        story = generate_the_story(request_payload, mode_id=request_payload.mode)
+        response: dict[str, Any] = {
+            "story": story,
+            "mode": request_payload.mode,
+            "model": request_payload.model,
         }
-        if primary_winner.get("plot_schema") is not None:
-            response["plot_schema"] = primary_winner["plot_schema"]
+        if isinstance(story, tuple):
+            story_text, plot_schema = story
+            response["story"] = story_text
+            response["plot_schema"] = plot_schema
         return response
-    except ValueError as validation_error:
-        raise HTTPException(status_code=400, detail=str(validation_error)) from validation_error
-    except RuntimeError as missing_key:
-        raise HTTPException(status_code=400, detail=str(missing_key)) from missing_key
-    except LLMQuotaExceededError as quota_err:
-        raise HTTPException(status_code=429, detail=str(quota_err)) from quota_err
-    except Exception as err:
-        err_msg = str(err)
-        if "401" in err_msg or "invalid_api_key" in err_msg or "Incorrect API key" in err_msg:
-            logger.warning("API key inválida o rechazada: %s", err_msg[:200])
-            raise HTTPException(
-                status_code=401,
-                detail="Clave de API de OpenAI inválida o revocada. Revisá OPENAI_API_KEY en .env y generá una nueva en https://platform.openai.com/account/api-keys",
-            ) from err
-        logger.exception(
-            "Error generando cuento: %s\n%s", err, traceback.format_exc()
+    return generate_and_rank(request_payload)
+
+
+@api.post("/api/story")
+def generate_story(request: StoryRequest) -> dict:
+    """Genera un cuento de forma sincrónica (solo un candidato).
+
+    Los pedidos con varios candidatos tardan demasiado para una conexión
+    abierta: van por `POST /api/jobs`. Pedidos idénticos concurrentes comparten
+    una única generación salvo que se envíe `fresh: true`.
+    """
+    mode = resolve_mode(request.mode)
+    model = resolve_model(request.model)
+    if request.num_candidates > 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Para más de un candidato usá POST /api/jobs y consultá GET /api/jobs/{id}",
         )
+    request_payload = request.model_copy(update={"mode": mode["id"], "model": model})
+    try:
+        if request_payload.fresh:
+            return run_story_request(request_payload)
+        response, shared = story_flights.do(
+            story_request_key(request_payload),
+            lambda: run_story_request(request_payload),
+        )
+        if shared:
+            count_coalesced("/api/story")
+        return response
+    except Exception as err:
+        raise to_http_exception(err) from err
+
+
+@api.post("/api/jobs", status_code=202)
+def create_story_job(request: StoryRequest) -> dict:
+    """Encola un pedido de cuento (típicamente con varios candidatos).
+
+    Devuelve el job con su `id`; el resultado se consulta en `GET /api/jobs/{id}`
+    y tiene el mismo formato que la respuesta de `/api/story`.
+    """
+    mode = resolve_mode(request.mode)
+    model = resolve_model(request.model)
+    request_payload = request.model_copy(update={"mode": mode["id"], "model": model})
+    job = job_queue.submit(
+        lambda job: generate_and_rank(request_payload, job=job),
+        candidates_total=request_payload.num_candidates,
+    )
+    return job.to_dict()
+
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job no encontrado: {job_id}")
+    return job
+
+
+@api.get("/api/jobs/{job_id}")
+def get_story_job(job_id: str) -> dict:
+    """Estado, progreso y (al terminar) resultado o error del job."""
+    return get_job_or_404(job_id).to_dict()
+
+
+@api.delete("/api/jobs/{job_id}")
+def cancel_story_job(job_id: str) -> dict:
+    """Cancela el job; los candidatos en curso terminan y se descartan."""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job no encontrado: {job_id}")
+    return job.to_dict()
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@api.post("/api/story/stream")
+def stream_story(request: StoryRequest) -> StreamingResponse:
+    """Genera un único cuento y lo emite como Server-Sent Events.
+
+    Eventos: `meta` (modo y modelo), `plot_schema` (solo modos 3 y 4), `token`
+    por cada fragmento del LLM, y finalmente `done` o `error`.
+    """
+    mode = resolve_mode(request.mode)
+    model = resolve_model(request.model)
+    if request.num_candidates > 1:
         raise HTTPException(
-            status_code=500, detail=f"No se pudo generar el cuento: {err}"
-        ) from err
+            status_code=400,
+            detail="El streaming solo soporta un candidato (num_candidates=1)",
+        )
+    request_payload = request.model_copy(update={"mode": mode["id"], "model": model})
+    try:
+        plot_schema, tokens = stream_the_story(request_payload, mode_id=mode["id"])
+    except Exception as err:
+        raise to_http_exception(err) from err
+
+    def events() -> Iterator[str]:
+        yield sse_event("meta", {"mode": mode["id"], "model": model})
+        if plot_schema is not None:
+            yield sse_event("plot_schema", plot_schema)
+        try:
+            for token in tokens:
+                yield sse_event("token", {"text": token})
+        except Exception as err:
+            http_err = to_http_exception(err)
+            yield sse_event(
+                "error", {"status_code": http_err.status_code, "detail": http_err.detail}
+            )
+            return
+        yield sse_event("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@api.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Métricas en formato Prometheus (endpoints, fases y llamadas al LLM)."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 
 @api.get("/api/options")
 def list_options() -> dict:
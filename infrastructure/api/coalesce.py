@@ -0,0 +1,74 @@
+"""Deduplicación de pedidos idénticos concurrentes (single-flight).
+
+Cuando llegan a la vez varios pedidos iguales (p. ej. un aula enviando el mismo
+experimento), solo el primero genera; los demás esperan y reciben el mismo
+resultado o el mismo error. Terminada la generación la clave se libera: no es
+un cache, un pedido posterior vuelve a generar.
+"""
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from .global_schemas import StoryRequest
+
+# Campos que no cambian el cuento generado (`experiment_id` sí: va en el prompt)
+KEY_EXCLUDED_FIELDS = {"fresh"}
+
+
+def story_request_key(request: StoryRequest) -> str:
+    """Clave estable del pedido, sin los campos que no afectan la generación."""
+    payload = request.model_dump(mode="json", exclude=KEY_EXCLUDED_FIELDS)
+    for key, value in payload.items():
+        if isinstance(value, str):
+            payload[key] = value.strip()
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Comparte una única ejecución en curso entre los llamados con la misma clave."""
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Ejecuta `fn` o espera la ejecución en curso. Devuelve (resultado, compartido)."""
+        with self._lock:
+            existing = self._calls.get(key)
+            if existing is None:
+                call = self._calls[key] = _Call()
+
+        if existing is not None:
+            existing.done.wait()
+            if existing.error is not None:
+                raise existing.error
+            return existing.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+__all__ = ["KEY_EXCLUDED_FIELDS", "SingleFlight", "story_request_key"]
@@ -27,7 +27,8 @@ class StoryRequest(BaseModel):
     mode: Optional[str] = Field(default=None, description="Modo de creación backend")
     experiment_id: Optional[str] = Field(default=None, description="Identificador de experimento opcional")
     aois: Optional[list[str]] = Field(default=None, description="Lista de Axis of Interest (para Modo 3 y 4)")
-    interleaving_strategy: Optional[str] = Field(default=None, description="Estrategia de interleaving: sequential, round_robin, parallel, random, llm (para Modo 3 y 4)")
+    interleaving_strategy: Optional[str] = Field(default=None, description="Estrategia de interleaving: sequential, round_robin, parallel, random, enumerate, uniform, llm (para Modo 3 y 4)")
+    interleaving_variant: Optional[int] = Field(default=None, ge=0, description="Índice del intercalado (enumerate) o semilla del sorteo (uniform)")
     character_attributes: Optional[list[CharacterWithAttributesSchema]] = Field(default=None, description="Lista de personajes con atributos (para Modo 4)")
     aoi_names: Optional[List[str]] = None
     strategy: Optional[str] = None
@@ -45,3 +46,7 @@ class StoryRequest(BaseModel):
         default=None,
         description="Pesos para policy weighted: novelty, sensicality, pragmaticality",
     )
+    fresh: bool = Field(
+        default=False,
+        description="Generar siempre un cuento nuevo, sin compartir el de un pedido idéntico en curso",
+    )
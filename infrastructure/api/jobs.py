@@ -0,0 +1,184 @@
+"""Cola de jobs en proceso para los pedidos largos de la API.
+
+Un pedido con varios candidatos (generar N y juzgar N) puede tardar minutos;
+en vez de mantener abierta la conexión se encola como job y se consulta su
+estado. Los jobs corren en un pool de hilos propio (`JOBS_MAX_WORKERS`) y los
+terminados se conservan `JOBS_RETENTION_S` segundos.
+
+La cancelación es cooperativa: `cancel` marca `job.cancel_event` y el trabajo
+lo revisa entre candidatos; las llamadas al LLM ya en vuelo terminan y se
+descartan.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Literal, Optional
+
+JOBS_MAX_WORKERS = int(os.getenv("JOBS_MAX_WORKERS", "2"))
+JOBS_RETENTION_S = float(os.getenv("JOBS_RETENTION_S", "3600"))
+
+JobStatus = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+@dataclass
+class Job:
+    id: str
+    candidates_total: int = 0
+    status: JobStatus = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    candidates_generated: int = 0
+    candidates_judged: int = 0
+    result: Optional[dict] = None
+    error: Optional[dict] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def advance(self, stage: Literal["generated", "judged"]) -> None:
+        """Suma un candidato generado o juzgado (se llama desde varios hilos)."""
+        with self._lock:
+            if stage == "generated":
+                self.candidates_generated += 1
+            else:
+                self.candidates_judged += 1
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancel_event.is_set():
+            raise CancelledError(f"Job {self.id} cancelado")
+
+    def to_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": {
+                "candidates_total": self.candidates_total,
+                "candidates_generated": self.candidates_generated,
+                "candidates_judged": self.candidates_judged,
+            },
+        }
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+def _default_error(err: Exception) -> dict:
+    return {"status_code": 500, "detail": str(err)}
+
+
+class JobQueue:
+    """Jobs en memoria ejecutados por un pool de hilos."""
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = JOBS_MAX_WORKERS,
+        retention_s: float = JOBS_RETENTION_S,
+        error_formatter: Callable[[Exception], dict] = _default_error,
+    ):
+        self.retention_s = retention_s
+        self.error_formatter = error_formatter
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="story-job"
+        )
+        self._jobs: dict[str, Job] = {}
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, work: Callable[[Job], dict], *, candidates_total: int = 0) -> Job:
+        """Encola `work(job)`; su valor de retorno queda en `job.result`."""
+        self._purge()
+        job = Job(id=uuid.uuid4().hex, candidates_total=candidates_total)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._futures[job.id] = self._executor.submit(self._run, job, work)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancela un job encolado o en curso. Los terminados no cambian."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            future = self._futures.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_event.set()
+        if future is not None and future.cancel():
+            # Todavía no había arrancado: no va a correr nunca
+            self._finish(job, "cancelled")
+        return job
+
+    def shutdown(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, work: Callable[[Job], dict]) -> None:
+        if job.cancel_event.is_set():
+            self._finish(job, "cancelled")
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            result = work(job)
+        except CancelledError:
+            self._finish(job, "cancelled")
+        except Exception as err:
+            self._finish(job, "failed", error=self.error_formatter(err))
+        else:
+            if job.cancel_event.is_set():
+                self._finish(job, "cancelled")
+            else:
+                self._finish(job, "succeeded", result=result)
+
+    @staticmethod
+    def _finish(
+        job: Job,
+        status: JobStatus,
+        *,
+        result: Optional[dict] = None,
+        error: Optional[dict] = None,
+    ) -> None:
+        with job._lock:
+            if job.finished:
+                return
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+            job.status = status
+
+    def _purge(self) -> None:
+        """Descarta los jobs terminados hace más de `retention_s`."""
+        cutoff = time.time() - self.retention_s
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.finished and job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+                self._futures.pop(job_id, None)
+
+
+__all__ = ["Job", "JobQueue", "JobStatus"]
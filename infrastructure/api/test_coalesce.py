@@ -0,0 +1,81 @@
+"""
+Test de `SingleFlight`: varios hilos con la misma clave comparten una única
+ejecución, su resultado y su error.
+"""
+
+import threading
+import time
+
+from infrastructure.api.coalesce import SingleFlight
+
+THREADS = 8
+
+
+def run_concurrently(flight: SingleFlight, fn) -> list:
+    """
+    Lanza THREADS llamados a `flight.do("cuento", ...)` a la vez y devuelve lo
+    que obtuvo cada uno: (resultado, compartido) o la excepción.
+    """
+    outcomes: list = []
+    lock = threading.Lock()
+    arrived = threading.Barrier(THREADS)
+
+    def leader_fn():
+        # Da tiempo a que el resto de los hilos encuentre el llamado en curso
+        time.sleep(0.2)
+        return fn()
+
+    def worker():
+        arrived.wait(timeout=5)
+        try:
+            outcome = flight.do("cuento", leader_fn)
+        except Exception as err:
+            outcome = err
+        with lock:
+            outcomes.append(outcome)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return outcomes
+
+
+def test_una_sola_ejecucion_compartida():
+    flight = SingleFlight()
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return "había una vez"
+
+    outcomes = run_concurrently(flight, generate)
+
+    assert len(calls) == 1
+    assert [text for text, _ in outcomes] == ["había una vez"] * THREADS
+    assert sorted(shared for _, shared in outcomes) == [False] + [True] * (THREADS - 1)
+    assert flight.in_flight() == 0
+
+
+def test_el_error_del_lider_llega_a_los_demas():
+    flight = SingleFlight()
+    error = RuntimeError("cuota agotada")
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise error
+
+    outcomes = run_concurrently(flight, fail)
+
+    assert len(calls) == 1
+    assert outcomes == [error] * THREADS
+    assert flight.in_flight() == 0
+
+
+def test_llamados_sucesivos_vuelven_a_ejecutar():
+    flight = SingleFlight()
+    assert flight.do("cuento", lambda: 1) == (1, False)
+    assert flight.do("cuento", lambda: 2) == (2, False)
+    assert flight.in_flight() == 0
@@ -0,0 +1,104 @@
+"""
+Test de `JobQueue`: progreso, cancelación (encolado y en curso), errores y
+descarte de los jobs terminados después de `retention_s`.
+"""
+
+import threading
+import time
+
+import pytest
+
+from infrastructure.api import jobs as jobs_module
+from infrastructure.api.jobs import Job, JobQueue
+
+
+def wait_finished(job: Job, timeout: float = 5.0) -> Job:
+    deadline = time.monotonic() + timeout
+    while not job.finished:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"El job sigue {job.status}")
+        time.sleep(0.01)
+    return job
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(max_workers=1, retention_s=60)
+    yield queue
+    queue.shutdown()
+
+
+def test_progreso_y_resultado(queue):
+    def work(job: Job) -> dict:
+        for _ in range(3):
+            job.advance("generated")
+        for _ in range(2):
+            job.advance("judged")
+        return {"story": "había una vez"}
+
+    job = wait_finished(queue.submit(work, candidates_total=3))
+
+    data = job.to_dict()
+    assert data["status"] == "succeeded"
+    assert data["result"] == {"story": "había una vez"}
+    assert data["progress"] == {
+        "candidates_total": 3,
+        "candidates_generated": 3,
+        "candidates_judged": 2,
+    }
+
+
+def test_error(queue):
+    def work(job: Job) -> dict:
+        raise RuntimeError("sin cuota")
+
+    job = wait_finished(queue.submit(work))
+    assert job.status == "failed"
+    assert job.error == {"status_code": 500, "detail": "sin cuota"}
+
+
+def test_cancelar_en_curso(queue):
+    started = threading.Event()
+
+    def work(job: Job) -> dict:
+        started.set()
+        # Trabajo cooperativo: revisa la cancelación entre candidatos
+        while True:
+            job.raise_if_cancelled()
+            time.sleep(0.01)
+
+    job = queue.submit(work)
+    assert started.wait(timeout=5)
+    assert job.status == "running"
+
+    assert queue.cancel(job.id) is job
+    assert wait_finished(job).status == "cancelled"
+    assert job.result is None
+
+
+def test_cancelar_encolado(queue):
+    release = threading.Event()
+    blocker = queue.submit(lambda job: release.wait(timeout=5) and {})
+    queued = queue.submit(lambda job: {"story": "no debería correr"})
+
+    queue.cancel(queued.id)
+    assert queued.status == "cancelled"
+
+    release.set()
+    wait_finished(blocker)
+    assert queued.result is None
+    # Un job terminado no cambia al cancelarlo
+    assert queue.cancel(blocker.id).status == "succeeded"
+
+
+def test_cancelar_inexistente(queue):
+    assert queue.cancel("no-existe") is None
+
+
+def test_retencion(queue, monkeypatch):
+    job = wait_finished(queue.submit(lambda job: {}))
+    assert queue.get(job.id) is job
+
+    finished_at = job.finished_at
+    monkeypatch.setattr(jobs_module.time, "time", lambda: finished_at + 61)
+    assert queue.get(job.id) is None
@@ -1,4 +1,6 @@
-from typing import Optional, Literal, TypedDict, List
+from typing import Any, AsyncIterator, Iterator, Optional, Literal, TypedDict, List
+
+from .metrics import TokenUsage
 
 
 ProviderName = Literal["openai", "gemini", "local"]
@@ -20,6 +22,9 @@ def build_messages(prompt: str, system_prompt: Optional[str]) -> List[ChatMessag
 
 
 class BaseLLMProvider:
+    """Interfaz de los proveedores. Si se pasa `usage`, el proveedor completa
+    los tokens de entrada/salida que reporta la API."""
+
     def generate(
         self,
         messages: List[ChatMessage],
@@ -27,6 +32,43 @@ class BaseLLMProvider:
         temperature: float,
         max_tokens: Optional[int],
         stream: bool,
+        seed: Optional[int] = None,
+        response_schema: Optional[dict[str, Any]] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> str:
+        raise NotImplementedError
+
+    async def agenerate(
+        self,
+        messages: List[ChatMessage],
+        *,
+        temperature: float,
+        max_tokens: Optional[int],
+        stream: bool,
+        seed: Optional[int] = None,
+        response_schema: Optional[dict[str, Any]] = None,
+        usage: Optional[TokenUsage] = None,
     ) -> str:
         raise NotImplementedError
 
+    def stream(
+        self,
+        messages: List[ChatMessage],
+        *,
+        temperature: float,
+        max_tokens: Optional[int],
+        seed: Optional[int] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> Iterator[str]:
+        raise NotImplementedError
+
+    def astream(
+        self,
+        messages: List[ChatMessage],
+        *,
+        temperature: float,
+        max_tokens: Optional[int],
+        seed: Optional[int] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> AsyncIterator[str]:
+        raise NotImplementedError
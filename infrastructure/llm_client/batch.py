@@ -0,0 +1,439 @@
+"""Ejecución batch de llamadas al LLM para corridas offline.
+
+Las corridas de la tesis (generación de N candidatos, evaluación del corpus) no
+necesitan latencia interactiva. `LLMBatch` junta pedidos identificados por un
+`custom_id` (p. ej. "prestamista/candidate-2"), los envía en una sola
+submission a la Batch API del proveedor, hace polling y devuelve los resultados
+por `custom_id`.
+
+Backends:
+    - `OpenAIBatchBackend`: JSONL de /v1/chat/completions + OpenAI Batch API.
+    - `GeminiBatchBackend`: JSONL de GenerateContentRequest + Gemini batch.
+    - `FileBatchBackend`: stand-in local basado en archivos que resuelve cada
+      pedido con el proveedor interactivo; sirve para tests y para LM Studio.
+
+Si el cliente tiene `LLMResponseCache`, los pedidos ya cacheados no se envían
+y los resultados nuevos se guardan con la misma clave que usaría
+`ClientLLM.generate`, de modo que una corrida posterior los reutiliza.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Literal, Optional
+
+from .base import BaseLLMProvider, ChatMessage, build_messages
+from .structured import ResponseSchema, to_json_schema
+
+if TYPE_CHECKING:
+    from .client import ClientLLM
+    from .gemini_client import GeminiProvider
+    from .openai_client import OpenAIProvider
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_DIR = os.getenv(
+    "LLM_BATCH_DIR", os.path.join(tempfile.gettempdir(), "llm_batches")
+)
+
+# Estados normalizados de un batch
+BATCH_RUNNING = "running"
+BATCH_COMPLETED = "completed"
+BATCH_FAILED = "failed"
+
+
+@dataclass
+class BatchRequest:
+    custom_id: str
+    messages: list[ChatMessage]
+    temperature: float = 0.7
+    max_tokens: Optional[int] = None
+    seed: Optional[int] = None
+    response_schema: Optional[dict[str, Any]] = None
+
+
+@dataclass
+class BatchResult:
+    custom_id: str
+    text: Optional[str] = None
+    error: Optional[str] = None
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.text is not None
+
+
+class BatchBackend:
+    """Interfaz de un backend batch: enviar, consultar estado y leer resultados."""
+
+    def submit(self, requests: list[BatchRequest]) -> str:
+        raise NotImplementedError
+
+    def status(self, batch_id: str) -> str:
+        raise NotImplementedError
+
+    def results(self, batch_id: str) -> dict[str, BatchResult]:
+        raise NotImplementedError
+
+
+def _write_jsonl(path: str, rows: list[dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def _read_jsonl(text: str) -> list[dict[str, Any]]:
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API (/v1/chat/completions, ventana de 24h)."""
+
+    endpoint: Literal["/v1/chat/completions"] = "/v1/chat/completions"
+
+    def __init__(self, provider: "OpenAIProvider", *, work_dir: str = DEFAULT_BATCH_DIR):
+        self.provider = provider
+        self.work_dir = work_dir
+
+    def submit(self, requests: list[BatchRequest]) -> str:
+        rows = [
+            {
+                "custom_id": request.custom_id,
+                "method": "POST",
+                "url": self.endpoint,
+                "body": self.provider._build_kwargs(
+                    request.messages,
+                    temperature=request.temperature,
+                    max_tokens=request.max_tokens,
+                    stream=False,
+                    seed=request.seed,
+                    response_schema=request.response_schema,
+                ),
+            }
+            for request in requests
+        ]
+        path = os.path.join(self.work_dir, f"openai-{uuid.uuid4().hex}.jsonl")
+        _write_jsonl(path, rows)
+
+        client = self.provider.client
+        with open(path, "rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=self.endpoint,
+            completion_window="24h",
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        batch = self.provider.client.batches.retrieve(batch_id)
+        if batch.status == "completed":
+            return BATCH_COMPLETED
+        if batch.status in ("failed", "expired", "cancelled"):
+            return BATCH_FAILED
+        return BATCH_RUNNING
+
+    def results(self, batch_id: str) -> dict[str, BatchResult]:
+        client = self.provider.client
+        batch = client.batches.retrieve(batch_id)
+        results: dict[str, BatchResult] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for row in _read_jsonl(client.files.content(file_id).text):
+                custom_id = row["custom_id"]
+                response = row.get("response") or {}
+                if row.get("error") or response.get("status_code", 200) != 200:
+                    error = row.get("error") or response.get("body")
+                    results[custom_id] = BatchResult(custom_id, error=str(error))
+                    continue
+                message = response["body"]["choices"][0]["message"]
+                results[custom_id] = BatchResult(
+                    custom_id, text=message.get("content") or ""
+                )
+        return results
+
+
+# snake_case de GenerateContentConfig -> camelCase del JSON de la API REST
+_GEMINI_CONFIG_FIELDS = {
+    "temperature": "temperature",
+    "max_output_tokens": "maxOutputTokens",
+    "seed": "seed",
+    "response_mime_type": "responseMimeType",
+    "response_json_schema": "responseJsonSchema",
+}
+
+
+class GeminiBatchBackend(BatchBackend):
+    """Gemini Batch Mode con un archivo JSONL de GenerateContentRequest."""
+
+    def __init__(self, provider: "GeminiProvider", *, work_dir: str = DEFAULT_BATCH_DIR):
+        self.provider = provider
+        self.work_dir = work_dir
+
+    def _request_row(self, request: BatchRequest) -> dict[str, Any]:
+        prompt, config = self.provider._build_config(
+            request.messages,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            seed=request.seed,
+            response_schema=request.response_schema,
+        )
+        body: dict[str, Any] = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {
+                _GEMINI_CONFIG_FIELDS[key]: value
+                for key, value in config.items()
+                if key in _GEMINI_CONFIG_FIELDS
+            },
+        }
+        if config.get("system_instruction"):
+            body["systemInstruction"] = {
+                "parts": [{"text": config["system_instruction"]}]
+            }
+        return {"key": request.custom_id, "request": body}
+
+    def submit(self, requests: list[BatchRequest]) -> str:
+        path = os.path.join(self.work_dir, f"gemini-{uuid.uuid4().hex}.jsonl")
+        _write_jsonl(path, [self._request_row(request) for request in requests])
+
+        client = self.provider.client
+        uploaded = client.files.upload(file=path, config={"mime_type": "jsonl"})
+        if not uploaded.name:
+            raise RuntimeError(f"Gemini no devolvió el nombre del archivo subido: {path}")
+        job = client.batches.create(
+            model=self.provider.model_id,
+            src=uploaded.name,
+            config={"display_name": os.path.basename(path)},
+        )
+        if not job.name:
+            raise RuntimeError("Gemini no devolvió el nombre del batch creado")
+        return job.name
+
+    def status(self, batch_id: str) -> str:
+        job_state = self.provider.client.batches.get(name=batch_id).state
+        state = job_state.name if job_state is not None else ""
+        if state in ("JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED"):
+            return BATCH_COMPLETED
+        if state in ("JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"):
+            return BATCH_FAILED
+        return BATCH_RUNNING
+
+    def results(self, batch_id: str) -> dict[str, BatchResult]:
+        client = self.provider.client
+        job = client.batches.get(name=batch_id)
+        if job.dest is None or not job.dest.file_name:
+            return {}
+        content = client.files.download(file=job.dest.file_name)
+        results: dict[str, BatchResult] = {}
+        for row in _read_jsonl(content.decode("utf-8")):
+            key = row["key"]
+            if row.get("error"):
+                results[key] = BatchResult(key, error=str(row["error"]))
+                continue
+            candidates = (row.get("response") or {}).get("candidates") or []
+            parts = candidates[0].get("content", {}).get("parts", []) if candidates else []
+            results[key] = BatchResult(
+                key, text="".join(part.get("text", "") for part in parts)
+            )
+        return results
+
+
+class FileBatchBackend(BatchBackend):
+    """Stand-in local: guarda el batch en disco y lo resuelve con el proveedor
+    interactivo la primera vez que se consulta su estado.
+
+    Layout: `<work_dir>/<batch_id>/input.jsonl` y `output.jsonl`.
+    """
+
+    def __init__(self, provider: BaseLLMProvider, *, work_dir: str = DEFAULT_BATCH_DIR):
+        self.provider = provider
+        self.work_dir = work_dir
+
+    def _path(self, batch_id: str, name: str) -> str:
+        return os.path.join(self.work_dir, batch_id, name)
+
+    def submit(self, requests: list[BatchRequest]) -> str:
+        batch_id = f"file-{uuid.uuid4().hex}"
+        _write_jsonl(
+            self._path(batch_id, "input.jsonl"),
+            [asdict(request) for request in requests],
+        )
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        output_path = self._path(batch_id, "output.jsonl")
+        if not os.path.exists(output_path):
+            self._process(batch_id)
+        return BATCH_COMPLETED
+
+    def _process(self, batch_id: str) -> None:
+        with open(self._path(batch_id, "input.jsonl"), "r", encoding="utf-8") as f:
+            requests = [BatchRequest(**row) for row in _read_jsonl(f.read())]
+
+        rows = []
+        for request in requests:
+            try:
+                text = self.provider.generate(
+                    request.messages,
+                    temperature=request.temperature,
+                    max_tokens=request.max_tokens,
+                    stream=False,
+                    seed=request.seed,
+                    response_schema=request.response_schema,
+                )
+                rows.append({"custom_id": request.custom_id, "text": text})
+            except Exception as err:
+                rows.append({"custom_id": request.custom_id, "error": str(err)})
+        _write_jsonl(self._path(batch_id, "output.jsonl"), rows)
+
+    def results(self, batch_id: str) -> dict[str, BatchResult]:
+        with open(self._path(batch_id, "output.jsonl"), "r", encoding="utf-8") as f:
+            rows = _read_jsonl(f.read())
+        return {
+            row["custom_id"]: BatchResult(
+                row["custom_id"], text=row.get("text"), error=row.get("error")
+            )
+            for row in rows
+        }
+
+
+def default_batch_backend(
+    client: "ClientLLM", *, work_dir: str = DEFAULT_BATCH_DIR
+) -> BatchBackend:
+    """Backend nativo del proveedor; LM Studio no tiene Batch API y usa el de archivos."""
+    provider_impl = client.provider_impl
+    if client.provider == "openai":
+        from .openai_client import OpenAIProvider
+
+        if isinstance(provider_impl, OpenAIProvider):
+            return OpenAIBatchBackend(provider_impl, work_dir=work_dir)
+    if client.provider == "gemini":
+        from .gemini_client import GeminiProvider
+
+        if isinstance(provider_impl, GeminiProvider):
+            return GeminiBatchBackend(provider_impl, work_dir=work_dir)
+    return FileBatchBackend(provider_impl, work_dir=work_dir)
+
+
+class LLMBatch:
+    """Junta pedidos de un `ClientLLM` y los ejecuta como una única submission."""
+
+    def __init__(
+        self,
+        client: "ClientLLM",
+        backend: Optional[BatchBackend] = None,
+        *,
+        poll_interval: float = 30.0,
+        timeout: Optional[float] = None,
+    ):
+        if client.cache is not None and client.cache.mode == "replay":
+            # Los resultados se guardan en el cache y en replay es de solo lectura
+            raise ValueError("El modo batch necesita un cache escribible (no replay)")
+        self.client = client
+        self.backend = backend or default_batch_backend(client)
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.batch_id: Optional[str] = None
+        self._requests: dict[str, BatchRequest] = {}
+        self._cached: dict[str, BatchResult] = {}
+
+    def add(
+        self,
+        custom_id: str,
+        prompt: str,
+        *,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        seed: Optional[int] = None,
+        response_schema: Optional[ResponseSchema] = None,
+    ) -> None:
+        """Agrega un pedido; acepta los mismos parámetros que `ClientLLM.generate`."""
+        if custom_id in self._requests or custom_id in self._cached:
+            raise ValueError(f"custom_id duplicado en el batch: {custom_id}")
+
+        request = BatchRequest(
+            custom_id=custom_id,
+            messages=build_messages(prompt, system_prompt),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            seed=seed,
+            response_schema=to_json_schema(response_schema) if response_schema else None,
+        )
+        cache = self.client.cache
+        cache_key = self._cache_key(request)
+        if cache is not None and cache_key is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                self._cached[custom_id] = BatchResult(custom_id, text=cached, cached=True)
+                return
+        self._requests[custom_id] = request
+
+    def __len__(self) -> int:
+        return len(self._requests) + len(self._cached)
+
+    def run(self) -> dict[str, BatchResult]:
+        """Envía los pedidos pendientes, espera a que termine y devuelve todo por custom_id."""
+        results = dict(self._cached)
+        if not self._requests:
+            return results
+
+        self.batch_id = self.backend.submit(list(self._requests.values()))
+        logger.info("[Batch] %d pedidos enviados (%s)", len(self._requests), self.batch_id)
+
+        started = time.monotonic()
+        while True:
+            status = self.backend.status(self.batch_id)
+            if status == BATCH_COMPLETED:
+                break
+            if status == BATCH_FAILED:
+                raise RuntimeError(f"El batch {self.batch_id} terminó con error")
+            if self.timeout is not None and time.monotonic() - started > self.timeout:
+                raise TimeoutError(f"El batch {self.batch_id} no terminó a tiempo")
+            time.sleep(self.poll_interval)
+
+        cache = self.client.cache
+        fetched = self.backend.results(self.batch_id)
+        for custom_id, request in self._requests.items():
+            result = fetched.get(custom_id) or BatchResult(
+                custom_id, error="Sin resultado en la salida del batch"
+            )
+            cache_key = self._cache_key(request)
+            if (
+                cache is not None
+                and cache_key is not None
+                and result.error is None
+                and result.text is not None
+            ):
+                cache.set(cache_key, result.text)
+            results[custom_id] = result
+        return results
+
+    def _cache_key(self, request: BatchRequest) -> Optional[str]:
+        return self.client._cache_key(
+            request.messages,
+            request.temperature,
+            request.max_tokens,
+            request.seed,
+            request.response_schema,
+        )
+
+
+__all__ = [
+    "BatchBackend",
+    "BatchRequest",
+    "BatchResult",
+    "DEFAULT_BATCH_DIR",
+    "FileBatchBackend",
+    "GeminiBatchBackend",
+    "LLMBatch",
+    "OpenAIBatchBackend",
+    "default_batch_backend",
+]
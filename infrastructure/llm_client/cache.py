@@ -0,0 +1,182 @@
+"""Cache persistente de respuestas de LLM.
+
+Las respuestas se guardan en SQLite, direccionadas por el hash del contenido
+de la llamada (proveedor, modelo, mensajes, temperature, max_tokens y seed).
+Es opt-in: solo se usa si se le pasa una instancia a `ClientLLM`.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Literal, Optional
+
+from .base import ChatMessage
+from .exceptions import LLMCacheMissError
+
+CacheMode = Literal["readwrite", "replay"]
+
+CACHE_MODES: frozenset[CacheMode] = frozenset({"readwrite", "replay"})
+
+
+class LLMResponseCache:
+    """Cache clave→respuesta en SQLite con TTL, límite de entradas y contadores.
+
+    Modos:
+        - "readwrite": lee del cache y guarda las respuestas nuevas.
+        - "replay": solo lectura; un miss levanta `LLMCacheMissError` para
+          garantizar que un experimento se reproduce exactamente.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        mode: CacheMode = "readwrite",
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Modo de cache no soportado: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(
+        *,
+        provider: str,
+        model: str,
+        messages: list[ChatMessage],
+        temperature: float,
+        max_tokens: Optional[int],
+        seed: Optional[int],
+        response_schema: Optional[dict[str, Any]] = None,
+    ) -> str:
+        payload = {
+            "provider": provider,
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "seed": seed,
+        }
+        # Solo si hay schema, para no invalidar las claves ya guardadas
+        if response_schema is not None:
+            payload["response_schema"] = response_schema
+        canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Devuelve la respuesta cacheada o None. En modo replay un miss es un error."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            # En replay el TTL no aplica: lo grabado se reproduce tal cual
+            if (
+                row is not None
+                and self.mode != "replay"
+                and self._is_expired(row[1], now)
+            ):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                if self.mode == "replay":
+                    raise LLMCacheMissError(
+                        f"Respuesta no encontrada en el cache (modo replay): {key}"
+                    )
+                return None
+
+            self.hits += 1
+            if self.mode != "replay":
+                self._conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        if self.mode == "replay":
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "path": self.path,
+                "mode": self.mode,
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _evict(self, now: float) -> None:
+        """Elimina entradas vencidas y, si se supera `max_entries`, las menos usadas."""
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        if self.max_entries is not None:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entries,),
+            )
+
+
+__all__ = ["CACHE_MODES", "LLMResponseCache"]
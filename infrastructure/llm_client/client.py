@@ -1,19 +1,39 @@
 import os
-from typing import Optional
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Iterator, Optional
 
-from openai import OpenAI
-from google import genai
-
-from .base import build_messages, BaseLLMProvider, ProviderName, SUPPORTED_PROVIDERS
-from .openai_client import OpenAIProvider
-from .gemini_client import GeminiProvider
+from .base import (
+    build_messages,
+    BaseLLMProvider,
+    ChatMessage,
+    ProviderName,
+    SUPPORTED_PROVIDERS,
+)
+from .batch import BatchBackend, LLMBatch
+from .cache import LLMResponseCache
+from .metrics import LLMCallRecord, TokenUsage, current_caller, llm_metrics
+from .pool import client_pool
+from .rate_limit import RateLimiter, estimate_tokens
+from .structured import ResponseSchema, to_json_schema
 from .utils import DEFAULT_LOCAL_BASE_URL
 
 
 class ClientLLM:
     """Facade cliente para distintos proveedores de LLM.
 
-    La implementación concreta de cada proveedor está separada en módulos
+    La implementación concreta de cada proveedor está separada en módulos.
+    Los clientes SDK subyacentes se toman del pool compartido (`client_pool`);
+    los async, del event loop en curso, así `agenerate` puede usarse desde
+    sucesivos `asyncio.run`.
+    Si se pasa un `LLMResponseCache`, las respuestas se leen/guardan en él.
+    Si se pasa un `RateLimiter`, las llamadas al proveedor respetan sus límites
+    de RPM/TPM y los 429 se reintentan según el Retry-After.
+    `generate` acepta un `response_schema` para pedir JSON con la salida
+    estructurada nativa del proveedor; la respuesta se lee con `extract_json`.
+    Cada llamada emite un `LLMCallRecord` a `llm_metrics` (ver `metrics.py`).
+    Los SDK (`openai`, `google.genai`) se importan recién al crear el proveedor
+    que los usa.
     """
 
     def __init__(
@@ -23,12 +43,16 @@ class ClientLLM:
         model: str,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
+        cache: Optional[LLMResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
     ):
         if provider not in SUPPORTED_PROVIDERS:
             raise ValueError(f"Proveedor no soportado: {provider}")
 
         self.provider = provider
         self.model = model
+        self.cache = cache
+        self.rate_limiter = rate_limiter
         self.provider_impl = self._resolve_provider(
             provider=provider, model=model, api_key=api_key, base_url=base_url
         )
@@ -41,13 +65,275 @@ class ClientLLM:
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
         stream: bool = False,
+        seed: Optional[int] = None,
+        response_schema: Optional[ResponseSchema] = None,
+        caller: Optional[str] = None,
+    ) -> str:
+        started = time.perf_counter()
+        caller = caller or current_caller()
+        messages = build_messages(prompt, system_prompt)
+        json_schema = to_json_schema(response_schema) if response_schema else None
+        cache = self.cache
+        cache_key = self._cache_key(
+            messages, temperature, max_tokens, seed, json_schema
+        )
+        if cache is not None and cache_key is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                self._record("generate", caller, started, cached=True)
+                return cached
+
+        usage = TokenUsage()
+
+        def call() -> str:
+            return self.provider_impl.generate(
+                messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=stream,
+                seed=seed,
+                response_schema=json_schema,
+                usage=usage,
+            )
+
+        try:
+            if self.rate_limiter is None:
+                response = call()
+            else:
+                response = self.rate_limiter.run(
+                    call, estimated_tokens=self._estimate_tokens(messages, max_tokens)
+                )
+        except Exception as err:
+            self._record("generate", caller, started, usage=usage, error=err)
+            raise
+        self._record("generate", caller, started, usage=usage)
+        if cache is not None and cache_key is not None:
+            cache.set(cache_key, response)
+        return response
+
+    async def agenerate(
+        self,
+        prompt: str,
+        *,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        stream: bool = False,
+        seed: Optional[int] = None,
+        response_schema: Optional[ResponseSchema] = None,
+        caller: Optional[str] = None,
     ) -> str:
+        """Versión asíncrona de `generate` sobre el cliente async del proveedor."""
+        started = time.perf_counter()
+        caller = caller or current_caller()
+        messages = build_messages(prompt, system_prompt)
+        json_schema = to_json_schema(response_schema) if response_schema else None
+        cache = self.cache
+        cache_key = self._cache_key(
+            messages, temperature, max_tokens, seed, json_schema
+        )
+        if cache is not None and cache_key is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                self._record("agenerate", caller, started, cached=True)
+                return cached
+
+        usage = TokenUsage()
+
+        def call():
+            return self.provider_impl.agenerate(
+                messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=stream,
+                seed=seed,
+                response_schema=json_schema,
+                usage=usage,
+            )
+
+        try:
+            if self.rate_limiter is None:
+                response = await call()
+            else:
+                response = await self.rate_limiter.arun(
+                    call, estimated_tokens=self._estimate_tokens(messages, max_tokens)
+                )
+        except Exception as err:
+            self._record("agenerate", caller, started, usage=usage, error=err)
+            raise
+        self._record("agenerate", caller, started, usage=usage)
+        if cache is not None and cache_key is not None:
+            cache.set(cache_key, response)
+        return response
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        seed: Optional[int] = None,
+        caller: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Devuelve los fragmentos de texto a medida que el proveedor los emite.
+
+        Si la respuesta ya está en el cache se emite entera como un único
+        fragmento; si no, al terminar el stream se guarda el texto completo.
+        """
+        started = time.perf_counter()
+        caller = caller or current_caller()
+        messages = build_messages(prompt, system_prompt)
+        cache = self.cache
+        cache_key = self._cache_key(messages, temperature, max_tokens, seed)
+        if cache is not None and cache_key is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                self._record("stream", caller, started, cached=True)
+                yield cached
+                return
+
+        # En streaming no se reintenta: un 429 a mitad del texto ya emitido
+        # no se puede repetir de forma transparente.
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self._estimate_tokens(messages, max_tokens))
+
+        usage = TokenUsage()
+        ttft = None
+        parts = []
+        try:
+            for part in self.provider_impl.stream(
+                messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                seed=seed,
+                usage=usage,
+            ):
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                parts.append(part)
+                yield part
+        except Exception as err:
+            self._record("stream", caller, started, usage=usage, ttft=ttft, error=err)
+            raise
+        self._record("stream", caller, started, usage=usage, ttft=ttft)
+
+        if cache is not None and cache_key is not None:
+            cache.set(cache_key, "".join(parts))
+
+    async def astream(
+        self,
+        prompt: str,
+        *,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        seed: Optional[int] = None,
+        caller: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Versión asíncrona de `stream`."""
+        started = time.perf_counter()
+        caller = caller or current_caller()
         messages = build_messages(prompt, system_prompt)
+        cache = self.cache
+        cache_key = self._cache_key(messages, temperature, max_tokens, seed)
+        if cache is not None and cache_key is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                self._record("astream", caller, started, cached=True)
+                yield cached
+                return
+
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire(
+                self._estimate_tokens(messages, max_tokens)
+            )
 
-        return self.provider_impl.generate(
-            messages, temperature=temperature, max_tokens=max_tokens, stream=stream
+        usage = TokenUsage()
+        ttft = None
+        parts = []
+        try:
+            async for part in self.provider_impl.astream(
+                messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                seed=seed,
+                usage=usage,
+            ):
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                parts.append(part)
+                yield part
+        except Exception as err:
+            self._record("astream", caller, started, usage=usage, ttft=ttft, error=err)
+            raise
+        self._record("astream", caller, started, usage=usage, ttft=ttft)
+
+        if cache is not None and cache_key is not None:
+            cache.set(cache_key, "".join(parts))
+
+    def _record(
+        self,
+        method: str,
+        caller: str,
+        started: float,
+        *,
+        usage: Optional[TokenUsage] = None,
+        ttft: Optional[float] = None,
+        cached: bool = False,
+        error: Optional[Exception] = None,
+    ) -> None:
+        llm_metrics.emit(
+            LLMCallRecord(
+                provider=self.provider,
+                model=self.model,
+                caller=caller,
+                method=method,
+                latency_s=round(time.perf_counter() - started, 4),
+                ttft_s=round(ttft, 4) if ttft is not None else None,
+                input_tokens=usage.input_tokens if usage else None,
+                output_tokens=usage.output_tokens if usage else None,
+                cached=cached,
+                ok=error is None,
+                error=f"{type(error).__name__}: {error}"[:300] if error else None,
+            )
+        )
+
+    def batch(
+        self,
+        backend: Optional[BatchBackend] = None,
+        *,
+        poll_interval: float = 30.0,
+        timeout: Optional[float] = None,
+    ) -> LLMBatch:
+        """Crea un `LLMBatch` para ejecutar pedidos offline con la Batch API del proveedor."""
+        return LLMBatch(self, backend, poll_interval=poll_interval, timeout=timeout)
+
+    def _cache_key(
+        self,
+        messages: list[ChatMessage],
+        temperature: float,
+        max_tokens: Optional[int],
+        seed: Optional[int],
+        response_schema: Optional[dict[str, Any]] = None,
+    ) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.make_key(
+            provider=self.provider,
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            seed=seed,
+            response_schema=response_schema,
         )
 
+    @staticmethod
+    def _estimate_tokens(messages: list[ChatMessage], max_tokens: Optional[int]) -> int:
+        text = "".join(message["content"] for message in messages)
+        return estimate_tokens(text, max_tokens)
+
     def _resolve_provider(
         self,
         *,
@@ -57,19 +343,26 @@ class ClientLLM:
         base_url: Optional[str],
     ) -> BaseLLMProvider:
         if provider == "openai":
+            from .openai_client import OpenAIProvider
+
             key = api_key or os.getenv("OPENAI_API_KEY")
             if not key:
                 raise RuntimeError("Falta OPENAI_API_KEY")
 
-            client_kwargs = {"api_key": key}
             resolved_base = base_url or os.getenv("OPENAI_BASE_URL")
-            if resolved_base:
-                client_kwargs["base_url"] = resolved_base
-
-            client = OpenAI(**client_kwargs)
-            return OpenAIProvider(client, model)
+            return OpenAIProvider(
+                client_pool.get_openai_client(api_key=key, base_url=resolved_base),
+                model,
+                partial(
+                    client_pool.get_async_openai_client,
+                    api_key=key,
+                    base_url=resolved_base,
+                ),
+            )
 
         if provider == "local":
+            from .openai_client import OpenAIProvider
+
             resolved_base = (
                 base_url
                 or os.getenv("LMSTUDIO_BASE_URL")
@@ -83,14 +376,27 @@ class ClientLLM:
                 or "lm-studio"
             )
 
-            client = OpenAI(api_key=token, base_url=resolved_base)
-            return OpenAIProvider(client, model)
+            return OpenAIProvider(
+                client_pool.get_openai_client(api_key=token, base_url=resolved_base),
+                model,
+                partial(
+                    client_pool.get_async_openai_client,
+                    api_key=token,
+                    base_url=resolved_base,
+                ),
+                include_stream_usage=False,
+            )
 
         if provider == "gemini":
+            from .gemini_client import GeminiProvider
+
             key = api_key or os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
             if not key:
                 raise RuntimeError("Falta GEMINI_API_KEY o GOOGLE_API_KEY")
-            client = genai.Client(api_key=key)
-            return GeminiProvider(client, model)
+            return GeminiProvider(
+                client_pool.get_gemini_client(api_key=key),
+                model,
+                partial(client_pool.get_async_gemini_client, api_key=key),
+            )
 
         raise ValueError(f"Proveedor no soportado: {provider}")
@@ -1,3 +1,6 @@
+from typing import Optional
+
+
 class LLMClientError(Exception):
     """Base exception for LLM client errors."""
     status_code: int = 500
@@ -6,6 +9,17 @@ class LLMClientError(Exception):
 class LLMQuotaExceededError(LLMClientError):
     """Raised when a provider returns a quota / rate-limit error (HTTP 429)."""
     status_code = 429
+
+    def __init__(self, message: str, *, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMCacheMissError(LLMClientError):
+    """Raised when a replay-only response cache has no entry for a request."""
+    status_code = 404
+
+
 class MissingAPIKeyError(RuntimeError):
     pass
 
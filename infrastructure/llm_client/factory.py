@@ -11,7 +11,9 @@ if TYPE_CHECKING:
     # Import for type checking only to avoid circular runtime import
     from .models import ModelEntry
 
+from .cache import LLMResponseCache
 from .client import ClientLLM, ProviderName
+from .rate_limit import RateLimiter
 
 
 def resolve_client(
@@ -20,6 +22,8 @@ def resolve_client(
     *,
     base_url: Optional[str] = None,
     api_key: Optional[str] = None,
+    cache: Optional[LLMResponseCache] = None,
+    rate_limiter: Optional[RateLimiter] = None,
 ) -> ClientLLM:
     normalized_raw = provider.lower()
     if normalized_raw not in ("openai", "gemini", "local"):
@@ -35,7 +39,14 @@ def resolve_client(
         elif normalized == "local":
             key = os.getenv("LMSTUDIO_API_KEY") or os.getenv("LOCAL_LLM_API_KEY")
 
-    return ClientLLM(provider=normalized, model=model, api_key=key, base_url=base_url)
+    return ClientLLM(
+        provider=normalized,
+        model=model,
+        api_key=key,
+        base_url=base_url,
+        cache=cache,
+        rate_limiter=rate_limiter,
+    )
 
 
 def get_client_for_entry(entry: "ModelEntry") -> ClientLLM:
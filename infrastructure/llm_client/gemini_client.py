@@ -1,50 +1,224 @@
-from typing import Dict, Optional
+import logging
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
 
 from google import genai
+from google.genai import errors as genai_errors
 
 from .base import BaseLLMProvider, ChatMessage
+from .exceptions import LLMQuotaExceededError
+from .metrics import TokenUsage
+from .utils import parse_retry_delay
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def _translate_quota_errors() -> Iterator[None]:
+    """Convierte los 429 / RESOURCE_EXHAUSTED del SDK en `LLMQuotaExceededError`."""
+    try:
+        yield
+    except genai_errors.ClientError as err:
+        if err.code == 429 or "RESOURCE_EXHAUSTED" in str(err):
+            raise LLMQuotaExceededError(
+                str(err), retry_after=parse_retry_delay(err.details)
+            ) from err
+        raise
+
+
+def _fill_usage(usage: Optional[TokenUsage], usage_metadata: Any) -> None:
+    if usage is None or usage_metadata is None:
+        return
+    usage.input_tokens = usage_metadata.prompt_token_count
+    usage.output_tokens = usage_metadata.candidates_token_count
 
 
 class GeminiProvider(BaseLLMProvider):
-    def __init__(self, client: genai.Client, model_id: str):
+    def __init__(
+        self,
+        client: genai.Client,
+        model_id: str,
+        async_client_factory: Optional[Callable[[], genai.Client]] = None,
+    ):
         self.client = client
         self.model_id = model_id
+        # Cliente cuyo `.aio` se usa en el event loop en curso (ver `ClientPool`)
+        self.async_client_factory = async_client_factory
 
-    def generate(
+    def _async_client(self) -> genai.Client:
+        if self.async_client_factory is None:
+            return self.client
+        return self.async_client_factory()
+
+    def _build_request(
         self,
         messages: list[ChatMessage],
         *,
         temperature: float,
         max_tokens: Optional[int],
-        stream: bool,
-    ) -> str:
+        seed: Optional[int],
+        response_schema: Optional[dict[str, Any]] = None,
+    ) -> tuple[str, Dict[str, Any]]:
+        prompt, config = self._build_config(
+            messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            seed=seed,
+            response_schema=response_schema,
+        )
+        logger.debug("[Gemini] Config enviada: %s", config)
+        logger.debug("[Gemini] Longitud del prompt: %d caracteres", len(prompt))
+        return prompt, config
+
+    @staticmethod
+    def _build_config(
+        messages: list[ChatMessage],
+        *,
+        temperature: float,
+        max_tokens: Optional[int],
+        seed: Optional[int],
+        response_schema: Optional[dict[str, Any]] = None,
+    ) -> tuple[str, Dict[str, Any]]:
+        """Prompt y config de generación, sin logging (lo reutiliza el modo batch)."""
         prompt = messages[-1]["content"]
         system_instruction = next(
             (m["content"] for m in messages if m["role"] == "system"), None
         )
 
-        config: Dict[str, str | float] = {"temperature": temperature}
+        config: Dict[str, Any] = {"temperature": temperature}
         if max_tokens is not None:
             config["max_output_tokens"] = max_tokens
+        if seed is not None:
+            config["seed"] = seed
+        if response_schema is not None:
+            config["response_mime_type"] = "application/json"
+            config["response_json_schema"] = response_schema
 
         if system_instruction:
             config["system_instruction"] = system_instruction
-        
-        print(f"[Gemini] Config enviada: {config}")
-        print(f"[Gemini] Longitud del prompt: {len(prompt)} caracteres")
+        return prompt, config
 
+    def generate(
+        self,
+        messages: list[ChatMessage],
+        *,
+        temperature: float,
+        max_tokens: Optional[int],
+        stream: bool,
+        seed: Optional[int] = None,
+        response_schema: Optional[dict[str, Any]] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> str:
         if stream:
+            return "".join(
+                self.stream(
+                    messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    seed=seed,
+                    usage=usage,
+                )
+            )
+
+        prompt, config = self._build_request(
+            messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            seed=seed,
+            response_schema=response_schema,
+        )
+        with _translate_quota_errors():
+            response = self.client.models.generate_content(
+                model=self.model_id,
+                contents=prompt,
+                config=config,
+            )
+        _fill_usage(usage, response.usage_metadata)
+        return response.text or ""
+
+    def stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        temperature: float,
+        max_tokens: Optional[int],
+        seed: Optional[int] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> Iterator[str]:
+        prompt, config = self._build_request(
+            messages, temperature=temperature, max_tokens=max_tokens, seed=seed
+        )
+        with _translate_quota_errors():
             response = self.client.models.generate_content_stream(
                 model=self.model_id,
                 contents=prompt,
                 config=config,
             )
-            out = "".join(chunk.text or "" for chunk in response)
-            return out
-        else:
-            response = self.client.models.generate_content(
+            for chunk in response:
+                # El uso es acumulado: el último chunk trae el total
+                _fill_usage(usage, chunk.usage_metadata)
+                if chunk.text:
+                    yield chunk.text
+
+    async def agenerate(
+        self,
+        messages: list[ChatMessage],
+        *,
+        temperature: float,
+        max_tokens: Optional[int],
+        stream: bool,
+        seed: Optional[int] = None,
+        response_schema: Optional[dict[str, Any]] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> str:
+        if stream:
+            parts = []
+            async for part in self.astream(
+                messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                seed=seed,
+                usage=usage,
+            ):
+                parts.append(part)
+            return "".join(parts)
+
+        prompt, config = self._build_request(
+            messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            seed=seed,
+            response_schema=response_schema,
+        )
+        with _translate_quota_errors():
+            response = await self._async_client().aio.models.generate_content(
+                model=self.model_id,
+                contents=prompt,
+                config=config,
+            )
+        _fill_usage(usage, response.usage_metadata)
+        return response.text or ""
+
+    async def astream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        temperature: float,
+        max_tokens: Optional[int],
+        seed: Optional[int] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> AsyncIterator[str]:
+        prompt, config = self._build_request(
+            messages, temperature=temperature, max_tokens=max_tokens, seed=seed
+        )
+        with _translate_quota_errors():
+            response = await self._async_client().aio.models.generate_content_stream(
                 model=self.model_id,
                 contents=prompt,
                 config=config,
             )
-            return response.text or ""
+            async for chunk in response:
+                # El uso es acumulado: el último chunk trae el total
+                _fill_usage(usage, chunk.usage_metadata)
+                if chunk.text:
+                    yield chunk.text
@@ -1,4 +1,4 @@
 """Local/LMStudio provider adapter."""
-from .client import OpenAIProvider as LocalProvider
+from .openai_client import OpenAIProvider as LocalProvider
 
 __all__ = ["LocalProvider"]
@@ -0,0 +1,247 @@
+"""Telemetría por llamada al LLM.
+
+Cada llamada de `ClientLLM` produce un `LLMCallRecord` (latencia, tiempo al
+primer token, tokens de entrada/salida, modelo y caller) que se envía a los
+sinks registrados en `llm_metrics`:
+
+    - `InMemoryMetricsSink`: agregador en memoria (registrado por defecto).
+    - `JSONLMetricsSink`: una línea JSON por llamada (LLM_METRICS_JSONL=path).
+    - `PrometheusMetricsSink`: histogramas/contadores de `prometheus_client`.
+
+El caller se etiqueta con `llm_caller("modo3")` alrededor del código que llama
+al LLM, o pasando `caller=` a los métodos de `ClientLLM`.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_CALLER = "unknown"
+
+_current_caller: ContextVar[Optional[str]] = ContextVar("llm_caller", default=None)
+
+
+@contextmanager
+def llm_caller(name: str) -> Iterator[None]:
+    """Etiqueta las llamadas al LLM hechas dentro del bloque (por hilo/tarea)."""
+    token = _current_caller.set(name)
+    try:
+        yield
+    finally:
+        _current_caller.reset(token)
+
+
+def current_caller() -> str:
+    return _current_caller.get() or UNKNOWN_CALLER
+
+
+@dataclass
+class TokenUsage:
+    """Tokens reportados por el proveedor; los completa el provider al responder."""
+
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+
+@dataclass
+class LLMCallRecord:
+    provider: str
+    model: str
+    caller: str
+    method: str
+    latency_s: float
+    ttft_s: Optional[float] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cached: bool = False
+    ok: bool = True
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+
+
+class MetricsSink:
+    def record(self, record: LLMCallRecord) -> None:
+        raise NotImplementedError
+
+
+def _percentile(values: list[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))
+    return round(ordered[index], 4)
+
+
+class InMemoryMetricsSink(MetricsSink):
+    """Guarda los últimos `max_records` registros y los agrega bajo demanda."""
+
+    def __init__(self, max_records: int = 10_000):
+        self.records: deque[LLMCallRecord] = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def record(self, record: LLMCallRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.records.clear()
+
+    def summary(self, group_by: tuple[str, ...] = ("caller", "model")) -> list[dict[str, Any]]:
+        """Totales por grupo: llamadas, errores, cache hits, latencias y tokens."""
+        with self._lock:
+            records = list(self.records)
+
+        groups: dict[tuple, list[LLMCallRecord]] = {}
+        for record in records:
+            key = tuple(getattr(record, attr) for attr in group_by)
+            groups.setdefault(key, []).append(record)
+
+        rows = []
+        for key, items in groups.items():
+            latencies = [r.latency_s for r in items if not r.cached]
+            ttfts = [r.ttft_s for r in items if r.ttft_s is not None and not r.cached]
+            rows.append(
+                {
+                    **dict(zip(group_by, key)),
+                    "calls": len(items),
+                    "errors": sum(1 for r in items if not r.ok),
+                    "cached": sum(1 for r in items if r.cached),
+                    "latency_avg_s": round(sum(latencies) / len(latencies), 4) if latencies else None,
+                    "latency_p95_s": _percentile(latencies, 0.95),
+                    "ttft_avg_s": round(sum(ttfts) / len(ttfts), 4) if ttfts else None,
+                    "input_tokens": sum(r.input_tokens or 0 for r in items),
+                    "output_tokens": sum(r.output_tokens or 0 for r in items),
+                }
+            )
+        return sorted(rows, key=lambda row: row["latency_avg_s"] or 0, reverse=True)
+
+
+class JSONLMetricsSink(MetricsSink):
+    """Agrega una línea JSON por llamada al archivo indicado."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, record: LLMCallRecord) -> None:
+        line = json.dumps(asdict(record), ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class PrometheusMetricsSink(MetricsSink):
+    """Exporta las llamadas como métricas de Prometheus (requiere `prometheus_client`)."""
+
+    def __init__(self, registry: Any = None):
+        try:
+            from prometheus_client import REGISTRY, Counter, Histogram
+        except ImportError as err:
+            raise RuntimeError(
+                "PrometheusMetricsSink requiere prometheus-client (pip install prometheus-client)"
+            ) from err
+
+        registry = registry or REGISTRY
+        labels = ("provider", "model", "caller")
+        self.latency = Histogram(
+            "llm_call_latency_seconds",
+            "Latencia de las llamadas al LLM (sin cache hits)",
+            labels,
+            registry=registry,
+            buckets=(0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160),
+        )
+        self.ttft = Histogram(
+            "llm_time_to_first_token_seconds",
+            "Tiempo al primer token en llamadas con streaming",
+            labels,
+            registry=registry,
+            buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16),
+        )
+        self.calls = Counter(
+            "llm_calls_total",
+            "Llamadas al LLM por resultado (ok, error, cached)",
+            (*labels, "status"),
+            registry=registry,
+        )
+        self.tokens = Counter(
+            "llm_tokens_total",
+            "Tokens consumidos por dirección (input, output)",
+            (*labels, "direction"),
+            registry=registry,
+        )
+
+    def record(self, record: LLMCallRecord) -> None:
+        labels = (record.provider, record.model, record.caller)
+        if record.cached:
+            status = "cached"
+        else:
+            status = "ok" if record.ok else "error"
+            self.latency.labels(*labels).observe(record.latency_s)
+            if record.ttft_s is not None:
+                self.ttft.labels(*labels).observe(record.ttft_s)
+        self.calls.labels(*labels, status).inc()
+        if record.input_tokens:
+            self.tokens.labels(*labels, "input").inc(record.input_tokens)
+        if record.output_tokens:
+            self.tokens.labels(*labels, "output").inc(record.output_tokens)
+
+
+class LLMMetrics:
+    """Distribuye cada registro a los sinks; un sink que falla nunca rompe la llamada."""
+
+    def __init__(self) -> None:
+        self.memory = InMemoryMetricsSink()
+        self.sinks: list[MetricsSink] = [self.memory]
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink: MetricsSink) -> MetricsSink:
+        with self._lock:
+            self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink: MetricsSink) -> None:
+        with self._lock:
+            if sink in self.sinks:
+                self.sinks.remove(sink)
+
+    def emit(self, record: LLMCallRecord) -> None:
+        with self._lock:
+            sinks = list(self.sinks)
+        for sink in sinks:
+            try:
+                sink.record(record)
+            except Exception:
+                logger.exception("Error registrando métricas en %s", type(sink).__name__)
+
+
+# Instancia global
+llm_metrics = LLMMetrics()
+
+if os.getenv("LLM_METRICS_JSONL"):
+    llm_metrics.add_sink(JSONLMetricsSink(os.environ["LLM_METRICS_JSONL"]))
+
+
+__all__ = [
+    "InMemoryMetricsSink",
+    "JSONLMetricsSink",
+    "LLMCallRecord",
+    "LLMMetrics",
+    "MetricsSink",
+    "PrometheusMetricsSink",
+    "TokenUsage",
+    "current_caller",
+    "llm_caller",
+    "llm_metrics",
+]
@@ -1,22 +1,68 @@
-from typing import Optional
-from openai import OpenAI
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+from openai import AsyncOpenAI, BadRequestError, OpenAI, RateLimitError
 
 from .base import BaseLLMProvider, ChatMessage
+from .exceptions import LLMQuotaExceededError
+from .metrics import TokenUsage
+from .structured import schema_name
+from .utils import parse_retry_after
+
+# (base_url, modelo) que rechazaron `response_format` con json_schema: a esos
+# se les pide directamente sin formato, sin pagar primero un 400.
+_json_schema_unsupported: set[tuple[str, str]] = set()
+
+
+@contextmanager
+def _translate_quota_errors() -> Iterator[None]:
+    """Convierte los 429 del SDK en `LLMQuotaExceededError` con su Retry-After."""
+    try:
+        yield
+    except RateLimitError as err:
+        raise LLMQuotaExceededError(
+            str(err), retry_after=parse_retry_after(err.response.headers)
+        ) from err
+
+
+def _rejects_response_format(err: BadRequestError) -> bool:
+    """El 400 es por el `response_format` (no por contexto, parámetros o filtros)."""
+    message = str(err).lower()
+    return "response_format" in message or "json_schema" in message
+
+
+def _fill_usage(usage: Optional[TokenUsage], response_usage: Any) -> None:
+    if usage is None or response_usage is None:
+        return
+    usage.input_tokens = response_usage.prompt_tokens
+    usage.output_tokens = response_usage.completion_tokens
 
 
 class OpenAIProvider(BaseLLMProvider):
-    def __init__(self, client: OpenAI, model: str):
+    def __init__(
+        self,
+        client: OpenAI,
+        model: str,
+        async_client_factory: Optional[Callable[[], AsyncOpenAI]] = None,
+        *,
+        include_stream_usage: bool = True,
+    ):
         self.client = client
         self.model = model
+        # Devuelve el cliente async del event loop en curso (ver `ClientPool`)
+        self.async_client_factory = async_client_factory
+        # `stream_options` no lo aceptan todos los servidores compatibles
+        self.include_stream_usage = include_stream_usage
 
-    def generate(
+    def _build_kwargs(
         self,
         messages: list[ChatMessage],
         *,
         temperature: float,
         max_tokens: Optional[int],
         stream: bool,
-    ) -> str:
+        seed: Optional[int],
+        response_schema: Optional[dict[str, Any]] = None,
+    ) -> dict[str, Any]:
         kwargs = {
             "model": self.model,
             "messages": messages,
@@ -25,10 +71,169 @@ class OpenAIProvider(BaseLLMProvider):
         }
         if max_tokens is not None:
             kwargs["max_tokens"] = max_tokens
+        if seed is not None:
+            kwargs["seed"] = seed
+        if stream and self.include_stream_usage:
+            kwargs["stream_options"] = {"include_usage": True}
+        if response_schema is not None and self.supports_json_schema:
+            kwargs["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": schema_name(response_schema),
+                    "schema": response_schema,
+                },
+            }
+        return kwargs
+
+    @property
+    def _format_key(self) -> tuple[str, str]:
+        return (str(self.client.base_url), self.model)
 
-        response = self.client.chat.completions.create(**kwargs)
+    @property
+    def supports_json_schema(self) -> bool:
+        return self._format_key not in _json_schema_unsupported
 
+    def _retry_without_format(self, err: BadRequestError, kwargs: dict[str, Any]) -> bool:
+        """Si el 400 es por el json_schema, lo recuerda y lo saca de `kwargs`."""
+        if "response_format" not in kwargs or not _rejects_response_format(err):
+            return False
+        # Modelos/servidores compatibles sin json_schema: la respuesta sin
+        # formato la parsea `extract_json`.
+        _json_schema_unsupported.add(self._format_key)
+        kwargs.pop("response_format")
+        return True
+
+    def _require_async_client(self) -> AsyncOpenAI:
+        if self.async_client_factory is None:
+            raise RuntimeError("OpenAIProvider sin cliente async configurado")
+        return self.async_client_factory()
+
+    def generate(
+        self,
+        messages: list[ChatMessage],
+        *,
+        temperature: float,
+        max_tokens: Optional[int],
+        stream: bool,
+        seed: Optional[int] = None,
+        response_schema: Optional[dict[str, Any]] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> str:
         if stream:
-            return "".join(chunk.choices[0].delta.content or "" for chunk in response)
+            return "".join(
+                self.stream(
+                    messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    seed=seed,
+                    usage=usage,
+                )
+            )
 
+        kwargs = self._build_kwargs(
+            messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=False,
+            seed=seed,
+            response_schema=response_schema,
+        )
+        with _translate_quota_errors():
+            try:
+                response = self.client.chat.completions.create(**kwargs)
+            except BadRequestError as err:
+                if not self._retry_without_format(err, kwargs):
+                    raise
+                response = self.client.chat.completions.create(**kwargs)
+        _fill_usage(usage, response.usage)
         return response.choices[0].message.content or ""
+
+    def stream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        temperature: float,
+        max_tokens: Optional[int],
+        seed: Optional[int] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> Iterator[str]:
+        kwargs = self._build_kwargs(
+            messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            seed=seed,
+        )
+        with _translate_quota_errors():
+            for chunk in self.client.chat.completions.create(**kwargs):
+                # Con include_usage, el último chunk trae el uso y no tiene choices
+                _fill_usage(usage, getattr(chunk, "usage", None))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    async def agenerate(
+        self,
+        messages: list[ChatMessage],
+        *,
+        temperature: float,
+        max_tokens: Optional[int],
+        stream: bool,
+        seed: Optional[int] = None,
+        response_schema: Optional[dict[str, Any]] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> str:
+        if stream:
+            parts = []
+            async for part in self.astream(
+                messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                seed=seed,
+                usage=usage,
+            ):
+                parts.append(part)
+            return "".join(parts)
+
+        kwargs = self._build_kwargs(
+            messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=False,
+            seed=seed,
+            response_schema=response_schema,
+        )
+        async_client = self._require_async_client()
+        with _translate_quota_errors():
+            try:
+                response = await async_client.chat.completions.create(**kwargs)
+            except BadRequestError as err:
+                if not self._retry_without_format(err, kwargs):
+                    raise
+                response = await async_client.chat.completions.create(**kwargs)
+        _fill_usage(usage, response.usage)
+        return response.choices[0].message.content or ""
+
+    async def astream(
+        self,
+        messages: list[ChatMessage],
+        *,
+        temperature: float,
+        max_tokens: Optional[int],
+        seed: Optional[int] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> AsyncIterator[str]:
+        kwargs = self._build_kwargs(
+            messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            seed=seed,
+        )
+        with _translate_quota_errors():
+            response = await self._require_async_client().chat.completions.create(
+                **kwargs
+            )
+            async for chunk in response:
+                _fill_usage(usage, getattr(chunk, "usage", None))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
@@ -0,0 +1,171 @@
+"""Pool de clientes SDK compartido por todo el proceso.
+
+Construir `OpenAI(...)` o `genai.Client(...)` en cada llamada implica armar un
+cliente HTTP nuevo (y un handshake TLS nuevo). Este registro guarda un único
+cliente por (proveedor, base_url, hash de la API key) y lo reutiliza, de modo
+que todas las llamadas comparten el mismo pool de conexiones keep-alive.
+Los SDK se importan al crear el primer cliente de cada proveedor.
+
+Los clientes async quedan atados al event loop en el que abren conexiones, así
+que se guardan por loop: cada `asyncio.run` de un script obtiene los suyos y
+se liberan cuando el loop deja de existir.
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import os
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar
+
+if TYPE_CHECKING:
+    import httpx
+    from google import genai
+    from openai import AsyncOpenAI, OpenAI
+
+T = TypeVar("T")
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+@dataclass
+class PoolSettings:
+    """Tamaño del pool HTTP de cada cliente, configurable por variables de entorno."""
+
+    max_connections: int = field(
+        default_factory=lambda: int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100"))
+    )
+    max_keepalive_connections: int = field(
+        default_factory=lambda: int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20"))
+    )
+    keepalive_expiry: float = field(
+        default_factory=lambda: float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "30"))
+    )
+    # HTTP/2 solo si está instalado `h2` (pip install httpx[http2])
+    http2: bool = field(
+        default_factory=lambda: os.getenv("LLM_POOL_HTTP2", "1") != "0"
+        and _http2_available()
+    )
+
+    def limits(self) -> "httpx.Limits":
+        import httpx
+
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def client_args(self) -> dict[str, Any]:
+        return {"limits": self.limits(), "http2": self.http2}
+
+
+def _key_hash(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def _openai_kwargs(api_key: str, base_url: Optional[str]) -> dict[str, Any]:
+    kwargs: dict[str, Any] = {"api_key": api_key}
+    if base_url:
+        kwargs["base_url"] = base_url
+    return kwargs
+
+
+class ClientPool:
+    """Registro thread-safe de clientes SDK reutilizables."""
+
+    def __init__(self, settings: Optional[PoolSettings] = None):
+        self.settings = settings or PoolSettings()
+        self._clients: dict[tuple[str, Optional[str], str], Any] = {}
+        self._loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[Any, Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def for_running_loop(self, key: Any, factory: Callable[[], T]) -> T:
+        """Cliente async `key` del event loop en curso; lo crea con `factory` la primera vez."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._loop_clients.get(loop)
+            if clients is None:
+                clients = self._loop_clients[loop] = {}
+            client = clients.get(key)
+            if client is None:
+                client = clients[key] = factory()
+            return client
+
+    def get_openai_client(self, *, api_key: str, base_url: Optional[str]) -> "OpenAI":
+        """Cliente sync de OpenAI (o compatibles, como LM Studio)."""
+        from openai import DefaultHttpxClient, OpenAI
+
+        key = ("openai", base_url, _key_hash(api_key))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = OpenAI(
+                    **_openai_kwargs(api_key, base_url),
+                    http_client=DefaultHttpxClient(**self.settings.client_args()),
+                )
+                self._clients[key] = client
+            return client
+
+    def get_async_openai_client(
+        self, *, api_key: str, base_url: Optional[str]
+    ) -> "AsyncOpenAI":
+        """Cliente async de OpenAI del event loop en curso."""
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        return self.for_running_loop(
+            ("openai", base_url, _key_hash(api_key)),
+            lambda: AsyncOpenAI(
+                **_openai_kwargs(api_key, base_url),
+                http_client=DefaultAsyncHttpxClient(**self.settings.client_args()),
+            ),
+        )
+
+    def get_gemini_client(self, *, api_key: str) -> "genai.Client":
+        key = ("gemini", None, _key_hash(api_key))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._new_gemini_client(api_key)
+                self._clients[key] = client
+            return client
+
+    def get_async_gemini_client(self, *, api_key: str) -> "genai.Client":
+        """Cliente de Gemini para usar su `.aio` en el event loop en curso."""
+        return self.for_running_loop(
+            ("gemini", None, _key_hash(api_key)),
+            lambda: self._new_gemini_client(api_key),
+        )
+
+    def _new_gemini_client(self, api_key: str) -> "genai.Client":
+        from google import genai
+        from google.genai import types as genai_types
+
+        http_options = genai_types.HttpOptions(
+            client_args=self.settings.client_args(),
+            async_client_args=self.settings.client_args(),
+        )
+        return genai.Client(api_key=api_key, http_options=http_options)
+
+    def clear(self) -> None:
+        """Olvida los clientes registrados (p. ej. tras rotar una API key)."""
+        with self._lock:
+            self._clients.clear()
+            self._loop_clients.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+
+# Instancia global
+client_pool = ClientPool()
+
+
+__all__ = ["ClientPool", "PoolSettings", "client_pool"]
@@ -0,0 +1,231 @@
+"""Planificador de llamadas según los límites de cada proveedor/modelo.
+
+Reemplaza los `time.sleep` fijos de los scripts batch: cada (proveedor, modelo)
+tiene un token bucket de requests por minuto (RPM) y otro de tokens por minuto
+(TPM). Ante un 429 (`LLMQuotaExceededError`) se respeta el `Retry-After` del
+proveedor o, si no viene, se aplica backoff exponencial; además la tasa
+efectiva se reduce a la mitad y se recupera de a poco con cada llamada exitosa.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from .exceptions import LLMQuotaExceededError
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Límites de un proveedor/modelo. None significa sin límite."""
+
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+
+
+# Valores conservadores de los tiers iniciales; se pisan con LLM_RATE_LIMITS.
+DEFAULT_RATE_LIMITS: dict[str, RateLimit] = {
+    "openai": RateLimit(requests_per_minute=500, tokens_per_minute=200_000),
+    "gemini": RateLimit(requests_per_minute=10, tokens_per_minute=250_000),
+    "local": RateLimit(),
+}
+
+
+def _env_rate_limits() -> dict[str, RateLimit]:
+    """Lee LLM_RATE_LIMITS, p. ej. '{"gemini:gemini-2.5-flash": {"rpm": 10, "tpm": 250000}}'.
+
+    Las claves pueden ser "proveedor" o "proveedor:modelo".
+    """
+    raw = os.getenv("LLM_RATE_LIMITS")
+    if not raw:
+        return {}
+    parsed = json.loads(raw)
+    return {
+        key.lower(): RateLimit(
+            requests_per_minute=value.get("rpm"),
+            tokens_per_minute=value.get("tpm"),
+        )
+        for key, value in parsed.items()
+    }
+
+
+def resolve_rate_limit(provider: str, model: str) -> RateLimit:
+    overrides = _env_rate_limits()
+    for key in (f"{provider}:{model}".lower(), provider.lower()):
+        if key in overrides:
+            return overrides[key]
+    return DEFAULT_RATE_LIMITS.get(provider.lower(), RateLimit())
+
+
+def estimate_tokens(text: str, max_tokens: Optional[int] = None) -> int:
+    """Estimación barata (≈4 caracteres por token) de entrada + salida esperada."""
+    return len(text) // 4 + (max_tokens or 1024)
+
+
+class TokenBucket:
+    """Token bucket thread-safe con reservas: quien pide más de lo disponible
+    deja el saldo en negativo y espera lo que tarda en reponerse."""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = rate_per_minute
+        self.tokens = rate_per_minute
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float, scale: float = 1.0) -> float:
+        """Descuenta `amount` y devuelve cuántos segundos hay que esperar."""
+        rate = self.rate_per_second * scale
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * rate
+            )
+            self.updated_at = now
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / rate
+
+
+class RateLimiter:
+    """Limita y reintenta las llamadas de un (proveedor, modelo)."""
+
+    def __init__(
+        self,
+        limit: RateLimit,
+        *,
+        max_retries: int = 5,
+        base_backoff: float = 2.0,
+        max_backoff: float = 120.0,
+        min_scale: float = 0.1,
+    ):
+        self.limit = limit
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.min_scale = min_scale
+        self.requests = (
+            TokenBucket(limit.requests_per_minute) if limit.requests_per_minute else None
+        )
+        self.tokens = (
+            TokenBucket(limit.tokens_per_minute) if limit.tokens_per_minute else None
+        )
+        self.scale = 1.0
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        with self._lock:
+            scale = self.scale
+            blocked = max(0.0, self.blocked_until - time.monotonic())
+        wait = blocked
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1, scale))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(estimated_tokens, scale))
+        return wait
+
+    def acquire(self, estimated_tokens: int = 0) -> None:
+        wait = self._reserve(estimated_tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, estimated_tokens: int = 0) -> None:
+        wait = self._reserve(estimated_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _on_success(self) -> None:
+        with self._lock:
+            self.scale = min(1.0, self.scale + 0.05)
+
+    def _on_quota_error(self, err: LLMQuotaExceededError, attempt: int) -> None:
+        """Bloquea el limiter según Retry-After (o backoff exponencial) y baja la tasa."""
+        if attempt >= self.max_retries:
+            raise err
+        if err.retry_after is not None:
+            delay = err.retry_after
+        else:
+            delay = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+            delay += random.uniform(0, delay / 4)
+        with self._lock:
+            self.throttled += 1
+            self.scale = max(self.min_scale, self.scale / 2)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        logger.warning(
+            "[RateLimit] 429 recibido, reintentando en %.1fs (intento %d/%d)",
+            delay,
+            attempt + 1,
+            self.max_retries,
+        )
+
+    def run(self, call: Callable[[], T], estimated_tokens: int = 0) -> T:
+        attempt = 0
+        while True:
+            self.acquire(estimated_tokens)
+            try:
+                result = call()
+            except LLMQuotaExceededError as err:
+                self._on_quota_error(err, attempt)
+                attempt += 1
+                continue
+            self._on_success()
+            return result
+
+    async def arun(
+        self, call: Callable[[], Awaitable[T]], estimated_tokens: int = 0
+    ) -> T:
+        attempt = 0
+        while True:
+            await self.aacquire(estimated_tokens)
+            try:
+                result = await call()
+            except LLMQuotaExceededError as err:
+                self._on_quota_error(err, attempt)
+                attempt += 1
+                continue
+            self._on_success()
+            return result
+
+
+_limiters: dict[tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    provider: str, model: str, limit: Optional[RateLimit] = None
+) -> RateLimiter:
+    """Limiter compartido por proceso para (proveedor, modelo).
+
+    `limit` pisa la configuración (DEFAULT_RATE_LIMITS / LLM_RATE_LIMITS) y
+    reemplaza el limiter existente.
+    """
+    key = (provider.lower(), model)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None or (limit is not None and limiter.limit != limit):
+            limiter = RateLimiter(limit or resolve_rate_limit(provider, model))
+            _limiters[key] = limiter
+        return limiter
+
+
+__all__ = [
+    "DEFAULT_RATE_LIMITS",
+    "RateLimit",
+    "RateLimiter",
+    "TokenBucket",
+    "estimate_tokens",
+    "get_rate_limiter",
+    "resolve_rate_limit",
+]
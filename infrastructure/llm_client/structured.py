@@ -0,0 +1,113 @@
+"""Salida estructurada (JSON) de los LLM.
+
+`ClientLLM.generate` acepta un `response_schema` (modelo Pydantic o JSON Schema)
+que se traduce al modo nativo de cada proveedor: `response_format` en OpenAI y
+`response_json_schema` en Gemini. `extract_json` es el parser tolerante común
+para leer la respuesta, haya o no salida estructurada nativa.
+"""
+
+import json
+import re
+from typing import Any, Optional, Union
+
+from pydantic import BaseModel
+
+ResponseSchema = Union[type[BaseModel], dict[str, Any]]
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*([\s\S]+?)```")
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def to_json_schema(schema: ResponseSchema) -> dict[str, Any]:
+    """Normaliza un modelo Pydantic o un dict a un JSON Schema."""
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        return schema.model_json_schema()
+    if isinstance(schema, dict):
+        return schema
+    raise TypeError(f"response_schema no soportado: {schema!r}")
+
+
+def schema_name(schema: dict[str, Any]) -> str:
+    """Nombre para `response_format` de OpenAI (solo [a-zA-Z0-9_-], máx. 64)."""
+    name = re.sub(r"[^a-zA-Z0-9_-]", "_", str(schema.get("title") or "response"))
+    return name[:64]
+
+
+def _loads(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # Comas colgantes, un error típico de los modelos chicos
+        return json.loads(_TRAILING_COMMA_RE.sub(r"\1", text))
+
+
+def _balanced_spans(text: str, open_char: str, close_char: str):
+    """Fragmentos balanceados que empiezan en cada `open_char`, ignorando
+    los corchetes que aparecen dentro de strings JSON."""
+    start = text.find(open_char)
+    while start != -1:
+        depth = 0
+        in_string = False
+        escaped = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == open_char:
+                depth += 1
+            elif ch == close_char:
+                depth -= 1
+                if depth == 0:
+                    yield text[start : i + 1]
+                    break
+        start = text.find(open_char, start + 1)
+
+
+def extract_json(text: str, *, expect: Optional[type] = None) -> Any:
+    """Extrae un objeto/array JSON de una respuesta que puede traer texto extra.
+
+    Prueba en orden: bloque ```json```, el texto completo y el primer fragmento
+    `{...}` / `[...]` balanceado que parsee. Con `expect=dict` o `expect=list`
+    solo acepta un valor de ese tipo.
+    """
+    text = text or ""
+    fence_match = _FENCE_RE.search(text)
+    if fence_match:
+        text = fence_match.group(1).strip()
+
+    def accepted(value: Any) -> bool:
+        return expect is None or isinstance(value, expect)
+
+    try:
+        parsed = _loads(text.strip())
+        if accepted(parsed):
+            return parsed
+    except json.JSONDecodeError:
+        pass
+
+    # Primero el tipo pedido; si no se pidió ninguno, el que aparece antes
+    brackets = [("{", "}"), ("[", "]")]
+    if expect is list or (
+        expect is None and -1 < text.find("[") < text.find("{")
+    ):
+        brackets.reverse()
+    for open_char, close_char in brackets:
+        for fragment in _balanced_spans(text, open_char, close_char):
+            try:
+                parsed = _loads(fragment)
+            except json.JSONDecodeError:
+                continue
+            if accepted(parsed):
+                return parsed
+
+    raise ValueError(f"Could not extract valid JSON from LLM response:\n{text[:500]}")
+
+
+__all__ = ["ResponseSchema", "extract_json", "schema_name", "to_json_schema"]
@@ -0,0 +1,59 @@
+"""
+Test de `ClientLLM.agenerate`: varias generaciones concurrentes en un event loop
+y dos `asyncio.run` seguidos, cada uno con su propio cliente async del pool.
+"""
+
+import asyncio
+
+from infrastructure.llm_client.base import BaseLLMProvider
+from infrastructure.llm_client.client import ClientLLM
+from infrastructure.llm_client.pool import ClientPool
+
+
+class LoopBoundClient:
+    """Cliente async atado al loop en el que se crea, como el httpx de AsyncOpenAI."""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.calls = 0
+
+    async def complete(self, prompt: str) -> str:
+        assert asyncio.get_running_loop() is self.loop, "cliente async usado en otro loop"
+        self.calls += 1
+        await asyncio.sleep(0)
+        return prompt.upper()
+
+
+class PooledProvider(BaseLLMProvider):
+    def __init__(self, pool: ClientPool):
+        self.pool = pool
+
+    async def agenerate(self, messages, *, temperature, max_tokens, stream, seed=None,
+                        response_schema=None, usage=None) -> str:
+        client = self.pool.for_running_loop(("test",), LoopBoundClient)
+        return await client.complete(messages[-1]["content"])
+
+
+class PooledClientLLM(ClientLLM):
+    def __init__(self, pool: ClientPool):
+        self.pool = pool
+        super().__init__(provider="local", model="test-model")
+
+    def _resolve_provider(self, **kwargs) -> BaseLLMProvider:
+        return PooledProvider(self.pool)
+
+
+def test_agenerate_en_event_loops_sucesivos():
+    pool = ClientPool()
+    client = PooledClientLLM(pool)
+
+    async def run():
+        stories = await asyncio.gather(*(client.agenerate(f"cuento {i}") for i in range(3)))
+        return stories, pool.for_running_loop(("test",), LoopBoundClient)
+
+    first, first_client = asyncio.run(run())
+    second, second_client = asyncio.run(run())
+
+    assert first == second == ["CUENTO 0", "CUENTO 1", "CUENTO 2"]
+    assert first_client is not second_client
+    assert first_client.calls == second_client.calls == 3
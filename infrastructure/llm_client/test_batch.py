@@ -0,0 +1,90 @@
+"""
+Test del modo batch de `ClientLLM` con el stand-in local `FileBatchBackend`:
+add → run, resultados por custom_id y paso por el cache de respuestas.
+"""
+
+import os
+
+import pytest
+
+from infrastructure.llm_client.base import BaseLLMProvider
+from infrastructure.llm_client.batch import FileBatchBackend, LLMBatch, _read_jsonl
+from infrastructure.llm_client.cache import LLMResponseCache
+from infrastructure.llm_client.client import ClientLLM
+
+
+class EchoProvider(BaseLLMProvider):
+    """Responde con el prompt en mayúsculas y cuenta las llamadas."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, messages, *, temperature, max_tokens, stream, seed=None,
+                 response_schema=None, usage=None) -> str:
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        return prompt.upper()
+
+
+class EchoClientLLM(ClientLLM):
+    def _resolve_provider(self, **kwargs) -> BaseLLMProvider:
+        return EchoProvider()
+
+
+class ReversedOutputBackend(FileBatchBackend):
+    """Escribe la salida en orden inverso, como puede devolverla una Batch API."""
+
+    def _process(self, batch_id: str) -> None:
+        super()._process(batch_id)
+        path = self._path(batch_id, "output.jsonl")
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(reversed(lines))
+
+    def submitted(self, batch_id: str) -> list[str]:
+        with open(self._path(batch_id, "input.jsonl"), "r", encoding="utf-8") as f:
+            return [row["custom_id"] for row in _read_jsonl(f.read())]
+
+
+def make_client(tmp_path, mode="readwrite") -> EchoClientLLM:
+    cache = LLMResponseCache(os.path.join(tmp_path, "responses.sqlite"), mode=mode)
+    return EchoClientLLM(provider="local", model="test-model", cache=cache)
+
+
+def test_resultados_por_custom_id_y_cache(tmp_path):
+    client = make_client(tmp_path)
+    backend = ReversedOutputBackend(client.provider_impl, work_dir=str(tmp_path))
+
+    batch = LLMBatch(client, backend, poll_interval=0)
+    for n in range(3):
+        batch.add(f"cuento/candidate-{n}", f"prompt {n}", seed=n)
+    results = batch.run()
+
+    assert {custom_id: r.text for custom_id, r in results.items()} == {
+        f"cuento/candidate-{n}": f"PROMPT {n}" for n in range(3)
+    }
+    assert not any(r.cached for r in results.values())
+    assert backend.submitted(batch.batch_id) == [f"cuento/candidate-{n}" for n in range(3)]
+
+    # Los resultados quedaron en el cache con la clave de ClientLLM.generate
+    calls = len(client.provider_impl.prompts)
+    assert client.generate("prompt 1", temperature=0.7, seed=1) == "PROMPT 1"
+    assert len(client.provider_impl.prompts) == calls
+
+    # Un segundo batch solo envía lo que no está cacheado
+    second = LLMBatch(client, backend, poll_interval=0)
+    second.add("cuento/candidate-0", "prompt 0", seed=0)
+    second.add("cuento/candidate-3", "prompt 3", seed=3)
+    results = second.run()
+
+    assert backend.submitted(second.batch_id) == ["cuento/candidate-3"]
+    assert results["cuento/candidate-0"].cached
+    assert results["cuento/candidate-0"].text == "PROMPT 0"
+    assert results["cuento/candidate-3"].text == "PROMPT 3"
+
+
+def test_replay_no_admite_batch(tmp_path):
+    client = make_client(tmp_path, mode="replay")
+    with pytest.raises(ValueError):
+        LLMBatch(client, FileBatchBackend(client.provider_impl, work_dir=str(tmp_path)))
@@ -0,0 +1,71 @@
+"""
+Test de `LLMResponseCache`: vencimiento por TTL, desalojo por `max_entries`
+(las menos usadas primero) y miss en modo replay.
+"""
+
+import os
+
+import pytest
+
+from infrastructure.llm_client import cache as cache_module
+from infrastructure.llm_client.cache import LLMResponseCache
+from infrastructure.llm_client.exceptions import LLMCacheMissError
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_ttl(tmp_path, clock):
+    cache = LLMResponseCache(os.path.join(tmp_path, "c.sqlite"), ttl_seconds=60)
+    cache.set("a", "cuento")
+    clock.now += 59
+    assert cache.get("a") == "cuento"
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_max_entries_desaloja_las_menos_usadas(tmp_path, clock):
+    cache = LLMResponseCache(os.path.join(tmp_path, "c.sqlite"), max_entries=2)
+    cache.set("a", "1")
+    clock.now += 1
+    cache.set("b", "2")
+    clock.now += 1
+    assert cache.get("a") == "1"  # "a" pasa a ser la más reciente
+    clock.now += 1
+    cache.set("c", "3")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_replay(tmp_path, clock):
+    path = os.path.join(tmp_path, "c.sqlite")
+    recorder = LLMResponseCache(path, ttl_seconds=60)
+    recorder.set("a", "cuento")
+    recorder.close()
+
+    clock.now += 3600
+    replay = LLMResponseCache(path, mode="replay", ttl_seconds=60)
+    # En replay lo grabado se reproduce aunque haya vencido
+    assert replay.get("a") == "cuento"
+    with pytest.raises(LLMCacheMissError):
+        replay.get("b")
+    # Y no se escribe nada
+    replay.set("b", "otro")
+    assert replay.stats()["entries"] == 1
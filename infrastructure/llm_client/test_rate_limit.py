@@ -0,0 +1,151 @@
+"""
+Test de `TokenBucket` y `RateLimiter` con un reloj falso: esperas por RPM/TPM,
+Retry-After, backoff, reducción de la tasa a la mitad y `blocked_until`.
+"""
+
+import asyncio
+
+import pytest
+
+from infrastructure.llm_client import rate_limit
+from infrastructure.llm_client.exceptions import LLMQuotaExceededError
+from infrastructure.llm_client.rate_limit import RateLimit, RateLimiter, TokenBucket
+
+
+class FakeTime:
+    """Reemplaza al módulo `time` de rate_limit: `sleep` adelanta el reloj."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def quota_error(retry_after=None) -> LLMQuotaExceededError:
+    return LLMQuotaExceededError("429", retry_after=retry_after)
+
+
+def failing(times: int, error: LLMQuotaExceededError):
+    calls = []
+
+    def call() -> str:
+        calls.append(1)
+        if len(calls) <= times:
+            raise error
+        return "ok"
+
+    return call, calls
+
+
+def test_token_bucket(clock):
+    bucket = TokenBucket(60)  # 1 por segundo, capacidad 60
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(2) == pytest.approx(2.0)
+    clock.now += 2
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    # A media tasa se repone a la mitad de velocidad: en 1s salda 0.5 de la
+    # deuda de 1 y la nueva deuda de 1.5 tarda 3s
+    clock.now += 1
+    assert bucket.reserve(1, scale=0.5) == pytest.approx(3.0)
+
+
+def test_token_bucket_no_supera_la_capacidad(clock):
+    bucket = TokenBucket(60)
+    clock.now += 3600
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_rpm_y_tpm(clock):
+    limiter = RateLimiter(RateLimit(requests_per_minute=2, tokens_per_minute=600))
+    limiter.acquire(100)
+    limiter.acquire(100)
+    assert clock.sleeps == []
+    limiter.acquire(100)  # tercer request en el mismo instante: espera por RPM
+    assert clock.sleeps == [pytest.approx(30.0)]
+
+    clock.sleeps.clear()
+    limiter.acquire(1200)  # ahora manda el TPM: 600 tokens de deuda a 10/s
+    assert clock.sleeps == [pytest.approx(60.0)]
+
+
+def test_retry_after(clock):
+    limiter = RateLimiter(RateLimit())
+    call, calls = failing(2, quota_error(retry_after=7))
+
+    assert limiter.run(call) == "ok"
+    assert len(calls) == 3
+    assert clock.sleeps == [pytest.approx(7.0), pytest.approx(7.0)]
+    assert limiter.throttled == 2
+    assert limiter.blocked_until == pytest.approx(114.0)
+
+
+def test_backoff_y_escala(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: 0.0)
+    limiter = RateLimiter(RateLimit(), base_backoff=2, max_backoff=5, min_scale=0.2)
+    call, _ = failing(3, quota_error())
+
+    limiter.acquire()
+    limiter._on_quota_error(quota_error(), 0)
+    assert limiter.scale == 0.5
+    assert limiter.blocked_until == pytest.approx(102.0)
+
+    limiter.scale = 1.0
+    assert limiter.run(call) == "ok"
+    # Backoff exponencial acotado por max_backoff: 2, 4, 5 (más los 2s ya bloqueados)
+    assert clock.sleeps == [pytest.approx(2.0), pytest.approx(2.0), pytest.approx(4.0), pytest.approx(5.0)]
+    # Tres 429 bajan la tasa a 1/8 (acotada por min_scale) y el éxito la sube un poco
+    assert limiter.scale == pytest.approx(0.25)
+
+
+def test_blocked_until_frena_a_todos(clock):
+    limiter = RateLimiter(RateLimit())
+    limiter._on_quota_error(quota_error(retry_after=10), 0)
+    limiter.acquire()
+    assert clock.sleeps == [pytest.approx(10.0)]
+    limiter.acquire()
+    assert clock.sleeps == [pytest.approx(10.0)]
+
+
+def test_agota_los_reintentos(clock):
+    limiter = RateLimiter(RateLimit(), max_retries=2)
+    error = quota_error(retry_after=1)
+    call, calls = failing(10, error)
+    with pytest.raises(LLMQuotaExceededError) as raised:
+        limiter.run(call)
+    assert raised.value is error
+    assert len(calls) == 3
+
+
+def test_arun(clock, monkeypatch):
+    waits: list[float] = []
+
+    async def fake_sleep(seconds: float) -> None:
+        waits.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter(RateLimit())
+    calls = []
+
+    async def call() -> str:
+        calls.append(1)
+        if len(calls) == 1:
+            raise quota_error(retry_after=3)
+        return "ok"
+
+    assert asyncio.run(limiter.arun(call)) == "ok"
+    assert waits == [pytest.approx(3.0)]
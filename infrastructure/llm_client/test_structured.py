@@ -0,0 +1,39 @@
+"""
+Test de `extract_json`: bloques ```json```, texto alrededor del JSON, comas
+colgantes y corchetes dentro de strings.
+"""
+
+import pytest
+
+from infrastructure.llm_client.structured import extract_json
+
+
+def test_bloque_de_codigo():
+    text = 'Acá está:\n```json\n{"genre": "fabula", "themes": ["codicia"]}\n```\nSaludos.'
+    assert extract_json(text) == {"genre": "fabula", "themes": ["codicia"]}
+
+
+def test_texto_alrededor():
+    text = 'Claro, el análisis es {"tone": "oscuro", "aoi_names": ["CONFLICT"]} espero que sirva.'
+    assert extract_json(text) == {"tone": "oscuro", "aoi_names": ["CONFLICT"]}
+
+
+def test_coma_colgante():
+    assert extract_json('{"themes": ["codicia", "castigo",],}') == {"themes": ["codicia", "castigo"]}
+
+
+def test_corchetes_dentro_de_strings():
+    text = 'Respuesta: {"plot_summary": "Un {raro} cierre ] y [ apertura"} fin'
+    assert extract_json(text) == {"plot_summary": "Un {raro} cierre ] y [ apertura"}
+
+
+def test_expect():
+    text = 'AOIs: ["CONFLICT", "JOURNEY"] y además {"x": 1}'
+    assert extract_json(text) == ["CONFLICT", "JOURNEY"]
+    assert extract_json(text, expect=dict) == {"x": 1}
+    assert extract_json(text, expect=list) == ["CONFLICT", "JOURNEY"]
+
+
+def test_sin_json():
+    with pytest.raises(ValueError):
+        extract_json("No encontré ningún AOI.")
@@ -1,5 +1,8 @@
 import os
-from typing import Optional
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Mapping, Optional
 
 DEFAULT_LOCAL_BASE_URL = "http://localhost:1234/v1"
 
@@ -12,4 +15,33 @@ def get_env_key(*names: str) -> Optional[str]:
     return None
 
 
-__all__ = ["get_env_key"]
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Segundos a esperar según `retry-after-ms` / `retry-after` (segundos o fecha HTTP)."""
+    if not headers:
+        return None
+    retry_ms = headers.get("retry-after-ms")
+    if retry_ms:
+        try:
+            return float(retry_ms) / 1000
+        except ValueError:
+            pass
+    retry = headers.get("retry-after")
+    if not retry:
+        return None
+    try:
+        return float(retry)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_retry_delay(details: Any) -> Optional[float]:
+    """Extrae el `retryDelay` ("23s") que Gemini incluye en el detalle de un 429."""
+    match = re.search(r"retryDelay['\"]?\s*:\s*['\"](\d+(?:\.\d+)?)s", str(details))
+    return float(match.group(1)) if match else None
+
+
+__all__ = ["get_env_key", "parse_retry_after", "parse_retry_delay"]
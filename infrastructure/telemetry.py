@@ -0,0 +1,174 @@
+"""Instrumentación del servicio.
+
+- Métricas Prometheus: latencia y requests en curso por endpoint, duración de
+  cada fase de un pedido de cuento y las llamadas al LLM (vía `llm_metrics`).
+  Se exponen en `/metrics`.
+- Spans de OpenTelemetry opcionales por fase. Con `OTEL_EXPORTER_OTLP_ENDPOINT`
+  definido (y opentelemetry-sdk + el exporter OTLP instalados) se exportan a
+  ese collector; si no, el tracer de la API de OTel no hace nada.
+
+Si `prometheus_client` no está instalado las métricas quedan deshabilitadas y
+`phase` solo mide/traza sin exportar.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+from infrastructure.llm_client.metrics import PrometheusMetricsSink, llm_metrics
+
+if TYPE_CHECKING:
+    from prometheus_client import CollectorRegistry
+
+logger = logging.getLogger(__name__)
+
+# None si la dependencia opcional no está instalada
+REGISTRY: Optional["CollectorRegistry"]
+trace: Optional[ModuleType]
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+    )
+except ImportError:  # pragma: no cover - depende del entorno
+    REGISTRY = None
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover - depende del entorno
+    trace = None
+
+
+METRICS_ENABLED = REGISTRY is not None
+
+if METRICS_ENABLED:
+    HTTP_REQUEST_DURATION = Histogram(
+        "http_request_duration_seconds",
+        "Latencia por endpoint (hasta el inicio de la respuesta en streaming)",
+        ("method", "route", "status"),
+        buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160),
+    )
+    HTTP_REQUESTS_IN_PROGRESS = Gauge(
+        "http_requests_in_progress",
+        "Requests en curso por endpoint",
+        ("method", "route"),
+    )
+    STORY_PHASE_DURATION = Histogram(
+        "story_phase_duration_seconds",
+        "Duración de cada fase de un pedido de cuento",
+        ("phase", "mode"),
+        buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 20, 40, 80),
+    )
+    COALESCED_REQUESTS = Counter(
+        "http_requests_coalesced_total",
+        "Requests que reutilizaron una generación idéntica en curso",
+        ("route",),
+    )
+    # Las llamadas al LLM también quedan en /metrics
+    llm_metrics.add_sink(PrometheusMetricsSink(REGISTRY))
+
+
+def setup_tracing(service_name: str = "taller-de-cuentos") -> bool:
+    """Configura el exportador OTLP si hay endpoint y SDK. Devuelve si quedó activo."""
+    if trace is None or not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return False
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning(
+            "OTEL_EXPORTER_OTLP_ENDPOINT definido pero falta opentelemetry-sdk "
+            "u opentelemetry-exporter-otlp; no se exportan spans"
+        )
+        return False
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    return True
+
+
+def _tracer():
+    return trace.get_tracer("taller-de-cuentos") if trace is not None else None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """Span de OpenTelemetry (no-op sin OTel configurado)."""
+    tracer = _tracer()
+    if tracer is None:
+        with nullcontext():
+            yield
+        return
+    with tracer.start_as_current_span(
+        name,
+        attributes={key: value for key, value in attributes.items() if value is not None},
+    ):
+        yield
+
+
+@contextmanager
+def phase(name: str, *, mode: Optional[str] = None, **attributes: Any) -> Iterator[None]:
+    """Mide una fase de un pedido de cuento (histograma + span `story.<fase>`)."""
+    started = time.perf_counter()
+    try:
+        with span(f"story.{name}", mode=mode, **attributes):
+            yield
+    finally:
+        if METRICS_ENABLED:
+            STORY_PHASE_DURATION.labels(name, mode or "").observe(
+                time.perf_counter() - started
+            )
+
+
+@contextmanager
+def track_request(method: str, route: str) -> Iterator[dict[str, Any]]:
+    """Mide un request HTTP; quien llama completa `status` en el dict devuelto."""
+    outcome: dict[str, Any] = {"status": 500}
+    started = time.perf_counter()
+    if METRICS_ENABLED:
+        HTTP_REQUESTS_IN_PROGRESS.labels(method, route).inc()
+    try:
+        with span(f"{method} {route}", **{"http.method": method, "http.route": route}):
+            yield outcome
+    finally:
+        if METRICS_ENABLED:
+            HTTP_REQUESTS_IN_PROGRESS.labels(method, route).dec()
+            HTTP_REQUEST_DURATION.labels(method, route, str(outcome["status"])).observe(
+                time.perf_counter() - started
+            )
+
+
+def count_coalesced(route: str) -> None:
+    if METRICS_ENABLED:
+        COALESCED_REQUESTS.labels(route).inc()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Cuerpo y content-type del endpoint /metrics."""
+    if REGISTRY is None:
+        return b"# prometheus-client no instalado\n", "text/plain; charset=utf-8"
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+__all__ = [
+    "METRICS_ENABLED",
+    "count_coalesced",
+    "phase",
+    "render_metrics",
+    "setup_tracing",
+    "span",
+    "track_request",
+]
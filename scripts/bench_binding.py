@@ -0,0 +1,170 @@
+"""
+Benchmark: asignación de personajes a schemas de 10 AOIs.
+
+Compara los tres modos de `CharacterNameAssigner` (aleatorio, por atributos y
+mapeo personalizado) con la implementación anterior, que hacía un deepcopy
+del PlotSchema y reescribía el dict `characters` de cada atom. Se mide el
+binding solo (BoundSchema) y el binding + `model_dump()`, que es lo que
+termina consumiendo el prompt.
+
+Usage:
+    python scripts/bench_binding.py
+    python -m scripts.bench_binding
+    python -m scripts.bench_binding --aois 10 --cast 8 --seconds 2
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from copy import deepcopy
+from typing import Callable, Dict, List, Optional, Set
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from axis_of_interest.character_assigner import CharacterNameAssigner
+from axis_of_interest.character_attributes import (
+    Character,
+    CharacterAttributes,
+    get_best_character_for_role,
+)
+from axis_of_interest.registry import get_aois
+from axis_of_interest.schema_generator import create_plot_structure
+from axis_of_interest.schemas import PlotSchema
+
+ATTRIBUTES = ("valentia", "bondad", "astucia", "maldad", "carisma")
+
+
+# --- Previous implementation (deepcopy + rewrite every atom), kept as the baseline ---
+
+def legacy_assign_names(schema: PlotSchema, names: List[str], rng: random.Random) -> PlotSchema:
+    new_schema = deepcopy(schema)
+    aoi_dict = {aoi.name: aoi for aoi in get_aois()}
+    spans_by_aoi: Dict[str, list] = {}
+    for span in new_schema.plots_span:
+        spans_by_aoi.setdefault(span.axis_of_interest, []).append(span)
+    for aoi_name, spans in spans_by_aoi.items():
+        shuffled = names.copy()
+        rng.shuffle(shuffled)
+        role_to_name = {
+            role: shuffled[idx % len(shuffled)] for idx, role in enumerate(aoi_dict[aoi_name].roles)
+        }
+        for span in spans:
+            for atom in span.plots_atoms:
+                atom.characters = {role: role_to_name.get(role, role) for role in atom.characters}
+    return new_schema
+
+
+def legacy_assign_by_attributes(schema: PlotSchema, characters: List[Character]) -> PlotSchema:
+    new_schema = deepcopy(schema)
+    aoi_dict = {aoi.name: aoi for aoi in get_aois()}
+    for span in new_schema.plots_span:
+        assert span.axis_of_interest in aoi_dict
+        roles = list(dict.fromkeys(role for atom in span.plots_atoms for role in atom.characters))
+        role_to_name: Dict[str, str] = {}
+        used: Set[str] = set()
+        for role in roles:
+            best = get_best_character_for_role(role, characters, used)
+            role_to_name[role] = best.name
+            used.add(best.name)
+        for atom in span.plots_atoms:
+            atom.characters = {role: role_to_name.get(role, role) for role in atom.characters}
+    return new_schema
+
+
+def legacy_assign_with_mapping(schema: PlotSchema, names: List[str], rng: random.Random) -> PlotSchema:
+    new_schema = deepcopy(schema)
+    for span in new_schema.plots_span:
+        placeholders: Set[str] = set()
+        for atom in span.plots_atoms:
+            placeholders.update(atom.characters.values())
+        available = list(names)
+        rng.shuffle(available)
+        mapping = {
+            placeholder: available.pop(0) if available else rng.choice(names)
+            for placeholder in sorted(placeholders)
+        }
+        for atom in span.plots_atoms:
+            atom.characters = {role: mapping[p] for role, p in atom.characters.items()}
+    return new_schema
+
+
+# --- Harness ---
+
+def per_call_us(fn: Callable[[], object], seconds: float, rounds: int = 5) -> float:
+    window = seconds / rounds
+    samples = []
+    for _ in range(rounds):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= window:
+                break
+        samples.append(elapsed / calls * 1e6)
+    return statistics.median(samples)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Character binding benchmark on multi-AOI schemas")
+    parser.add_argument("--aois", type=int, default=10, help="AOIs per schema (default: 10)")
+    parser.add_argument("--cast", type=int, default=8, help="Characters/names in the cast (default: 8)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Measuring time per case (default: 1.0)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    aoi_names = [aoi.name for aoi in get_aois()][: args.aois]
+    structure = create_plot_structure("benchmark", aoi_names, strategy="sequential")
+    plot_schema = structure.to_plot_schema()
+    names = [f"Personaje{i}" for i in range(args.cast)]
+    characters = [
+        Character(name=name, attributes=CharacterAttributes(**{a: rng.randint(1, 5) for a in ATTRIBUTES}))
+        for name in names
+    ]
+    assigner = CharacterNameAssigner(seed=args.seed)
+    atoms = sum(len(span.plots_atoms) for span in structure.spans)
+    print(f"{len(aoi_names)} AOIs, {len(structure.spans)} spans, {atoms} atoms, cast of {args.cast}\n")
+
+    cases = [
+        (
+            "random",
+            lambda: legacy_assign_names(plot_schema, names, rng),
+            lambda: assigner.bind_names(structure, names),
+        ),
+        (
+            "attributes",
+            lambda: legacy_assign_by_attributes(plot_schema, characters),
+            lambda: assigner.bind_names_by_attributes(structure, characters),
+        ),
+        (
+            "mapping",
+            lambda: legacy_assign_with_mapping(plot_schema, names, rng),
+            lambda: assigner.bind_names_with_mapping(structure, names),
+        ),
+    ]
+
+    header = f"  {'mode':<12} {'previous':>12} {'bind':>12} {'bind+dump':>12} {'speedup':>9}"
+    print(header + "   (us/call)")
+    for label, legacy, bind in cases:
+        legacy_us = per_call_us(legacy, args.seconds)
+        bind_us = per_call_us(bind, args.seconds)
+        dump_us = per_call_us(lambda: bind().model_dump(), args.seconds)
+        print(
+            f"  {label:<12} {legacy_us:>12.1f} {bind_us:>12.1f} {dump_us:>12.1f} "
+            f"{legacy_us / bind_us:>8.1f}x"
+        )
+
+    bound = assigner.bind_names(structure, names)
+    aoi_name = aoi_names[0]
+    role = next(iter(structure.spans[structure.aoi_spans[aoi_name][0]].roles))
+    rebind_us = per_call_us(lambda: bound.with_role(aoi_name, role, "Otro"), args.seconds)
+    print(f"\n  with_role({aoi_name!r}, {role!r}) on a bound schema: {rebind_us:.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: oraciones por segundo del modo gramática (`generate_text`).
+
+Arma un schema con todos los AOIs (estrategia sequential), lo repite para
+obtener schemas largos y mide cuántas oraciones por segundo genera
+`generate_text` sobre el schema completo, tanto para un `BoundSchema`
+(camino de los modos) como para un `PlotSchema` materializado.
+
+Usage:
+    python scripts/bench_grammar.py
+    python -m scripts.bench_grammar
+    python -m scripts.bench_grammar --sizes 1 10 100 1000 --seconds 2
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from axis_of_interest.gramatica_aoi import compilar_gramatica
+from axis_of_interest.plot_structure import SchemaStructure
+from axis_of_interest.registry import get_aois
+from axis_of_interest.schema_generator import create_plot_structure
+from axis_of_interest.text_gen import generate_text
+
+
+def sentences_per_second(render: Callable[[], str], sentences: int, seconds: float, rounds: int = 5) -> float:
+    """Median throughput over `rounds` windows of `seconds / rounds` each."""
+    window = seconds / rounds
+    rates = []
+    for _ in range(rounds):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            render()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= window:
+                break
+        rates.append(calls * sentences / elapsed)
+    return statistics.median(rates)
+
+
+def build_schema(repeat: int) -> SchemaStructure:
+    base = create_plot_structure(
+        "benchmark", [aoi.name for aoi in get_aois()], strategy="sequential"
+    )
+    return SchemaStructure(base.id, base.name, base.description, base.spans * repeat)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Grammar-mode sentence generation benchmark")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1, 10, 100], help="Times the all-AOI schema is repeated"
+    )
+    parser.add_argument("--seconds", type=float, default=1.0, help="Measuring time per case (default: 1.0)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    table = compilar_gramatica()
+    print(f"Compiled {len(table)} predicates in {(time.perf_counter() - start) * 1000:.2f} ms\n")
+
+    print(f"  {'atoms':>8} {'BoundSchema':>16} {'PlotSchema':>16}   (sentences/s)")
+    for repeat in args.sizes:
+        structure = build_schema(repeat)
+        bindings = tuple(
+            {role: f"{role.title()}_{index}" for role in span.roles}
+            for index, span in enumerate(structure.spans)
+        )
+        bound = structure.bind(bindings)
+        plot_schema = bound.to_plot_schema()
+        sentences = sum(len(span.plots_atoms) for span in structure.spans)
+        assert generate_text(bound) == generate_text(plot_schema)
+
+        bound_rate = sentences_per_second(lambda: generate_text(bound), sentences, args.seconds)
+        plot_rate = sentences_per_second(lambda: generate_text(plot_schema), sentences, args.seconds)
+        print(f"  {sentences:>8} {bound_rate:>16,.0f} {plot_rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Benchmark: tiempo de import (arranque en frío) de la API y de cada script.
+
+Corre `python -X importtime -c "import <módulo>"` en un proceso nuevo por
+repetición, toma el tiempo acumulado del módulo y reporta la mediana junto con
+los imports más pesados. Con --baseline compara contra una corrida guardada con
+--save y sale con código 1 si algún módulo empeora más que --max-regression.
+
+Usage:
+    python -m scripts.bench_importtime
+    python -m scripts.bench_importtime --repeat 7 --save data/bench/importtime.json
+    python -m scripts.bench_importtime --baseline data/bench/importtime.json --max-regression 0.2
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Optional
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+DEFAULT_TARGETS = [
+    "infrastructure.api.api",
+    "infrastructure.llm_client.factory",
+    "scripts.select_books",
+    "scripts.extract_features",
+    "scripts.generate_stories",
+    "scripts.evaluate_stories",
+    "scripts.build_aoi_catalog",
+]
+
+# Heavy SDKs that should only load once a provider is actually used
+WATCHED_MODULES = ["openai", "google.genai", "httpx"]
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, cumulative_us, depth) rows from `-X importtime`, in output order.
+
+    Children are printed before their parent, one indent level deeper.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            _self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def direct_children(rows: list[tuple[str, int, int]], module: str) -> list[tuple[str, int]]:
+    """Imports triggered directly by `module` (the rows just above it, one level deeper)."""
+    names = [name for name, _, _ in rows]
+    if module not in names:
+        return []
+    index = names.index(module)
+    depth = rows[index][2]
+    children = []
+    for name, cumulative_us, row_depth in reversed(rows[:index]):
+        if row_depth <= depth:
+            break
+        if row_depth == depth + 1:
+            children.append((name, cumulative_us))
+    return children
+
+
+def measure(module: str) -> list[tuple[str, int, int]]:
+    env = dict(os.environ)
+    # Some modules build LLM clients at import time; they only need a key to exist
+    env.setdefault("OPENAI_API_KEY", "importtime-benchmark")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        tail = result.stderr.strip().splitlines()[-1:] or ["(no output)"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+    return parse_importtime(result.stderr)
+
+
+def bench(module: str, repeat: int, top: int) -> dict:
+    measure(module)  # warm-up: compile .pyc files so they don't skew the first sample
+    samples = []
+    rows: list[tuple[str, int, int]] = []
+    for _ in range(repeat):
+        rows = measure(module)
+        cumulative = {name: cumulative_us for name, cumulative_us, _ in rows}
+        samples.append(cumulative.get(module, 0) / 1000)
+
+    heaviest = sorted(direct_children(rows, module), key=lambda item: item[1], reverse=True)[:top]
+    loaded = {name for name, _, _ in rows}
+    return {
+        "median_ms": round(statistics.median(samples), 1),
+        "min_ms": round(min(samples), 1),
+        "max_ms": round(max(samples), 1),
+        "heaviest": [[name, round(cumulative_us / 1000, 1)] for name, cumulative_us in heaviest],
+        "loaded_sdks": [name for name in WATCHED_MODULES if name in loaded],
+    }
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    regressions = []
+    for module, current in results.items():
+        previous = baseline.get(module)
+        if not previous:
+            continue
+        ratio = current["median_ms"] / previous["median_ms"] - 1 if previous["median_ms"] else 0.0
+        marker = ""
+        if ratio > max_regression:
+            regressions.append(module)
+            marker = "  <-- REGRESSION"
+        print(
+            f"  {module:<40} {previous['median_ms']:>8.1f} -> {current['median_ms']:>8.1f} ms "
+            f"({ratio:+.0%}){marker}"
+        )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Import-time benchmark for the API and scripts")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_TARGETS, help="Modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per module (default: 5)")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest direct imports to show (default: 5)")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a JSON file written with --save")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.25,
+        help="Allowed relative slowdown vs the baseline before failing (default: 0.25)",
+    )
+    args = parser.parse_args(argv)
+
+    results = {}
+    for module in args.modules:
+        try:
+            results[module] = bench(module, args.repeat, args.top)
+        except RuntimeError as err:
+            print(f"  {module:<40} ERROR: {err}")
+            continue
+        row = results[module]
+        sdks = ", ".join(row["loaded_sdks"]) or "-"
+        print(
+            f"  {module:<40} median {row['median_ms']:>8.1f} ms "
+            f"(min {row['min_ms']:.1f}, max {row['max_ms']:.1f})  SDKs: {sdks}"
+        )
+        for name, ms in row["heaviest"]:
+            print(f"      {name:<36} {ms:>8.1f} ms")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {"python": sys.version.split()[0], "repeat": args.repeat, "results": results},
+                f,
+                indent=2,
+            )
+        print(f"\nSaved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        print(f"\nComparison with {args.baseline}:")
+        if compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: generación masiva de Plot Schemas (`generate_schemas_bulk`).
+
+Arma una grilla con todas las combinaciones de AOIs de los tamaños pedidos ×
+estrategias × variantes × elencos, escribe el JSONL completo y reporta
+schemas por minuto (con y sin la serialización a JSONL).
+
+Usage:
+    python scripts/bench_schema_bulk.py
+    python -m scripts.bench_schema_bulk
+    python -m scripts.bench_schema_bulk --sizes 2 3 --strategies sequential uniform --variants 5 --casts 3
+    python -m scripts.bench_schema_bulk --output data/bench/schemas.jsonl
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from axis_of_interest.registry import get_aois
+from axis_of_interest.schema_bulk import SchemaGrid, generate_schemas_bulk, write_schemas_jsonl
+from axis_of_interest.schema_generator import get_schema_generator
+
+CAST_NAMES = ["Ana", "Luis", "Sofía", "Martín", "Lucía", "Tomás", "Elena", "Bruno"]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk plot-schema generation benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 3], help="AOI combination sizes")
+    parser.add_argument(
+        "--strategies",
+        nargs="+",
+        default=["sequential", "round_robin", "parallel", "uniform"],
+        help="Interleaving strategies (llm is not benchmarked)",
+    )
+    parser.add_argument("--variants", type=int, default=3, help="Schemas per AOI set for sampled strategies")
+    parser.add_argument("--casts", type=int, default=3, help="Number of casts (0 = keep role placeholders)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.devnull, help="JSONL output path (default: discard)")
+    args = parser.parse_args(argv)
+
+    if "llm" in args.strategies:
+        parser.error("the llm strategy calls a model; benchmark it separately")
+
+    grid = SchemaGrid(
+        aoi_pool=[aoi.name for aoi in get_aois()],
+        set_sizes=args.sizes,
+        strategies=args.strategies,
+        variants=args.variants,
+        casts=[CAST_NAMES[i:] + CAST_NAMES[:i] for i in range(args.casts)],
+        seed=args.seed,
+    )
+    get_schema_generator()  # load the AOI catalog outside the timed section
+
+    start = time.perf_counter()
+    generated = sum(1 for _ in generate_schemas_bulk(grid))
+    stream_s = time.perf_counter() - start
+
+    if args.output != os.devnull:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    start = time.perf_counter()
+    written = write_schemas_jsonl(generate_schemas_bulk(grid), args.output)
+    jsonl_s = time.perf_counter() - start
+    assert written == generated
+
+    print(f"  {generated} schemas ({len(list(grid.aoi_combinations()))} AOI sets)")
+    print(f"  stream only      {stream_s:8.2f} s  {generated / stream_s * 60:>12,.0f} schemas/min")
+    print(f"  stream + JSONL   {jsonl_s:8.2f} s  {written / jsonl_s * 60:>12,.0f} schemas/min")
+    if args.output != os.devnull:
+        print(f"  wrote {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
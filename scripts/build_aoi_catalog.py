@@ -0,0 +1,65 @@
+"""
+Build step: serializa el catálogo de AOIs a axis_of_interest/aoi_catalog.json.
+
+El registro (axis_of_interest.registry) lee este archivo en lugar de importar y
+recorrer todos los módulos de axis_of_interest/all_aoi en cada arranque. El
+catálogo lleva el hash de las fuentes; si un AOI cambia y no se regenera, el
+registro vuelve a descubrirlos desde las fuentes.
+
+Usage:
+    python -m scripts.build_aoi_catalog
+    python -m scripts.build_aoi_catalog --check   # exit 1 if the catalog is stale
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from axis_of_interest.registry import (
+    CATALOG_FORMAT,
+    DEFAULT_CATALOG_PATH,
+    build_catalog,
+    sources_version,
+)
+
+
+def is_up_to_date(path: Path) -> bool:
+    try:
+        catalog = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    return catalog.get("format") == CATALOG_FORMAT and catalog.get("version") == sources_version()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the precompiled AOI catalog")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=DEFAULT_CATALOG_PATH,
+        help=f"Catalog path (default: {DEFAULT_CATALOG_PATH})",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only check that the catalog matches the current sources",
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        if is_up_to_date(args.output):
+            print(f"AOI catalog up to date ({sources_version()}): {args.output}")
+            return
+        print(f"AOI catalog missing or stale: {args.output}")
+        sys.exit(1)
+
+    catalog = build_catalog(args.output)
+    print(f"Wrote {len(catalog['aois'])} AOIs (version {catalog['version']}) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,9 +14,9 @@ Basado en: "Death of the Novel(ty): Beyond n-Gram Novelty as a Metric for Textua
 import argparse
 import json
 import os
-import re
 import sys
 import time
+from typing import Optional
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
@@ -24,8 +24,12 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from google.genai.errors import ClientError
+from infrastructure.llm_client.batch import DEFAULT_BATCH_DIR
+from infrastructure.llm_client.cache import LLMResponseCache
 from infrastructure.llm_client.factory import resolve_client
+from infrastructure.llm_client.metrics import llm_metrics
+from infrastructure.llm_client.rate_limit import RateLimit, get_rate_limiter
+from infrastructure.llm_client.structured import extract_json
 from evaluation.judge_dimensions import DIMENSIONS
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
@@ -89,38 +93,55 @@ Formato esperado:
 }}
 """
 
+_SCORE_PAIR_SCHEMA = {
+    "type": "object",
+    "properties": {"original": {"type": "number"}, "generado": {"type": "number"}},
+    "required": ["original", "generado"],
+}
+_EXPRESSIONS_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "expresion": {"type": "string"},
+            "justificacion": {"type": "string"},
+        },
+        "required": ["expresion", "justificacion"],
+    },
+}
+
+# JSON Schema for the provider's native structured output (extract_json is the fallback)
+JUDGE_SCHEMA = {
+    "title": "judge_pair",
+    "type": "object",
+    "properties": {
+        "novelty": _SCORE_PAIR_SCHEMA,
+        "sensicality": _SCORE_PAIR_SCHEMA,
+        "pragmaticality": _SCORE_PAIR_SCHEMA,
+        "expresiones_novelas_original": _EXPRESSIONS_SCHEMA,
+        "expresiones_novelas_generado": _EXPRESSIONS_SCHEMA,
+        "expresiones_no_pragmaticas_original": _EXPRESSIONS_SCHEMA,
+        "expresiones_no_pragmaticas_generado": _EXPRESSIONS_SCHEMA,
+        "preferencia": {"type": "string", "enum": ["original", "generado"]},
+        "justificacion_preferencia": {"type": "string"},
+    },
+    "required": [
+        "novelty",
+        "sensicality",
+        "pragmaticality",
+        "expresiones_novelas_original",
+        "expresiones_novelas_generado",
+        "expresiones_no_pragmaticas_original",
+        "expresiones_no_pragmaticas_generado",
+        "preferencia",
+        "justificacion_preferencia",
+    ],
+}
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Helpers
 # ──────────────────────────────────────────────────────────────────────────────
 
-def _extract_json(text: str):
-    """Extract a JSON object from an LLM response that may include extra text."""
-    fence_match = re.search(r"```(?:json)?\s*([\s\S]+?)```", text, re.DOTALL)
-    if fence_match:
-        text = fence_match.group(1).strip()
-
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-
-    idx = text.find("{")
-    if idx != -1:
-        depth = 0
-        for i, ch in enumerate(text[idx:], start=idx):
-            if ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    try:
-                        return json.loads(text[idx : i + 1])
-                    except json.JSONDecodeError:
-                        break
-
-    raise ValueError(f"Could not extract valid JSON from LLM response:\n{text[:500]}")
-
-
 def _compute_creativity_averages(evaluation: dict) -> dict:
     """Compute averages for the 3 paper dimensions: novelty, sensicality, pragmaticality."""
     original_scores = []
@@ -158,6 +179,58 @@ def _normalize_evaluation(eval_raw: dict) -> dict:
     return out
 
 
+def _build_judge_prompt(original: dict, generated_text: str) -> str:
+    return JUDGE_PROMPT.format(
+        original_title=original["title"],
+        original_author=original["author"],
+        original_text=original["text"],
+        generated_text=generated_text,
+    )
+
+
+def _load_generated(story_id: str) -> Optional[str]:
+    generated_path = os.path.join(GENERATED_DIR, f"{story_id}.txt")
+    if not os.path.exists(generated_path):
+        return None
+    with open(generated_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def prefetch_with_batch(
+    story_ids: list[str],
+    stories: dict,
+    client,
+    *,
+    poll_interval: float,
+) -> None:
+    """
+    Judge every original/generated pair in one provider batch job.
+
+    Results are stored in the client's response cache under the same keys
+    evaluate_pair uses, so the regular loop afterwards runs on cache hits.
+    The custom_id of each request is the story_id.
+    """
+    batch = client.batch(poll_interval=poll_interval)
+    for story_id in story_ids:
+        generated_text = _load_generated(story_id)
+        if story_id not in stories or generated_text is None:
+            continue
+        batch.add(
+            story_id,
+            _build_judge_prompt(stories[story_id], generated_text),
+            temperature=0.2,
+            response_schema=JUDGE_SCHEMA,
+        )
+
+    print(f"Batch: judging {len(batch)} pair(s)...")
+    results = batch.run()
+    failed = {story_id: r.error for story_id, r in results.items() if not r.ok}
+    print(f"  {len(results) - len(failed)} ok, {len(failed)} failed")
+    for story_id, error in failed.items():
+        # Failed requests are retried interactively by process_story
+        print(f"  {story_id}: {error}")
+
+
 def evaluate_pair(
     story_id: str,
     original: dict,
@@ -165,20 +238,17 @@ def evaluate_pair(
     client,
 ) -> dict:
     """Run the judge LLM for a single original/generated pair."""
-    prompt = JUDGE_PROMPT.format(
-        original_title=original["title"],
-        original_author=original["author"],
-        original_text=original["text"],
-        generated_text=generated_text,
-    )
+    prompt = _build_judge_prompt(original, generated_text)
 
     response = client.generate(
         prompt,
         system_prompt=None,
         temperature=0.2,
+        response_schema=JUDGE_SCHEMA,
+        caller="judge_pair",
     )
 
-    evaluation = _extract_json(response)
+    evaluation = extract_json(response, expect=dict)
     evaluation = _normalize_evaluation(evaluation)
     averages = _compute_creativity_averages(evaluation)
 
@@ -208,37 +278,22 @@ def process_story(
     story_id: str,
     stories: dict,
     client,
-    delay: float = 10.0,
 ) -> dict | None:
     if story_id not in stories:
         print(f"  SKIP: '{story_id}' not found in selected_stories.json")
         return None
 
-    generated_path = os.path.join(GENERATED_DIR, f"{story_id}.txt")
-    if not os.path.exists(generated_path):
+    generated_text = _load_generated(story_id)
+    if generated_text is None:
+        generated_path = os.path.join(GENERATED_DIR, f"{story_id}.txt")
         print(f"  SKIP: generated story not found at {generated_path}")
         return None
 
-    with open(generated_path, "r", encoding="utf-8") as f:
-        generated_text = f.read()
-
     original = stories[story_id]
     print(f"  Evaluating '{original['title']}' by {original['author']}...")
 
-    for attempt in range(3):
-        try:
-            result = evaluate_pair(story_id, original, generated_text, client)
-            break
-        except ClientError as e:
-            if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                wait = 45 if attempt < 2 else 0
-                if wait:
-                    print(f"  Rate limit (429), waiting {wait}s before retry...")
-                    time.sleep(wait)
-                else:
-                    raise
-            else:
-                raise
+    # Los 429 se reintentan en el RateLimiter del cliente
+    result = evaluate_pair(story_id, original, generated_text, client)
 
     avg = result["averages"]
     pref = result["preferencia"] or "—"
@@ -317,6 +372,12 @@ def build_summary(all_results: list[dict]) -> dict:
 # Main
 # ──────────────────────────────────────────────────────────────────────────────
 
+def _rate_limit_override(args) -> Optional[RateLimit]:
+    if args.rpm is None and args.tpm is None:
+        return None
+    return RateLimit(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Evaluate original vs. generated stories using close-reading (paper 2509.22641)."
@@ -340,14 +401,63 @@ def parse_args():
     parser.add_argument(
         "--delay",
         type=float,
-        default=10.0,
-        help="Seconds between stories (rate limits)",
+        default=0.0,
+        help="Extra seconds between stories; rate limits are handled by the client (default: 0)",
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=os.getenv("LLM_CACHE_PATH"),
+        help="SQLite file for the LLM response cache (default: LLM_CACHE_PATH env var, disabled if unset)",
+    )
+    parser.add_argument(
+        "--cache-mode",
+        choices=["readwrite", "replay"],
+        default="readwrite",
+        help="readwrite: reuse and store responses; replay: only reuse cached responses, fail on a miss",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=None,
+        help="Seconds after which a cached response expires (default: never)",
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        type=int,
+        default=None,
+        help="Maximum cached responses; least recently used are evicted (default: unlimited)",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Judge all pairs as one provider batch job (cheaper, offline); results go through the LLM cache",
+    )
+    parser.add_argument(
+        "--batch-poll-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between batch status checks (default: 30)",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=None,
+        help="Override requests per minute for the provider (default: LLM_RATE_LIMITS env var or built-in tier)",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        default=None,
+        help="Override tokens per minute for the provider (default: LLM_RATE_LIMITS env var or built-in tier)",
     )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
+    if args.batch and args.cache_mode == "replay":
+        # Batch results reach the judging loop by being written to the cache
+        sys.exit("--batch needs a writable cache; it cannot be combined with --cache-mode replay")
 
     model_defaults = {
         "openai": "gpt-4o-mini",
@@ -358,7 +468,22 @@ def main() -> None:
 
     print(f"Provider: {args.provider} | Model: {model}")
     print("Evaluation: novelty, sensicality, pragmaticality + close reading (expressions)")
-    client = resolve_client(args.provider, model)
+    cache = None
+    if args.cache_path:
+        cache = LLMResponseCache(
+            args.cache_path,
+            mode=args.cache_mode,
+            ttl_seconds=args.cache_ttl,
+            max_entries=args.cache_max_entries,
+        )
+    if args.batch and cache is None:
+        # Batch results reach process_story through the response cache
+        cache = LLMResponseCache(os.path.join(DEFAULT_BATCH_DIR, "responses.sqlite"))
+        print(f"Batch mode without --cache-path: using {cache.path}")
+    rate_limiter = get_rate_limiter(args.provider, model, _rate_limit_override(args))
+    client = resolve_client(
+        args.provider, model, cache=cache, rate_limiter=rate_limiter
+    )
 
     with open(SELECTED_STORIES_FILE, "r", encoding="utf-8") as f:
         stories = json.load(f)
@@ -381,13 +506,18 @@ def main() -> None:
 
     print(f"Evaluating: {story_ids}\n")
 
+    if args.batch:
+        prefetch_with_batch(
+            story_ids, stories, client, poll_interval=args.batch_poll_interval
+        )
+
     all_results = []
     for i, story_id in enumerate(story_ids):
-        if i > 0:
+        if i > 0 and args.delay > 0:
             print(f"  Waiting {args.delay}s...")
             time.sleep(args.delay)
         print(f"\n--- {story_id} ---")
-        result = process_story(story_id, stories, client, delay=args.delay)
+        result = process_story(story_id, stories, client)
         if result is None:
             continue
 
@@ -413,6 +543,13 @@ def main() -> None:
         print(f"  Preferencia: original={summary['preferencia_conteo']['original']} | generado={summary['preferencia_conteo']['generado']}")
         print(f"  Saved to {summary_path}")
 
+    for row in llm_metrics.memory.summary():
+        print(f"LLM metrics: {row}")
+    if rate_limiter.throttled:
+        print(f"Rate limit: {rate_limiter.throttled} call(s) throttled by the provider (429)")
+    if cache is not None:
+        print(f"LLM cache: {cache.stats()}")
+
 
 if __name__ == "__main__":
     main()
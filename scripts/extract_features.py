@@ -8,16 +8,28 @@ Para cada cuento en data/selected_stories.json:
   3. Combina ambos resultados en un StoryFeatures JSON.
   4. Guarda en data/features/{story_id}.json.
 
+Con --single-call ambos pasos se resuelven en una sola llamada con un JSON
+Schema que incluye aoi_names, enviando el texto del cuento una única vez.
+
+Con --corpus se procesan todos los cuentos de books/short-tales/ y los
+resultados se escriben en shards JSONL (data/features/corpus/). En ambos modos
+los cuentos se procesan en paralelo (--workers) y la corrida es reanudable: se
+saltean los cuentos ya extraídos cuyo content_hash coincide con el texto actual.
+
 Uso:
     python scripts/extract_features.py [--provider openai|gemini|local] [--model MODEL]
+    python scripts/extract_features.py --corpus --workers 16
 """
 
 import argparse
+import glob
+import hashlib
 import json
 import os
-import re
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Optional, TextIO
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
@@ -25,12 +37,18 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from infrastructure.llm_client.cache import LLMResponseCache
 from infrastructure.llm_client.factory import resolve_client
+from infrastructure.llm_client.metrics import llm_metrics
+from infrastructure.llm_client.rate_limit import RateLimit, get_rate_limiter
+from infrastructure.llm_client.structured import extract_json
 from axis_of_interest.registry import list_of_aoi
+from scripts.select_books import BOOKS_DIR, clean_story
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 SELECTED_STORIES_FILE = os.path.join(DATA_DIR, "selected_stories.json")
 FEATURES_DIR = os.path.join(DATA_DIR, "features")
+CORPUS_FEATURES_DIR = os.path.join(FEATURES_DIR, "corpus")
 
 # All AOI names available in the system
 ALL_AOI_NAMES = [aoi.name for aoi in list_of_aoi]
@@ -95,6 +113,91 @@ Cuento:
 """
 
 
+# Single-call mode: general features and AOIs in one response. The shape is
+# enforced through the provider's native structured output with
+# COMBINED_FEATURES_SCHEMA (built below, once the AOI names are known), so the
+# schema is not repeated in the prompt: its aoi_names enum would send the AOI
+# catalog a second time.
+PROMPT_COMBINED_FEATURES = """\
+Eres un experto en narratología y análisis literario. Trabajas en un proyecto
+de escritura de cuentos siguiendo un método neuro-simbólico basado en "Axis of
+Interest" (AOIs).
+
+Los AOIs disponibles en el sistema son los siguientes (nombre - descripción):
+{aoi_list}
+
+A continuación te presento un cuento. Analiza sus características narrativas
+e identifica qué AOIs representan mejor su estructura. Devuelve un único
+objeto JSON con los siguientes campos:
+
+- "genre": string con el género principal del cuento (e.g., "cuento_moral",
+  "cuento_de_hadas", "horror_gotico", "realismo_magico", "fabula").
+- "setting": string describiendo el escenario espacio-temporal (máximo 2
+  oraciones).
+- "characters": lista de strings describiendo los personajes con su rol
+  narrativo. Ejemplo: ["protagonista: usurero anciano"].
+- "themes": lista de strings con los temas centrales del cuento.
+- "tone": string describiendo el tono emocional dominante.
+- "narrative_style": string describiendo la voz y estilo narrativo.
+- "plot_summary": string con un resumen del arco narrativo completo en 3-4
+  oraciones (inicio, conflicto central y desenlace).
+- "aoi_names": lista de entre 1 y 3 nombres exactos de AOIs (tal como aparecen
+  arriba) que mejor capturen la trama.
+
+IMPORTANTE: Devuelve ÚNICAMENTE el objeto JSON, sin texto adicional, sin
+bloques de código markdown, sin explicaciones.
+
+Cuento:
+\"\"\"
+{story_text}
+\"\"\"
+"""
+
+COMBINED_FEATURES_SCHEMA: Dict[str, Any] = {
+    "title": "story_features",
+    "type": "object",
+    "properties": {
+        "genre": {"type": "string"},
+        "setting": {"type": "string"},
+        "characters": {"type": "array", "items": {"type": "string"}},
+        "themes": {"type": "array", "items": {"type": "string"}},
+        "tone": {"type": "string"},
+        "narrative_style": {"type": "string"},
+        "plot_summary": {"type": "string"},
+        "aoi_names": {
+            "type": "array",
+            "items": {"type": "string", "enum": ALL_AOI_NAMES},
+            "minItems": 1,
+            "maxItems": 3,
+        },
+    },
+    "required": [
+        "genre",
+        "setting",
+        "characters",
+        "themes",
+        "tone",
+        "narrative_style",
+        "plot_summary",
+        "aoi_names",
+    ],
+}
+
+# Schema for the general-features prompt: the combined one without aoi_names
+GENERAL_FEATURES_SCHEMA: Dict[str, Any] = {
+    "title": "general_features",
+    "type": "object",
+    "properties": {
+        key: value
+        for key, value in COMBINED_FEATURES_SCHEMA["properties"].items()
+        if key != "aoi_names"
+    },
+    "required": [
+        key for key in COMBINED_FEATURES_SCHEMA["required"] if key != "aoi_names"
+    ],
+}
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Helpers
 # ──────────────────────────────────────────────────────────────────────────────
@@ -106,74 +209,98 @@ def _build_aoi_list_str() -> str:
     return "\n".join(lines)
 
 
-def _extract_json(text: str):
-    """
-    Extract a JSON object or array from an LLM response that may contain
-    surrounding prose or markdown code fences.
-    """
-    # Try to find a JSON block in ```json ... ``` or ``` ... ```
-    fence_match = re.search(r"```(?:json)?\s*([\s\S]+?)```", text, re.DOTALL)
-    if fence_match:
-        text = fence_match.group(1).strip()
+def _call_llm(
+    client,
+    prompt: str,
+    temperature: float,
+    delay: float = 0.0,
+    response_schema: Optional[dict] = None,
+    caller: Optional[str] = None,
+):
+    """Call the LLM and optionally wait `delay` extra seconds afterward.
 
-    # Try to parse as-is
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-
-    # Try to find the first { or [ and extract from there
-    for start_char, end_char in [('{', '}'), ('[', ']')]:
-        idx = text.find(start_char)
-        if idx != -1:
-            # Find matching closing bracket
-            depth = 0
-            for i, ch in enumerate(text[idx:], start=idx):
-                if ch == start_char:
-                    depth += 1
-                elif ch == end_char:
-                    depth -= 1
-                    if depth == 0:
-                        try:
-                            return json.loads(text[idx:i + 1])
-                        except json.JSONDecodeError:
-                            break
-
-    raise ValueError(f"Could not extract valid JSON from LLM response:\n{text[:500]}")
-
-
-def _call_llm(client, prompt: str, temperature: float, delay: float = 5.0):
-    """Call the LLM and wait `delay` seconds afterward to respect rate limits."""
-    response = client.generate(prompt, system_prompt=None, temperature=temperature)
+    Rate limits (RPM/TPM and 429 retries) are handled by the client's RateLimiter.
+    With `response_schema` the provider's native JSON output is requested.
+    """
+    response = client.generate(
+        prompt,
+        system_prompt=None,
+        temperature=temperature,
+        response_schema=response_schema,
+        caller=caller,
+    )
     if delay > 0:
         time.sleep(delay)
     return response
 
 
-def extract_features_for_story(story: dict, client, delay: float = 5.0) -> dict:
+def extract_features_for_story(story: dict, client, delay: float = 0.0) -> dict:
     """Run both prompts for a single story and merge the results."""
     story_text = story["text"]
 
-    print(f"  [1/2] Extracting general features...")
+    print(f"  [{story['id']}] [1/2] Extracting general features...")
     prompt_general = PROMPT_GENERAL_FEATURES.format(story_text=story_text)
-    response_general = _call_llm(client, prompt_general, temperature=0.2, delay=delay)
-    general = _extract_json(response_general)
+    response_general = _call_llm(
+        client,
+        prompt_general,
+        temperature=0.2,
+        delay=delay,
+        response_schema=GENERAL_FEATURES_SCHEMA,
+        caller="extract_features.general",
+    )
+    general = extract_json(response_general, expect=dict)
 
-    print(f"  [2/2] Detecting AOIs...")
+    print(f"  [{story['id']}] [2/2] Detecting AOIs...")
     aoi_list_str = _build_aoi_list_str()
     prompt_aoi = PROMPT_AOI_DETECTION.format(
         aoi_list=aoi_list_str,
         story_text=story_text,
     )
-    response_aoi = _call_llm(client, prompt_aoi, temperature=0.1, delay=delay)
-    aoi_names = _extract_json(response_aoi)
+    response_aoi = _call_llm(
+        client,
+        prompt_aoi,
+        temperature=0.1,
+        delay=delay,
+        caller="extract_features.aoi",
+    )
+    # The AOI prompt answers with a bare list, which json_schema modes don't accept
+    aoi_names = extract_json(response_aoi, expect=list)
 
+    return _build_features(story, general, aoi_names)
+
+
+def extract_features_for_story_single_call(
+    story: dict, client, delay: float = 0.0
+) -> dict:
+    """Extract general features and AOIs with one prompt, sending the story text once."""
+    story_text = story["text"]
+
+    print(f"  [{story['id']}] [1/1] Extracting features and AOIs...")
+    prompt = PROMPT_COMBINED_FEATURES.format(
+        aoi_list=_build_aoi_list_str(),
+        story_text=story_text,
+    )
+    response = _call_llm(
+        client,
+        prompt,
+        temperature=0.2,
+        delay=delay,
+        response_schema=COMBINED_FEATURES_SCHEMA,
+        caller="extract_features.combined",
+    )
+    combined = extract_json(response, expect=dict)
+
+    return _build_features(story, combined, combined.get("aoi_names") or [])
+
+
+def _build_features(story: dict, general: dict, aoi_names: list) -> dict:
+    """Merge the LLM output into a StoryFeatures dict, validating the AOI names."""
     # Validate that the returned AOI names exist in the system
     valid_aoi_names = [n for n in aoi_names if n in ALL_AOI_NAMES]
     if not valid_aoi_names:
         # Fallback: use CONFLICT as the most generic AOI
         valid_aoi_names = ["CONFLICT"]
-        print(f"  WARNING: No valid AOIs found in response, falling back to CONFLICT")
+        print(f"  [{story['id']}] WARNING: No valid AOIs found in response, falling back to CONFLICT")
 
     features = {
         "story_id": story["id"],
@@ -187,17 +314,153 @@ def extract_features_for_story(story: dict, client, delay: float = 5.0) -> dict:
         "narrative_style": general.get("narrative_style", ""),
         "plot_summary": general.get("plot_summary", ""),
         "aoi_names": valid_aoi_names,
+        "content_hash": content_hash(story["text"]),
     }
     return features
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Corpus / resume
+# ──────────────────────────────────────────────────────────────────────────────
+
+def content_hash(text: str) -> str:
+    """Hash of the story text, used to detect stories that are already extracted."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_corpus_stories(books_dir: str = BOOKS_DIR) -> dict:
+    """Load every tale in books/short-tales/ keyed by its filename stem."""
+    stories: dict = {}
+    for path in sorted(glob.glob(os.path.join(books_dir, "*.txt"))):
+        filename = os.path.basename(path)
+        story_id = os.path.splitext(filename)[0]
+        with open(path, "r", encoding="utf-8") as f:
+            # Without a start hint clean_story only strips the Wikisource noise
+            text = clean_story(f.read(), "")
+        if not text:
+            continue
+        stories[story_id] = {
+            "id": story_id,
+            "title": story_id.replace("_", " "),
+            "author": "",
+            "filename": filename,
+            "text": text,
+            "word_count": len(text.split()),
+        }
+    return stories
+
+
+def _iter_shard_records(shards_dir: str) -> Iterable[dict]:
+    for path in sorted(glob.glob(os.path.join(shards_dir, "features-*.jsonl"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def load_done_hashes(shards_dir: Optional[str] = None) -> dict[str, str]:
+    """story_id -> content_hash of everything already extracted.
+
+    Reads data/features/{id}.json and, when given, the JSONL shards.
+    Files written before content hashes existed have none and are re-extracted.
+    """
+    done: dict[str, str] = {}
+    for path in glob.glob(os.path.join(FEATURES_DIR, "*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            features = json.load(f)
+        if features.get("content_hash"):
+            done[features["story_id"]] = features["content_hash"]
+    if shards_dir is not None:
+        for record in _iter_shard_records(shards_dir):
+            done[record["story_id"]] = record["content_hash"]
+    return done
+
+
+def pending_stories(stories: dict, done: dict[str, str]) -> dict:
+    """Stories not extracted yet, or whose text changed since they were."""
+    return {
+        story_id: story
+        for story_id, story in stories.items()
+        if done.get(story_id) != content_hash(story["text"])
+    }
+
+
+def archive_shards(shards_dir: str) -> Optional[str]:
+    """Move the current shard set into shards_dir/previous-<timestamp>/.
+
+    Returns the archive directory, or None if there were no shards.
+    """
+    existing = sorted(glob.glob(os.path.join(shards_dir, "features-*.jsonl")))
+    if not existing:
+        return None
+    archive_dir = os.path.join(shards_dir, time.strftime("previous-%Y%m%d-%H%M%S"))
+    os.makedirs(archive_dir, exist_ok=True)
+    for path in existing:
+        os.replace(path, os.path.join(archive_dir, os.path.basename(path)))
+    return archive_dir
+
+
+class ShardWriter:
+    """Append-only JSONL writer that rolls over to a new shard every `shard_size` records.
+
+    Resumes on the last existing shard so a rerun keeps filling the same set.
+    With `fresh=True` the existing shards are archived first (see
+    `archive_shards`) and a new set starts at features-00000.jsonl.
+    """
+
+    def __init__(self, shards_dir: str, shard_size: int = 500, *, fresh: bool = False):
+        os.makedirs(shards_dir, exist_ok=True)
+        self.shards_dir = shards_dir
+        self.shard_size = shard_size
+        if fresh:
+            archived = archive_shards(shards_dir)
+            if archived:
+                print(f"Previous shards moved to {archived}")
+        existing = sorted(glob.glob(os.path.join(shards_dir, "features-*.jsonl")))
+        self.shard_index = len(existing) - 1 if existing else 0
+        self.count = 0
+        if existing:
+            with open(existing[-1], "r", encoding="utf-8") as f:
+                self.count = sum(1 for line in f if line.strip())
+        self._file: Optional[TextIO] = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.shards_dir, f"features-{self.shard_index:05d}.jsonl")
+
+    def write(self, record: dict) -> str:
+        if self.count >= self.shard_size:
+            self.close()
+            self.shard_index += 1
+            self.count = 0
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # Flush per record so an interrupted run keeps its progress
+        self._file.flush()
+        self.count += 1
+        return self.path
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Main
 # ──────────────────────────────────────────────────────────────────────────────
 
+def _rate_limit_override(args) -> Optional[RateLimit]:
+    if args.rpm is None and args.tpm is None:
+        return None
+    return RateLimit(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
-        description="Extract narrative features from selected stories using an LLM."
+        description="Extract narrative features from selected stories (or the full corpus) using an LLM."
     )
     parser.add_argument(
         "--provider",
@@ -213,8 +476,75 @@ def parse_args():
     parser.add_argument(
         "--delay",
         type=float,
-        default=5.0,
-        help="Seconds to wait between API calls to respect rate limits (default: 5)",
+        default=0.0,
+        help="Extra seconds to wait between API calls; rate limits are handled by the client (default: 0)",
+    )
+    parser.add_argument(
+        "--corpus",
+        action="store_true",
+        help="Process every tale in books/short-tales/ instead of data/selected_stories.json",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("EXTRACT_MAX_WORKERS", "8")),
+        help="Stories extracted concurrently (default: EXTRACT_MAX_WORKERS env var or 8)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=CORPUS_FEATURES_DIR,
+        help="Directory for the JSONL shards in --corpus mode (default: data/features/corpus)",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=500,
+        help="Records per JSONL shard in --corpus mode (default: 500)",
+    )
+    parser.add_argument(
+        "--single-call",
+        action="store_true",
+        help="Extract general features and AOIs in one LLM call instead of two (halves input tokens)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-extract every story, ignoring existing results; in --corpus mode the old shards are archived",
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=os.getenv("LLM_CACHE_PATH"),
+        help="SQLite file for the LLM response cache (default: LLM_CACHE_PATH env var, disabled if unset)",
+    )
+    parser.add_argument(
+        "--cache-mode",
+        choices=["readwrite", "replay"],
+        default="readwrite",
+        help="readwrite: reuse and store responses; replay: only reuse cached responses, fail on a miss",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=None,
+        help="Seconds after which a cached response expires (default: never)",
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        type=int,
+        default=None,
+        help="Maximum cached responses; least recently used are evicted (default: unlimited)",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=None,
+        help="Override requests per minute for the provider (default: LLM_RATE_LIMITS env var or built-in tier)",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        default=None,
+        help="Override tokens per minute for the provider (default: LLM_RATE_LIMITS env var or built-in tier)",
     )
     return parser.parse_args()
 
@@ -230,27 +560,89 @@ def main() -> None:
     }
     model = args.model or model_defaults.get(args.provider, "gpt-4o-mini")
 
-    print(f"Provider: {args.provider} | Model: {model} | Delay between calls: {args.delay}s")
-    client = resolve_client(args.provider, model)
+    print(f"Provider: {args.provider} | Model: {model} | Extra delay between calls: {args.delay}s")
+    cache = None
+    if args.cache_path:
+        cache = LLMResponseCache(
+            args.cache_path,
+            mode=args.cache_mode,
+            ttl_seconds=args.cache_ttl,
+            max_entries=args.cache_max_entries,
+        )
+    rate_limiter = get_rate_limiter(args.provider, model, _rate_limit_override(args))
+    client = resolve_client(
+        args.provider, model, cache=cache, rate_limiter=rate_limiter
+    )
 
-    with open(SELECTED_STORIES_FILE, "r", encoding="utf-8") as f:
-        stories = json.load(f)
+    if args.corpus:
+        stories = load_corpus_stories()
+    else:
+        with open(SELECTED_STORIES_FILE, "r", encoding="utf-8") as f:
+            stories = json.load(f)
 
     os.makedirs(FEATURES_DIR, exist_ok=True)
+    shards_dir = args.output_dir if args.corpus else None
 
-    for story_id, story in stories.items():
-        print(f"\nProcessing: '{story['title']}' by {story['author']}")
-        features = extract_features_for_story(story, client, delay=args.delay)
-
-        out_path = os.path.join(FEATURES_DIR, f"{story_id}.json")
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(features, f, ensure_ascii=False, indent=2)
-
-        print(f"  Saved features to {out_path}")
-        print(f"  AOIs detected: {features['aoi_names']}")
-        print(f"  Genre: {features['genre']} | Tone: {features['tone']}")
+    done = {} if args.force else load_done_hashes(shards_dir)
+    pending = pending_stories(stories, done)
+    print(
+        f"{len(stories)} stories | {len(stories) - len(pending)} already extracted | "
+        f"{len(pending)} pending | workers: {args.workers}"
+    )
 
-    print(f"\nDone. Features saved to {FEATURES_DIR}/")
+    extract = (
+        extract_features_for_story_single_call
+        if args.single_call
+        else extract_features_for_story
+    )
+    # --force starts a new shard set instead of appending duplicate story_ids
+    writer = (
+        ShardWriter(shards_dir, args.shard_size, fresh=args.force)
+        if shards_dir
+        else None
+    )
+    failed: list[str] = []
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(extract, story, client, args.delay): story_id
+                for story_id, story in pending.items()
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                story_id = futures[future]
+                try:
+                    features = future.result()
+                except Exception as e:
+                    failed.append(story_id)
+                    print(f"  [{story_id}] ERROR: {e}")
+                    continue
+
+                # Writes happen only on this thread, so no locking is needed
+                if writer is not None:
+                    out_path = writer.write(features)
+                else:
+                    out_path = os.path.join(FEATURES_DIR, f"{story_id}.json")
+                    with open(out_path, "w", encoding="utf-8") as f:
+                        json.dump(features, f, ensure_ascii=False, indent=2)
+
+                print(
+                    f"[{completed}/{len(pending)}] {story_id} -> {out_path} | "
+                    f"AOIs: {features['aoi_names']} | Genre: {features['genre']}"
+                )
+    finally:
+        if writer is not None:
+            writer.close()
+
+    print(f"\nDone. Features saved to {shards_dir or FEATURES_DIR}/")
+    if failed:
+        print(f"{len(failed)} stories failed (rerun to retry them): {failed}")
+
+    for row in llm_metrics.memory.summary():
+        print(f"LLM metrics: {row}")
+    if rate_limiter.throttled:
+        print(f"Rate limit: {rate_limiter.throttled} call(s) throttled by the provider (429)")
+    if cache is not None:
+        print(f"LLM cache: {cache.stats()}")
 
 
 if __name__ == "__main__":
@@ -13,6 +13,7 @@ Uso:
 """
 
 import argparse
+import asyncio
 import json
 import os
 import sys
@@ -25,11 +26,19 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from google.genai.errors import ClientError
+from infrastructure.llm_client.batch import DEFAULT_BATCH_DIR
+from infrastructure.llm_client.cache import LLMResponseCache
 from infrastructure.llm_client.factory import resolve_client
+from infrastructure.llm_client.metrics import llm_caller, llm_metrics
+from infrastructure.llm_client.rate_limit import RateLimit, get_rate_limiter
 from infrastructure.api.global_schemas import StoryRequest
-from story_creator.mode2 import generate_story_mode2
+from story_creator.mode2 import (
+    agenerate_story_mode2,
+    create_prompt_mode2,
+    generate_story_mode2,
+)
 from evaluation import evaluate_generated_story_dimensions, rank_candidates
+from evaluation.judge_dimensions import JUDGE_DIMENSIONS_PROMPT, JUDGE_DIMENSIONS_SCHEMA
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 FEATURES_DIR = os.path.join(DATA_DIR, "features")
@@ -54,10 +63,8 @@ def _extract_character_names(characters: list[str]) -> list[str]:
     return names or ["Protagonista"]
 
 
-def generate_story_from_features(features: dict, client) -> str:
-    """
-    Build a StoryRequest from extracted features and call generate_story_mode2.
-    """
+def _build_story_request(features: dict) -> StoryRequest:
+    """Build the StoryRequest (mode 2, aoi_directo) for a story's extracted features."""
     character_names = _extract_character_names(features.get("characters", []))
 
     # Build a rich trama description that includes genre, tone and plot_summary
@@ -71,7 +78,7 @@ def generate_story_from_features(features: dict, client) -> str:
 
     trama = " ".join(trama_parts) or features.get("title", "")
 
-    request = StoryRequest(
+    return StoryRequest(
         trama=trama,
         genero=features.get("genre", ""),
         personajes=character_names,
@@ -81,6 +88,12 @@ def generate_story_from_features(features: dict, client) -> str:
         temperature=0.7,
     )
 
+
+def generate_story_from_features(features: dict, client) -> str:
+    """
+    Build a StoryRequest from extracted features and call generate_story_mode2.
+    """
+    request = _build_story_request(features)
     story_text = generate_story_mode2(request, client, temperature=0.7)
     return story_text
 
@@ -91,26 +104,7 @@ def generate_story_candidate_from_features(
     *,
     candidate_idx: int,
 ) -> str:
-    character_names = _extract_character_names(features.get("characters", []))
-
-    trama_parts = []
-    if features.get("plot_summary"):
-        trama_parts.append(features["plot_summary"])
-    if features.get("tone"):
-        trama_parts.append(f"Tono: {features['tone']}.")
-    if features.get("themes"):
-        trama_parts.append(f"Temas: {', '.join(features['themes'])}.")
-    trama = " ".join(trama_parts) or features.get("title", "")
-
-    request = StoryRequest(
-        trama=trama,
-        genero=features.get("genre", ""),
-        personajes=character_names,
-        aoi_names=features.get("aoi_names", ["CONFLICT"]),
-        strategy="sequential",
-        generation_method="aoi_directo",
-        temperature=0.7,
-    )
+    request = _build_story_request(features)
     return generate_story_mode2(
         request,
         client,
@@ -119,6 +113,97 @@ def generate_story_candidate_from_features(
     )
 
 
+async def agenerate_candidates_from_features(
+    features: dict,
+    client,
+    *,
+    num_candidates: int,
+) -> list[str]:
+    """
+    Generate all candidates of a story concurrently on one event loop.
+    Throughput is bounded by the client's rate limiter.
+    """
+    request = _build_story_request(features)
+    with llm_caller("generate_stories.candidate"):
+        stories: list[str] = await asyncio.gather(
+            *(
+                agenerate_story_mode2(
+                    request, client, temperature=0.7, seed=42 + candidate_idx
+                )
+                for candidate_idx in range(num_candidates)
+            )
+        )
+    return stories
+
+
+def _load_features(story_id: str) -> Optional[dict]:
+    features_path = os.path.join(FEATURES_DIR, f"{story_id}.json")
+    if not os.path.exists(features_path):
+        return None
+    with open(features_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def prefetch_with_batch(
+    story_ids: list[str],
+    client,
+    *,
+    num_candidates: int,
+    judge: bool,
+    poll_interval: float,
+) -> None:
+    """
+    Resolve every LLM call of the run through the provider's Batch API.
+
+    One submission generates all candidates of all stories and, if policies are
+    used, a second one judges them. Results are stored in the client's response
+    cache under the same keys process_story uses, so the regular per-story loop
+    afterwards runs entirely on cache hits. custom_ids are
+    "<story_id>/candidate-<n>" and "<story_id>/candidate-<n>/judge".
+    """
+    generation = client.batch(poll_interval=poll_interval)
+    for story_id in story_ids:
+        features = _load_features(story_id)
+        if features is None:
+            continue
+        request = _build_story_request(features)
+        for candidate_idx in range(num_candidates):
+            seed = 42 + candidate_idx
+            generation.add(
+                f"{story_id}/candidate-{candidate_idx + 1}",
+                create_prompt_mode2(request, seed=seed),
+                temperature=0.7,
+                seed=seed,
+            )
+
+    print(f"Batch: generating {len(generation)} candidate(s)...")
+    stories = generation.run()
+    _report_batch_errors(stories)
+    if not judge:
+        return
+
+    judging = client.batch(poll_interval=poll_interval)
+    for custom_id, result in stories.items():
+        if result.ok:
+            judging.add(
+                f"{custom_id}/judge",
+                JUDGE_DIMENSIONS_PROMPT.format(story_text=result.text),
+                temperature=0.2,
+                response_schema=JUDGE_DIMENSIONS_SCHEMA,
+            )
+    print(f"Batch: judging {len(judging)} candidate(s)...")
+    _report_batch_errors(judging.run())
+
+
+def _report_batch_errors(results: dict) -> None:
+    failed = {custom_id: r.error for custom_id, r in results.items() if not r.ok}
+    cached = sum(1 for r in results.values() if r.cached)
+    print(f"  {len(results) - len(failed)} ok ({cached} from cache), {len(failed)} failed")
+    for custom_id, error in failed.items():
+        # Failed requests are retried interactively by process_story
+        print(f"  {custom_id}: {error}")
+
+
 def _parse_weighted_weights(raw: Optional[str]) -> Optional[dict]:
     if raw is None:
         return None
@@ -167,14 +252,12 @@ def process_story(
     selection_policies: Optional[list[str]] = None,
     weighted_policy_weights: Optional[dict] = None,
 ) -> None:
-    features_path = os.path.join(FEATURES_DIR, f"{story_id}.json")
-    if not os.path.exists(features_path):
+    features = _load_features(story_id)
+    if features is None:
+        features_path = os.path.join(FEATURES_DIR, f"{story_id}.json")
         print(f"  SKIP: features file not found at {features_path}")
         return
 
-    with open(features_path, "r", encoding="utf-8") as f:
-        features = json.load(f)
-
     print(f"  Title: {features['title']}")
     print(f"  Author: {features['author']}")
     print(f"  AOIs: {features['aoi_names']}")
@@ -185,32 +268,20 @@ def process_story(
             "Policy 'weighted' requiere --weighted-weights con novelty/sensicality/pragmaticality"
         )
 
-    candidates = []
-    for candidate_idx in range(num_candidates):
-        print(f"    Candidate {candidate_idx + 1}/{num_candidates}...")
-        for attempt in range(3):
-            try:
-                generated_text = generate_story_candidate_from_features(
-                    features, client, candidate_idx=candidate_idx
-                )
-                break
-            except ClientError as e:
-                if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                    wait = 45 if attempt < 2 else 0
-                    if wait:
-                        print(f"    Rate limit (429), waiting {wait}s before retry...")
-                        time.sleep(wait)
-                    else:
-                        raise
-                else:
-                    raise
-        candidates.append(
-            {
-                "candidate_id": candidate_idx + 1,
-                "story": generated_text,
-                "word_count": len(generated_text.split()),
-            }
+    # Los 429 se reintentan en el RateLimiter del cliente
+    generated_texts = asyncio.run(
+        agenerate_candidates_from_features(
+            features, client, num_candidates=num_candidates
         )
+    )
+    candidates: list[dict] = [
+        {
+            "candidate_id": candidate_idx + 1,
+            "story": generated_text,
+            "word_count": len(generated_text.split()),
+        }
+        for candidate_idx, generated_text in enumerate(generated_texts)
+    ]
 
     if policies:
         print(f"  Evaluating candidates with policies: {policies}")
@@ -345,6 +416,12 @@ def process_story(
         )
 
 
+def _rate_limit_override(args) -> Optional[RateLimit]:
+    if args.rpm is None and args.tpm is None:
+        return None
+    return RateLimit(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Generate stories from extracted features using the neuro-symbolic pipeline."
@@ -368,8 +445,8 @@ def parse_args():
     parser.add_argument(
         "--delay",
         type=float,
-        default=15.0,
-        help="Seconds to wait between stories to respect rate limits (default: 15)",
+        default=0.0,
+        help="Extra seconds to wait between stories; rate limits are handled by the client (default: 0)",
     )
     parser.add_argument(
         "--num-candidates",
@@ -389,11 +466,60 @@ def parse_args():
         default=None,
         help='Pesos para policy weighted como JSON, ej: {"novelty":0.5,"sensicality":0.25,"pragmaticality":0.25}',
     )
+    parser.add_argument(
+        "--cache-path",
+        default=os.getenv("LLM_CACHE_PATH"),
+        help="SQLite file for the LLM response cache (default: LLM_CACHE_PATH env var, disabled if unset)",
+    )
+    parser.add_argument(
+        "--cache-mode",
+        choices=["readwrite", "replay"],
+        default="readwrite",
+        help="readwrite: reuse and store responses; replay: only reuse cached responses, fail on a miss",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=None,
+        help="Seconds after which a cached response expires (default: never)",
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        type=int,
+        default=None,
+        help="Maximum cached responses; least recently used are evicted (default: unlimited)",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Run generation and judging as provider batch jobs (cheaper, offline); results go through the LLM cache",
+    )
+    parser.add_argument(
+        "--batch-poll-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between batch status checks (default: 30)",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=None,
+        help="Override requests per minute for the provider (default: LLM_RATE_LIMITS env var or built-in tier)",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        default=None,
+        help="Override tokens per minute for the provider (default: LLM_RATE_LIMITS env var or built-in tier)",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
+    if args.batch and args.cache_mode == "replay":
+        # Batch results reach process_story by being written to the cache
+        sys.exit("--batch needs a writable cache; it cannot be combined with --cache-mode replay")
 
     model_defaults = {
         "openai": "gpt-4o-mini",
@@ -403,7 +529,22 @@ def main() -> None:
     model = args.model or model_defaults.get(args.provider, "gpt-4o-mini")
 
     print(f"Provider: {args.provider} | Model: {model}")
-    client = resolve_client(args.provider, model)
+    cache = None
+    if args.cache_path:
+        cache = LLMResponseCache(
+            args.cache_path,
+            mode=args.cache_mode,
+            ttl_seconds=args.cache_ttl,
+            max_entries=args.cache_max_entries,
+        )
+    if args.batch and cache is None:
+        # Batch results reach process_story through the response cache
+        cache = LLMResponseCache(os.path.join(DEFAULT_BATCH_DIR, "responses.sqlite"))
+        print(f"Batch mode without --cache-path: using {cache.path}")
+    rate_limiter = get_rate_limiter(args.provider, model, _rate_limit_override(args))
+    client = resolve_client(
+        args.provider, model, cache=cache, rate_limiter=rate_limiter
+    )
     weighted_weights = _parse_weighted_weights(args.weighted_weights)
 
     if args.num_candidates < 1:
@@ -433,8 +574,17 @@ def main() -> None:
 
     print(f"Generating stories for: {story_ids}\n")
 
+    if args.batch:
+        prefetch_with_batch(
+            story_ids,
+            client,
+            num_candidates=args.num_candidates,
+            judge=bool(policies),
+            poll_interval=args.batch_poll_interval,
+        )
+
     for i, story_id in enumerate(story_ids):
-        if i > 0:
+        if i > 0 and args.delay > 0:
             print(f"  Waiting {args.delay}s before next story...")
             time.sleep(args.delay)
         print(f"\n--- {story_id} ---")
@@ -448,6 +598,13 @@ def main() -> None:
 
     print(f"\nDone. Generated stories saved to {GENERATED_DIR}/<story_id>/")
 
+    for row in llm_metrics.memory.summary():
+        print(f"LLM metrics: {row}")
+    if rate_limiter.throttled:
+        print(f"Rate limit: {rate_limiter.throttled} call(s) throttled by the provider (429)")
+    if cache is not None:
+        print(f"LLM cache: {cache.stats()}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,94 @@
+"""
+Tests for the resumable corpus extraction: content-hash resume, shard
+rotation and archiving of the previous shard set on --force.
+"""
+
+import glob
+import json
+import os
+
+import pytest
+
+from scripts import extract_features
+from scripts.extract_features import (
+    ShardWriter,
+    content_hash,
+    load_done_hashes,
+    pending_stories,
+)
+
+
+def features(story_id: str, text: str) -> dict:
+    return {"story_id": story_id, "content_hash": content_hash(text)}
+
+
+def shard_lines(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture
+def features_dir(tmp_path, monkeypatch):
+    path = tmp_path / "features"
+    path.mkdir()
+    monkeypatch.setattr(extract_features, "FEATURES_DIR", str(path))
+    return path
+
+
+def test_resume_by_content_hash(tmp_path, features_dir):
+    # One story as a per-story JSON file, one in a shard, one from before hashes existed
+    (features_dir / "a.json").write_text(json.dumps(features("a", "texto a")))
+    (features_dir / "old.json").write_text(json.dumps({"story_id": "old"}))
+    writer = ShardWriter(str(tmp_path / "shards"))
+    writer.write(features("b", "texto b"))
+    writer.close()
+
+    done = load_done_hashes(str(tmp_path / "shards"))
+    assert done == {"a": content_hash("texto a"), "b": content_hash("texto b")}
+
+    stories = {
+        "a": {"text": "texto a"},
+        "b": {"text": "texto b cambiado"},
+        "old": {"text": "texto viejo"},
+        "new": {"text": "texto nuevo"},
+    }
+    assert sorted(pending_stories(stories, done)) == ["b", "new", "old"]
+
+
+def test_shard_rotation_and_resume(tmp_path):
+    shards_dir = str(tmp_path / "shards")
+    writer = ShardWriter(shards_dir, shard_size=2)
+    paths = [writer.write(features(f"s{i}", str(i))) for i in range(5)]
+    writer.close()
+
+    names = [os.path.basename(path) for path in paths]
+    assert names == ["features-00000.jsonl"] * 2 + ["features-00001.jsonl"] * 2 + ["features-00002.jsonl"]
+
+    # A rerun keeps filling the last shard before rolling over
+    writer = ShardWriter(shards_dir, shard_size=2)
+    assert os.path.basename(writer.write(features("s5", "5"))) == "features-00002.jsonl"
+    assert os.path.basename(writer.write(features("s6", "6"))) == "features-00003.jsonl"
+    writer.close()
+
+    records = [r["story_id"] for path in sorted(glob.glob(os.path.join(shards_dir, "*.jsonl")))
+               for r in shard_lines(path)]
+    assert records == [f"s{i}" for i in range(7)]
+
+
+def test_fresh_archives_previous_shards(tmp_path, features_dir):
+    shards_dir = str(tmp_path / "shards")
+    writer = ShardWriter(shards_dir, shard_size=1)
+    for i in range(2):
+        writer.write(features(f"s{i}", str(i)))
+    writer.close()
+
+    writer = ShardWriter(shards_dir, shard_size=1, fresh=True)
+    assert os.path.basename(writer.write(features("s0", "0"))) == "features-00000.jsonl"
+    writer.close()
+
+    assert [r["story_id"] for r in shard_lines(os.path.join(shards_dir, "features-00000.jsonl"))] == ["s0"]
+    assert not os.path.exists(os.path.join(shards_dir, "features-00001.jsonl"))
+    (archive,) = glob.glob(os.path.join(shards_dir, "previous-*"))
+    assert sorted(os.listdir(archive)) == ["features-00000.jsonl", "features-00001.jsonl"]
+    # Archived shards are not read back when resuming
+    assert load_done_hashes(shards_dir) == {"s0": content_hash("0")}
@@ -3,13 +3,14 @@ from typing import List, Optional
 
 from infrastructure.api.global_schemas import StoryRequest
 from infrastructure.llm_client import get_client, get_models
-from axis_of_interest.schema_generator import create_plot_schema
+from infrastructure.telemetry import phase
+from axis_of_interest.schema_generator import create_plot_structure
 from axis_of_interest.registry import list_of_aoi
 from axis_of_interest.prompts import (
     tenplate_prompt_generar_axis_of_interest,
     template_prompt_generate_cuento,
 )
-from axis_of_interest.character_assigner import assign_character_names
+from axis_of_interest.character_assigner import bind_character_names
 
 
 def create_prompt_mode1(data: StoryRequest) -> tuple[str, str]:
@@ -20,11 +21,15 @@ def create_prompt_mode1(data: StoryRequest) -> tuple[str, str]:
         aoi_list = get_bests_aoi(data)
     strategy = data.strategy or "sequential"
     schema_description = _build_schema_description(data)
-    plot_schema = create_plot_schema(
-        "Peñarol", aoi_list, strategy, schema_description
-    )
+    with phase("schema_generation", mode="1", strategy=strategy):
+        structure = create_plot_structure(
+            "Peñarol", aoi_list, strategy, schema_description
+        )
     if data.personajes:
-        plot_schema = assign_character_names(plot_schema, data.personajes, allow_reuse=True)
+        with phase("character_assignment", mode="1"):
+            plot_schema = bind_character_names(structure, data.personajes, allow_reuse=True)
+    else:
+        plot_schema = structure.bind()
     plot_schema_json = json.dumps(
         plot_schema.model_dump(), indent=2, ensure_ascii=False
     )
@@ -1,16 +1,17 @@
 """
 Modo 2: Plot Schema + chunks por escena → LLM hila un único cuento.
 
-Integra axis_of_interest (PlotSchemaGenerator, assign_character_names,
+Integra axis_of_interest (PlotSchemaGenerator, bind_character_names,
 generate_text, prompt gramática) y devuelve el cuento generado por el LLM.
 """
 
 from typing import List, Optional, Any
 
 from infrastructure.api.global_schemas import StoryRequest
+from infrastructure.telemetry import phase
 from axis_of_interest.registry import list_of_aoi
-from axis_of_interest.schema_generator import create_plot_schema
-from axis_of_interest.character_assigner import assign_character_names
+from axis_of_interest.schema_generator import create_plot_structure
+from axis_of_interest.character_assigner import bind_character_names
 from axis_of_interest.text_gen import generate_text
 from axis_of_interest.prompts import (
     template_prompt_generate_cuento_gramatica,
@@ -36,23 +37,14 @@ def _schema_description(data: StoryRequest) -> str:
     return " | ".join(parts)
 
 
-def generate_story_mode2(
-    data: StoryRequest,
-    client: Any,
-    *,
-    temperature: float = 0.7,
-    max_tokens: Optional[int] = None,
-    seed: int = 42,
-) -> str:
+def create_prompt_mode2(data: StoryRequest, *, seed: int = 42) -> str:
     """
-    Genera un cuento con el flujo Modo 2:
+    Construye el prompt del Modo 2:
     1. Plot Schema a partir de AOIs y estrategia.
     2. Asignación de nombres a personajes.
     3. Según el método elegido:
        - gramatica: Genera texto simple con gramática, luego LLM lo transforma
        - aoi_directo: Envía el Plot Schema completo (JSON) al LLM
-
-    Usa el mismo `client` (ClientLLM) que el resto de modos.
     """
     aoi_names = data.aoi_names if data.aoi_names else _default_aoi_names()
     if not aoi_names:
@@ -70,18 +62,20 @@ def generate_story_mode2(
     schema_name = "Story"
     schema_description = _schema_description(data)
 
-    schema = create_plot_schema(
-        schema_name,
-        aoi_names,
-        strategy=strategy,
-        description=schema_description,
-    )
-    schema_with_names = assign_character_names(
-        schema,
-        personajes,
-        allow_reuse=True,
-        seed=seed,
-    )
+    with phase("schema_generation", mode="2", strategy=strategy):
+        schema = create_plot_structure(
+            schema_name,
+            aoi_names,
+            strategy=strategy,
+            description=schema_description,
+        )
+    with phase("character_assignment", mode="2"):
+        schema_with_names = bind_character_names(
+            schema,
+            personajes,
+            allow_reuse=True,
+            seed=seed,
+        )
 
     # Elegir método de generación: gramática o AOI directo
     generation_method = (data.generation_method or "gramatica").strip().lower()
@@ -102,9 +96,46 @@ def generate_story_mode2(
             "{plot_schema}", schema_json
         )
 
+    return prompt
+
+
+def generate_story_mode2(
+    data: StoryRequest,
+    client: Any,
+    *,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    seed: int = 42,
+) -> str:
+    """
+    Genera un cuento con el flujo Modo 2 (ver `create_prompt_mode2`).
+
+    Usa el mismo `client` (ClientLLM) que el resto de modos.
+    """
+    prompt = create_prompt_mode2(data, seed=seed)
     return client.generate(
         prompt,
         system_prompt=None,
         temperature=temperature,
         max_tokens=max_tokens,
+        seed=seed,
+    )
+
+
+async def agenerate_story_mode2(
+    data: StoryRequest,
+    client: Any,
+    *,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    seed: int = 42,
+) -> str:
+    """Versión asíncrona de `generate_story_mode2` (usa `client.agenerate`)."""
+    prompt = create_prompt_mode2(data, seed=seed)
+    return await client.agenerate(
+        prompt,
+        system_prompt=None,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        seed=seed,
     )
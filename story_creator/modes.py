@@ -1,22 +1,37 @@
-from typing import Optional
+from concurrent.futures import CancelledError
+from typing import Any, Callable, Iterator, Optional
+import asyncio
 import json
+import logging
+import os
+import threading
 
 from infrastructure.api.global_schemas import StoryRequest
 from infrastructure.llm_client import get_client, get_models
+from infrastructure.llm_client.metrics import llm_caller
 from infrastructure.llm_client.models import MODELS
-from axis_of_interest.schema_generator import PlotSchemaGenerator
-from axis_of_interest.character_assigner import assign_character_names, CharacterNameAssigner
+from infrastructure.telemetry import phase
+from axis_of_interest.schema_generator import get_schema_generator
+from axis_of_interest.plot_structure import BoundSchema
+from axis_of_interest.character_assigner import bind_character_names, CharacterNameAssigner
 from axis_of_interest.character_attributes import Character, CharacterAttributes
 from axis_of_interest.utils import render_plot_schema_md
 from axis_of_interest.prompts import template_prompt_generate_cuento
 from axis_of_interest.text_gen import generate_text
 from story_creator.mode0 import create_prompt_mode0
 from story_creator.mode1 import create_prompt_mode1
-from story_creator.mode2 import generate_story_mode2
+from story_creator.mode2 import create_prompt_mode2, generate_story_mode2
+
+logger = logging.getLogger(__name__)
 
 AVAILABLE_MODELS = get_models()
 DEFAULT_MODEL = AVAILABLE_MODELS[0]
 
+# Máximo de candidatos generados en paralelo (cada uno es un round trip al LLM)
+CANDIDATES_MAX_WORKERS = int(os.getenv("CANDIDATES_MAX_WORKERS", "4"))
+
+MODE_IDS = ("0", "1", "2", "3", "4")
+
 
 def get_modes() -> list:
     return [
@@ -60,6 +75,11 @@ def _get_provider_for_model(model_name: str) -> Optional[str]:
     return None
 
 
+def _normalize_mode(mode_id: Optional[str]) -> str:
+    """Modo efectivo del pedido: los desconocidos se generan como el modo 0."""
+    return mode_id if mode_id in MODE_IDS else "0"
+
+
 def _build_prompts(data: StoryRequest, mode_id: str) -> tuple[str, str]:
     """Construye un prompt simple con los datos del usuario."""
     system_prompt = "Eres un escritor que crea cuentos breves en español, con tono claro y atractivo."
@@ -112,30 +132,32 @@ def _generate_mode_0(
     temperature = data.temperature if data.temperature is not None else 0.7
 
     if mode_id == "2":
-        return generate_story_mode2(
-            data,
-            client,
+        with phase("llm_generation", mode=mode_id):
+            return generate_story_mode2(
+                data,
+                client,
+                temperature=temperature,
+                max_tokens=data.max_tokens,
+                seed=candidate_seed,
+            )
+
+    system_prompt, user_prompt = _build_prompts(data, mode_id)
+    with phase("llm_generation", mode=mode_id):
+        return client.generate(
+            user_prompt,
+            system_prompt=system_prompt,
             temperature=temperature,
             max_tokens=data.max_tokens,
-            seed=candidate_seed,
         )
 
-    system_prompt, user_prompt = _build_prompts(data, mode_id)
-    return client.generate(
-        user_prompt,
-        system_prompt=system_prompt,
-        temperature=temperature,
-        max_tokens=data.max_tokens,
-    )
-
 
-def _generate_mode_3(data: StoryRequest) -> tuple[str, dict]:
-    """Modo 3: Generación con Plot Schema basado en AOIs seleccionados."""
+def _prepare_mode_3(data: StoryRequest) -> tuple[str, BoundSchema]:
+    """Modo 3: arma el Plot Schema con nombres y el prompt para el LLM."""
     if not data.aois or len(data.aois) == 0:
         raise RuntimeError("Modo 3 requiere al menos un Axis of Interest seleccionado")
     
     # Generar Plot Schema
-    generator = PlotSchemaGenerator()
+    generator = get_schema_generator()
     interleaving_strategy = data.interleaving_strategy or "random"
     
     # Si la estrategia es LLM, necesitamos el proveedor, no el modelo
@@ -144,27 +166,27 @@ def _generate_mode_3(data: StoryRequest) -> tuple[str, dict]:
         model_name = _resolve_model(data.model)
         llm_provider = _get_provider_for_model(model_name)
     
-    schema = generator.generate_schema(
-        schema_name=f"Historia con {', '.join(data.aois)}",
-        aoi_names=data.aois,
-        interleaving_strategy=interleaving_strategy,
-        llm_provider=llm_provider,
-        schema_description=f"Plot schema usando {interleaving_strategy} strategy",
-    )
+    with phase("schema_generation", mode="3", strategy=interleaving_strategy):
+        schema = generator.generate_structure(
+            schema_name=f"Historia con {', '.join(data.aois)}",
+            aoi_names=data.aois,
+            interleaving_strategy=interleaving_strategy,
+            llm_provider=llm_provider,
+            schema_description=f"Plot schema usando {interleaving_strategy} strategy",
+            variant=data.interleaving_variant,
+        )
     
     # Asignar personajes
     character_names = data.personajes if data.personajes else ["Personaje A", "Personaje B", "Personaje C"]
-    schema_with_names = assign_character_names(
-        schema,
-        character_names,
-        allow_reuse=True,
-        seed=42,
-    )
-    
-    # Generar cuento con LLM
-    model_name = _resolve_model(data.model)
-    client = get_client(model_name)
+    with phase("character_assignment", mode="3"):
+        schema_with_names = bind_character_names(
+            schema,
+            character_names,
+            allow_reuse=True,
+            seed=42,
+        )
     
+    # Armar el prompt para el LLM
     schema_dict = schema_with_names.model_dump()
     schema_json = json.dumps(schema_dict, indent=2, ensure_ascii=False)
     
@@ -176,27 +198,32 @@ def _generate_mode_3(data: StoryRequest) -> tuple[str, dict]:
     characters_section = _build_characters_section(character_names=character_names)
     prompt = prompt.replace("{characters_section}", characters_section)
     
-    print(f"[Modo 3] Longitud del prompt: {len(prompt)} caracteres")
-    print(f"[Modo 3] Primeros 500 chars del prompt:\n{prompt[:500]}")
-    print(f"[Modo 3] Últimos 500 chars del prompt:\n{prompt[-500:]}")
-    
-    story = client.generate(
-        prompt,
-        temperature=data.temperature if data.temperature is not None else 0.7,
-        max_tokens=data.max_tokens,  # Solo si el usuario lo especifica
-    )
+    logger.debug("[Modo 3] Longitud del prompt: %d caracteres", len(prompt))
+
+    return prompt, schema_with_names
+
+
+def _generate_mode_3(data: StoryRequest) -> tuple[str, dict]:
+    """Modo 3: Generación con Plot Schema basado en AOIs seleccionados."""
+    prompt, schema_with_names = _prepare_mode_3(data)
+    client = get_client(_resolve_model(data.model))
+
+    with phase("llm_generation", mode="3"):
+        story = client.generate(
+            prompt,
+            temperature=data.temperature if data.temperature is not None else 0.7,
+            max_tokens=data.max_tokens,  # Solo si el usuario lo especifica
+        )
     
-    print(f"[Modo 3] Historia generada. Longitud: {len(story)} caracteres")
-    print(f"[Modo 3] Primeros 200 chars: {story[:200]}")
-    print(f"[Modo 3] Últimos 200 chars: {story[-200:]}")
+    logger.debug("[Modo 3] Historia generada. Longitud: %d caracteres", len(story))
 
     return story, schema_with_names.model_dump()
 
 
 
 
-def _generate_mode_4(data: StoryRequest) -> tuple[str, dict]:
-    """Modo 4: Generación con Plot Schema y asignación de personajes basada en atributos."""
+def _prepare_mode_4(data: StoryRequest) -> tuple[str, BoundSchema]:
+    """Modo 4: arma el Plot Schema con personajes asignados por atributos y el prompt."""
     if not data.aois or len(data.aois) == 0:
         raise RuntimeError("Modo 4 requiere al menos un Axis of Interest seleccionado")
     
@@ -204,7 +231,7 @@ def _generate_mode_4(data: StoryRequest) -> tuple[str, dict]:
         raise RuntimeError("Modo 4 requiere al menos un personaje con atributos")
     
     # Generar Plot Schema
-    generator = PlotSchemaGenerator()
+    generator = get_schema_generator()
     interleaving_strategy = data.interleaving_strategy or "random"
     
     # Si la estrategia es LLM, necesitamos el proveedor
@@ -213,13 +240,15 @@ def _generate_mode_4(data: StoryRequest) -> tuple[str, dict]:
         model_name = _resolve_model(data.model)
         llm_provider = _get_provider_for_model(model_name)
     
-    schema = generator.generate_schema(
-        schema_name=f"Historia con {', '.join(data.aois)}",
-        aoi_names=data.aois,
-        interleaving_strategy=interleaving_strategy,
-        llm_provider=llm_provider,
-        schema_description=f"Plot schema usando {interleaving_strategy} strategy",
-    )
+    with phase("schema_generation", mode="4", strategy=interleaving_strategy):
+        schema = generator.generate_structure(
+            schema_name=f"Historia con {', '.join(data.aois)}",
+            aoi_names=data.aois,
+            interleaving_strategy=interleaving_strategy,
+            llm_provider=llm_provider,
+            schema_description=f"Plot schema usando {interleaving_strategy} strategy",
+            variant=data.interleaving_variant,
+        )
     
     # Convertir personajes del request a objetos Character
     characters = [
@@ -239,16 +268,14 @@ def _generate_mode_4(data: StoryRequest) -> tuple[str, dict]:
     
     # Asignar personajes basándose en atributos
     assigner = CharacterNameAssigner(seed=42)
-    schema_with_names = assigner.assign_names_by_attributes(
-        schema,
-        characters,
-        allow_reuse=True,
-    )
-    
-    # Generar cuento con LLM
-    model_name = _resolve_model(data.model)
-    client = get_client(model_name)
+    with phase("character_assignment", mode="4"):
+        schema_with_names = assigner.bind_names_by_attributes(
+            schema,
+            characters,
+            allow_reuse=True,
+        )
     
+    # Armar el prompt para el LLM
     schema_dict = schema_with_names.model_dump()
     schema_json = json.dumps(schema_dict, indent=2, ensure_ascii=False)
     
@@ -260,19 +287,24 @@ def _generate_mode_4(data: StoryRequest) -> tuple[str, dict]:
     characters_section = _build_characters_section(characters=characters)
     prompt = prompt.replace("{characters_section}", characters_section)
     
-    print(f"[Modo 4] Longitud del prompt: {len(prompt)} caracteres")
-    print(f"[Modo 4] Primeros 500 chars del prompt:\n{prompt[:500]}")
-    print(f"[Modo 4] Últimos 500 chars del prompt:\n{prompt[-500:]}")
-    
-    story = client.generate(
-        prompt,
-        temperature=data.temperature if data.temperature is not None else 0.7,
-        max_tokens=data.max_tokens,
-    )
+    logger.debug("[Modo 4] Longitud del prompt: %d caracteres", len(prompt))
+
+    return prompt, schema_with_names
+
+
+def _generate_mode_4(data: StoryRequest) -> tuple[str, dict]:
+    """Modo 4: Generación con Plot Schema y asignación de personajes basada en atributos."""
+    prompt, schema_with_names = _prepare_mode_4(data)
+    client = get_client(_resolve_model(data.model))
+
+    with phase("llm_generation", mode="4"):
+        story = client.generate(
+            prompt,
+            temperature=data.temperature if data.temperature is not None else 0.7,
+            max_tokens=data.max_tokens,
+        )
     
-    print(f"[Modo 4] Historia generada. Longitud: {len(story)} caracteres")
-    print(f"[Modo 4] Primeros 200 chars: {story[:200]}")
-    print(f"[Modo 4] Últimos 200 chars: {story[-200:]}")
+    logger.debug("[Modo 4] Historia generada. Longitud: %d caracteres", len(story))
 
     return story, schema_with_names.model_dump()
 
@@ -282,6 +314,20 @@ def _generate_single_story(
     mode_id: str,
     *,
     candidate_idx: int = 0,
+) -> dict:
+    selected_mode = _normalize_mode(mode_id)
+    # Se etiqueta acá porque cada candidato corre en su propio hilo
+    with llm_caller(f"story_mode_{selected_mode}"):
+        return _generate_single_story_for_mode(
+            data, selected_mode, candidate_idx=candidate_idx
+        )
+
+
+def _generate_single_story_for_mode(
+    data: StoryRequest,
+    mode_id: str,
+    *,
+    candidate_idx: int = 0,
 ) -> dict:
     if mode_id == "0":
         return {"story": _generate_mode_0(data, mode_id="0", candidate_seed=42 + candidate_idx)}
@@ -298,20 +344,123 @@ def _generate_single_story(
     return {"story": _generate_mode_0(data, mode_id="0", candidate_seed=42 + candidate_idx)}
 
 
-def generate_story_candidates(
+def _candidate_call(
+    data: StoryRequest,
+    mode_id: str,
+    candidate_idx: int,
+) -> tuple[dict[str, Any], Optional[dict]]:
+    """Argumentos de `ClientLLM.generate` para un candidato y su Plot Schema.
+
+    Mismos prompts y seeds que `_generate_single_story_for_mode`; el Plot Schema
+    es None salvo en los modos 3 y 4.
+    """
+    if mode_id == "2":
+        seed = 42 + candidate_idx
+        return {"prompt": create_prompt_mode2(data, seed=seed), "seed": seed}, None
+    if mode_id in ("3", "4"):
+        prepare = _prepare_mode_3 if mode_id == "3" else _prepare_mode_4
+        prompt, schema_with_names = prepare(data)
+        return {"prompt": prompt}, schema_with_names.model_dump()
+    system_prompt, user_prompt = _build_prompts(data, mode_id)
+    return {"prompt": user_prompt, "system_prompt": system_prompt}, None
+
+
+async def _agenerate_single_story(
+    data: StoryRequest,
+    mode_id: str,
+    *,
+    candidate_idx: int = 0,
+) -> dict:
+    """Versión asíncrona de `_generate_single_story` sobre `ClientLLM.agenerate`."""
+    selected_mode = _normalize_mode(mode_id)
+    with llm_caller(f"story_mode_{selected_mode}"):
+        # Armar el prompt es CPU o, con el intercalado "llm", una llamada
+        # sincrónica: va a un hilo para no frenar al resto de los candidatos.
+        call, plot_schema = await asyncio.to_thread(
+            _candidate_call, data, selected_mode, candidate_idx
+        )
+        client = get_client(_resolve_model(data.model))
+        with phase("llm_generation", mode=selected_mode):
+            story = await client.agenerate(
+                call.pop("prompt"),
+                temperature=data.temperature if data.temperature is not None else 0.7,
+                max_tokens=data.max_tokens,
+                **call,
+            )
+    generated: dict[str, Any] = {"story": story}
+    if plot_schema is not None:
+        generated["plot_schema"] = plot_schema
+    return generated
+
+
+async def agenerate_story_candidates(
     data: StoryRequest,
     *,
     mode_id: Optional[str] = None,
     num_candidates: int = 1,
+    max_concurrency: Optional[int] = None,
+    on_candidate: Optional[Callable[[dict], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
 ) -> list[dict]:
+    """Genera `num_candidates` cuentos concurrentemente en el event loop en curso.
+
+    Como máximo `max_concurrency` llamadas al LLM en vuelo a la vez. Los
+    candidatos se devuelven ordenados por `candidate_id`; `on_candidate` se
+    invoca desde el loop con cada uno apenas está listo. Si se marca
+    `cancel_event`, los candidatos que todavía no arrancaron no se generan y
+    se levanta `CancelledError`.
+    """
     selected_mode = mode_id or data.mode or "0"
     total_candidates = max(1, int(num_candidates))
-    candidates: list[dict] = []
-    for idx in range(total_candidates):
-        generated = _generate_single_story(data, selected_mode, candidate_idx=idx)
+    semaphore = asyncio.Semaphore(
+        max(1, min(total_candidates, max_concurrency or CANDIDATES_MAX_WORKERS))
+    )
+
+    async def _generate(idx: int) -> dict:
+        async with semaphore:
+            if cancel_event is not None and cancel_event.is_set():
+                raise CancelledError("Generación de candidatos cancelada")
+            generated = await _agenerate_single_story(
+                data, selected_mode, candidate_idx=idx
+            )
         generated["candidate_id"] = idx + 1
-        candidates.append(generated)
-    return candidates
+        if on_candidate is not None:
+            on_candidate(generated)
+        return generated
+
+    tasks = [asyncio.create_task(_generate(idx)) for idx in range(total_candidates)]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+def generate_story_candidates(
+    data: StoryRequest,
+    *,
+    mode_id: Optional[str] = None,
+    num_candidates: int = 1,
+    max_workers: Optional[int] = None,
+    on_candidate: Optional[Callable[[dict], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> list[dict]:
+    """Versión sincrónica de `agenerate_story_candidates`, para llamar desde un hilo.
+
+    Corre los candidatos en un event loop propio (como máximo `max_workers`
+    a la vez); `on_candidate` se invoca desde ese hilo.
+    """
+    return asyncio.run(
+        agenerate_story_candidates(
+            data,
+            mode_id=mode_id,
+            num_candidates=num_candidates,
+            max_concurrency=max_workers,
+            on_candidate=on_candidate,
+            cancel_event=cancel_event,
+        )
+    )
 
 
 def generate_the_story(
@@ -324,3 +473,45 @@ def generate_the_story(
     if "plot_schema" in generated:
         return generated["story"], generated["plot_schema"]
     return generated["story"]
+
+
+def stream_the_story(
+    data: StoryRequest,
+    mode_id: Optional[str] = None,
+) -> tuple[Optional[dict], Iterator[str]]:
+    """Prepara un cuento para streaming.
+
+    Devuelve el Plot Schema (solo modos 3 y 4, si no None) y un iterador con los
+    fragmentos del cuento a medida que los emite el LLM. El prompt y el schema
+    se arman antes de devolver, así los errores de validación surgen acá y no
+    en medio del stream. Un modo desconocido usa el prompt del modo 0, igual
+    que `generate_the_story`.
+    """
+    selected_mode = _normalize_mode(mode_id or data.mode)
+    client = get_client(_resolve_model(data.model))
+    temperature = data.temperature if data.temperature is not None else 0.7
+
+    plot_schema = None
+    system_prompt = None
+    seed = None
+    if selected_mode == "3":
+        prompt, schema_with_names = _prepare_mode_3(data)
+        plot_schema = schema_with_names.model_dump()
+    elif selected_mode == "4":
+        prompt, schema_with_names = _prepare_mode_4(data)
+        plot_schema = schema_with_names.model_dump()
+    elif selected_mode == "2":
+        seed = 42
+        prompt = create_prompt_mode2(data, seed=seed)
+    else:
+        system_prompt, prompt = _build_prompts(data, selected_mode)
+
+    tokens = client.stream(
+        prompt,
+        system_prompt=system_prompt,
+        temperature=temperature,
+        max_tokens=data.max_tokens,
+        seed=seed,
+        caller=f"story_mode_{selected_mode}",
+    )
+    return plot_schema, tokens